@@ -0,0 +1,5 @@
+"""
+Benchmarks for the task dashboard backend
+
+Run from the backend directory, e.g. ``python -m benchmarks.bench_stats``.
+"""
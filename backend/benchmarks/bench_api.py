@@ -0,0 +1,324 @@
+"""
+Throughput and latency of the API on a realistic dataset
+
+Seeds a SQLite database with ``seed_dataset`` (or reuses one built with
+``python -m benchmarks.seed``), drives main.app in-process through httpx's
+ASGI transport with concurrent clients, and reports requests per second and
+p50/p95/p99 latency for the list, detail, stats, goals, transcripts and
+search reads, the task write endpoints, and process_transcript with a
+stubbed LLM.
+
+Results are written as JSON (--output); pass an earlier file as --compare to
+print the change per scenario. Set DB_ASYNC=1 to measure the async engine.
+
+Usage: python -m benchmarks.bench_api [--tasks N | --db PATH] [--requests N]
+           [--concurrency C] [--only NAME,...] [--output FILE] [--compare FILE]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import httpx
+from benchmarks.seed import COMMON_WORDS, make_engine, random_text, seed_dataset
+from migrations import migrate
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+WARMUP_REQUESTS = 10
+BULK_SIZE = 50
+TRANSCRIPT_ACTIONS = 5  # new tasks and updates per stubbed extraction
+
+Request = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+class Fixture:
+    """IDs the scenarios draw from, read from the seeded database"""
+
+    def __init__(self, db, reserve: int):
+        from models import Project, Tag, Task, User
+        from sqlalchemy import func
+
+        self.max_task_id = db.query(func.max(Task.id)).scalar() or 0
+        # Scenarios that delete take IDs from the top; reads stay below them
+        self.next_delete = self.max_task_id
+        self.read_max = max(1, self.max_task_id - reserve)
+        busiest = (
+            db.query(Task.assignee_id).filter(Task.assignee_id.isnot(None))
+            .group_by(Task.assignee_id).order_by(func.count().desc()).limit(10).all()
+        )
+        self.busy_users = [user_id for user_id, in busiest] or [None]
+        self.users = [{"id": user.id, "name": user.name} for user in db.query(User.id, User.name)]
+        self.project_ids = [project_id for project_id, in db.query(Project.id)]
+        self.tag_ids = [tag_id for tag_id, in db.query(Tag.id)]
+
+    def task_id(self, rng: random.Random) -> int:
+        return rng.randint(1, self.read_max)
+
+    def deletable_id(self) -> int:
+        self.next_delete -= 1
+        return self.next_delete + 1
+
+    def new_task(self, rng: random.Random) -> Dict[str, Any]:
+        return {
+            "title": random_text(rng, 3, 8),
+            "description": random_text(rng, 10, 40),
+            "priority": rng.choice(("low", "medium", "high", "urgent")),
+            "assignee_id": rng.choice(self.users)["id"],
+            "creator_id": rng.choice(self.users)["id"],
+            "project_id": rng.choice(self.project_ids) if self.project_ids else None,
+            "tag_ids": rng.sample(self.tag_ids, min(2, len(self.tag_ids))),
+        }
+
+
+class Scenario(NamedTuple):
+    name: str
+    request: Callable[[random.Random, Fixture], Request]
+
+
+SCENARIOS = [
+    Scenario("list_tasks", lambda rng, f: ("GET", "/tasks?limit=100", None)),
+    Scenario("list_tasks_by_assignee", lambda rng, f: ("GET", f"/tasks?limit=100&assignee_id={rng.choice(f.busy_users)}", None)),
+    Scenario("list_tasks_by_status", lambda rng, f: ("GET", "/tasks?limit=100&status=in_progress", None)),
+    Scenario("list_tasks_fields", lambda rng, f: ("GET", "/tasks?limit=100&fields=id,title,status,assignee", None)),
+    Scenario("get_task", lambda rng, f: ("GET", f"/tasks/{f.task_id(rng)}", None)),
+    Scenario("stats", lambda rng, f: ("GET", "/stats", None)),
+    Scenario("goals", lambda rng, f: ("GET", "/goals", None)),
+    Scenario("transcripts", lambda rng, f: ("GET", "/transcripts", None)),
+    Scenario("search", lambda rng, f: ("GET", f"/search?q={rng.choice(COMMON_WORDS)}", None)),
+    Scenario("create_task", lambda rng, f: ("POST", "/tasks", f.new_task(rng))),
+    Scenario("update_task", lambda rng, f: (
+        "PATCH", f"/tasks/{f.task_id(rng)}",
+        {"status": rng.choice(("todo", "in_progress", "done", "blocked")), "priority": rng.choice(("low", "high"))},
+    )),
+    Scenario("bulk_create_tasks", lambda rng, f: (
+        "POST", "/tasks/bulk", {"tasks": [f.new_task(rng) for _ in range(BULK_SIZE)]},
+    )),
+    Scenario("delete_task", lambda rng, f: ("DELETE", f"/tasks/{f.deletable_id()}", None)),
+]
+TRANSCRIPT_SCENARIO = "process_transcript"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, fixture: Fixture, requests: int, concurrency: int, seed: int
+) -> Dict[str, Any]:
+    """Send ``requests`` requests from ``concurrency`` concurrent clients"""
+    rng = random.Random(seed)
+    for _ in range(0 if scenario.name == "delete_task" else WARMUP_REQUESTS):
+        method, url, body = scenario.request(rng, fixture)
+        await client.request(method, url, json=body)
+
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            method, url, body = scenario.request(rng, fixture)
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code >= 400
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def run_process_transcript(fixture: Fixture, runs: int, seed: int) -> Dict[str, Any]:
+    """Time process_transcript end to end with a FakeLLMClient, on new transcripts"""
+    from database import SessionLocal
+    from fake_llm import FakeLLMClient
+    from models import MeetingTranscript
+    from transcript_processor import process_transcript
+
+    rng = random.Random(seed)
+
+    def respond(messages):
+        return {
+            "summary": random_text(rng, 15, 30),
+            "new_tasks": [
+                {"title": random_text(rng, 3, 8), "assignee_name": rng.choice(fixture.users)["name"],
+                 "priority": rng.choice(("low", "medium", "high"))}
+                for _ in range(TRANSCRIPT_ACTIONS)
+            ],
+            "task_updates": [
+                {"task_id": fixture.task_id(rng), "action": rng.choice(("completed", "blocked")), "note": "Discussed"}
+                for _ in range(TRANSCRIPT_ACTIONS)
+            ],
+        }
+
+    llm = FakeLLMClient(respond)
+    latencies: List[float] = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(runs):
+        text = "\n".join(
+            f"{rng.choice(fixture.users)['name']}: {random_text(rng, 8, 25)}" for _ in range(rng.randint(20, 80))
+        )
+        db = SessionLocal()
+        try:
+            transcript = MeetingTranscript(title=f"Benchmark sync {i}", transcript=text)
+            db.add(transcript)
+            db.commit()
+            start = time.perf_counter()
+            result = process_transcript(text, transcript.id, db, fixture.users, llm_client=llm, cache=None)
+            latencies.append(time.perf_counter() - start)
+            errors += not result["success"]
+        finally:
+            db.close()
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]] = None) -> None:
+    header = f"{'scenario':<24} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+    print(header + ("   vs baseline (req/s, p95)" if baseline else ""))
+    for name, row in results.items():
+        line = (
+            f"{name:<24} {row['throughput_rps']:>8.1f} {row['p50_ms']:>8.2f} "
+            f"{row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['errors']:>7}"
+        )
+        before = (baseline or {}).get("scenarios", {}).get(name)
+        if before:
+            rps = (row["throughput_rps"] / before["throughput_rps"] - 1) * 100
+            p95 = (row["p95_ms"] / before["p95_ms"] - 1) * 100
+            line += f"   {rps:+6.1f}% {p95:+6.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=10_000, help="tasks to seed into a temporary database")
+    parser.add_argument("--db", help="copy of this database (from benchmarks.seed) is used instead of seeding")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--transcripts", type=int, default=20, help="process_transcript runs")
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/bench_api-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    names = [scenario.name for scenario in SCENARIOS] + [TRANSCRIPT_SCENARIO]
+    selected = args.only.split(",") if args.only else names
+    unknown = set(selected) - set(names)
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}. Options: {', '.join(names)}")
+
+    # Writes would change a reused database, so always work on a copy
+    fd, path = tempfile.mkstemp(prefix="bench_api_", suffix=".db")
+    os.close(fd)
+    try:
+        if args.db:
+            shutil.copyfile(args.db, path)
+        else:
+            engine, _ = make_engine(path)
+            migrate(engine)
+            seed_dataset(engine, args.tasks, seed=args.seed)
+            engine.dispose()
+
+        # The app's engine is configured from the environment when imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+        os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+        # Lock waits under concurrent writes would flood the slow-query log
+        os.environ.setdefault("SLOW_QUERY_MS", "0")
+        from database import SessionLocal, init_db, DB_ASYNC
+        from main import app
+
+        init_db()
+        reserve = args.requests + WARMUP_REQUESTS
+        db = SessionLocal()
+        try:
+            fixture = Fixture(db, reserve)
+        finally:
+            db.close()
+
+        async def run_http():
+            transport = httpx.ASGITransport(app=app)
+            limits = httpx.Limits(max_connections=args.concurrency)
+            results = {}
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits, timeout=300) as client:
+                for offset, scenario in enumerate(SCENARIOS):
+                    if scenario.name in selected:
+                        results[scenario.name] = await run_scenario(
+                            client, scenario, fixture, args.requests, args.concurrency, args.seed + offset
+                        )
+            return results
+
+        results = asyncio.run(run_http())
+        if TRANSCRIPT_SCENARIO in selected:
+            results[TRANSCRIPT_SCENARIO] = run_process_transcript(fixture, args.transcripts, args.seed)
+
+        report = {
+            "benchmark": "bench_api",
+            "created_at": datetime.utcnow().isoformat(),
+            "git": git_revision(),
+            "python": sys.version.split()[0],
+            "sqlite": sqlite3.sqlite_version,
+            "config": {
+                "tasks": fixture.max_task_id,
+                "users": len(fixture.users),
+                "db": args.db,
+                "db_async": DB_ASYNC,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "seed": args.seed,
+            },
+            "scenarios": results,
+        }
+        baseline = None
+        if args.compare:
+            with open(args.compare) as f:
+                baseline = json.load(f)
+        print_results(results, baseline)
+
+        output = args.output or os.path.join(
+            RESULTS_DIR, f"bench_api-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.json"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Load test the API in sync (threadpool) and async (DB_ASYNC=1) database modes
+
+Starts uvicorn against a seeded SQLite database once per mode and hammers a
+mix of read endpoints with concurrent clients, reporting requests per second
+and latency percentiles.
+
+Usage: python -m benchmarks.bench_async [--tasks N] [--concurrency C] [--duration S]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import httpx
+from migrations import migrate
+from benchmarks.seed import make_engine, seed_tasks, seed_related
+
+ENDPOINTS = ["/tasks?limit=50", "/tasks/1", "/stats", "/goals", "/users"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path: str, async_mode: bool, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", DB_ASYNC="1" if async_mode else "0")
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+
+
+async def wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not start")
+
+
+async def load(base_url: str, concurrency: int, duration: float):
+    """Run ``concurrency`` client loops for ``duration`` seconds; return latencies"""
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker(offset: int):
+            nonlocal errors
+            i = offset
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                response = await client.get(ENDPOINTS[i % len(ENDPOINTS)])
+                latencies.append(time.perf_counter() - start)
+                errors += response.status_code >= 400
+                i += 1
+
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return latencies, errors
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    engine, path = make_engine()
+    try:
+        migrate(engine)
+        seed_tasks(engine, args.tasks)
+        seed_related(engine)
+        engine.dispose()
+
+        print(f"{'mode':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for async_mode in (False, True):
+            port = free_port()
+            server = start_server(path, async_mode, port)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                asyncio.run(wait_ready(base_url))
+                latencies, errors = asyncio.run(load(base_url, args.concurrency, args.duration))
+            finally:
+                server.terminate()
+                server.wait()
+            print(
+                f"{'async' if async_mode else 'sync':<6} {len(latencies) / args.duration:>8.0f} "
+                f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 95) * 1000:>8.1f} "
+                f"{percentile(latencies, 99) * 1000:>8.1f} {errors:>7}"
+            )
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
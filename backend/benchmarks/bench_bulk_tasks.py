@@ -0,0 +1,96 @@
+"""
+Throughput of the bulk task endpoints vs looping over the single-item ones
+
+Drives main.app in-process against a seeded SQLite file and times N creates,
+N patches and N deletes done one request at a time and as one bulk request.
+
+Usage: python -m benchmarks.bench_bulk_tasks [N_ITEMS ...]
+"""
+import os
+import sys
+import time
+from sqlalchemy.orm import sessionmaker
+from fastapi.testclient import TestClient
+from database import TrackedSession
+import counters
+from benchmarks.seed import make_engine, seed_tasks, seed_related
+
+DEFAULT_SIZES = [100, 1_000]
+
+
+def task_payload(i: int) -> dict:
+    return {"title": f"Imported {i}", "creator_id": 1 + i % 50, "assignee_id": 1 + i % 7, "tag_ids": [1 + i % 5, 1 + i % 3]}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run_single(client, n: int):
+    def create():
+        return [client.post("/tasks", json=task_payload(i)).json()["id"] for i in range(n)]
+
+    ids, create_s = timed(create)
+    _, patch_s = timed(lambda: [client.patch(f"/tasks/{task_id}", json={"status": "done", "tag_ids": [2]}) for task_id in ids])
+    _, delete_s = timed(lambda: [client.delete(f"/tasks/{task_id}") for task_id in ids])
+    return create_s, patch_s, delete_s
+
+
+def run_bulk(client, n: int):
+    def create():
+        response = client.post("/tasks/bulk", json={"tasks": [task_payload(i) for i in range(n)]})
+        return [result["id"] for result in response.json()["results"]]
+
+    ids, create_s = timed(create)
+    _, patch_s = timed(lambda: client.patch("/tasks/bulk", json={
+        "tasks": [{"id": task_id, "status": "done", "tag_ids": [2]} for task_id in ids]
+    }))
+    _, delete_s = timed(lambda: client.request("DELETE", "/tasks/bulk", json={"ids": ids}))
+    return create_s, patch_s, delete_s
+
+
+def main(sizes):
+    from main import app
+    from database import get_db
+
+    engine, path = make_engine()
+    try:
+        seed_tasks(engine, 10_000)
+        seed_related(engine)
+        SessionFactory = sessionmaker(bind=engine, class_=TrackedSession, autoflush=False)
+        db = SessionFactory()
+        counters.rebuild_counters(db)
+        db.close()
+
+        def override_get_db():
+            db = SessionFactory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        client = TestClient(app)
+
+        print(f"{'items':>6} {'op':>7} {'single s':>9} {'bulk s':>8} {'speedup':>8}")
+        for n in sizes:
+            single = run_single(client, n)
+            bulk = run_bulk(client, n)
+            for op, old_s, new_s in zip(("create", "patch", "delete"), single, bulk):
+                print(f"{n:>6} {op:>7} {old_s:>9.3f} {new_s:>8.3f} {old_s / new_s:>7.1f}x")
+
+        db = SessionFactory()
+        drift = counters.verify_counters(db)
+        db.close()
+        if drift:
+            raise AssertionError(f"Counter drift: {drift}")
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
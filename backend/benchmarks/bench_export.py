@@ -0,0 +1,78 @@
+"""
+Rows per second and peak RSS of the streaming task export
+
+Seeds a SQLite database, then consumes export.stream_tasks in a fresh child
+process per format so peak RSS reflects the export alone. Peak RSS should
+stay roughly flat as the table grows.
+
+Usage: python -m benchmarks.bench_export [N_TASKS ...]
+"""
+import os
+import resource
+import subprocess
+import sys
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from benchmarks.seed import make_engine, seed_tasks, seed_related
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss survives fork+exec (it would report the seeding parent), while
+    # /proc's VmHWM belongs to the new address space; both are in KiB
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def consume(path: str, fmt: str) -> None:
+    """Child process: stream the whole export and report rows, seconds, RSS"""
+    import export
+
+    engine = create_engine(f"sqlite:///{path}")
+    session_factory = sessionmaker(bind=engine)
+    baseline = peak_rss_mb()
+    rows = size = 0
+    start = time.perf_counter()
+    for chunk in export.stream_tasks(export.ExportFormat(fmt), session_factory=session_factory):
+        rows += chunk.count("\n")
+        size += len(chunk)
+    elapsed = time.perf_counter() - start
+    if fmt == "csv":
+        rows -= 1  # header
+    print(rows, elapsed, baseline, peak_rss_mb(), size)
+
+
+def main(sizes):
+    print(f"{'tasks':>9} {'format':>7} {'rows/s':>9} {'MB out':>8} {'base MB':>8} {'peak MB':>8}")
+    for n in sizes:
+        engine, path = make_engine()
+        try:
+            seed_tasks(engine, n)
+            seed_related(engine)
+            engine.dispose()
+            for fmt in ("ndjson", "csv"):
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_export", "--consume", path, fmt],
+                    check=True, capture_output=True, text=True,
+                ).stdout.split()
+                rows, elapsed, baseline, peak, size = int(output[0]), *map(float, output[1:])
+                if rows != n:
+                    raise AssertionError(f"Exported {rows} of {n} tasks")
+                print(f"{n:>9} {fmt:>7} {rows / elapsed:>9.0f} {size / 1e6:>8.1f} {baseline:>8.1f} {peak:>8.1f}")
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--consume":
+        consume(sys.argv[2], sys.argv[3])
+    else:
+        main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
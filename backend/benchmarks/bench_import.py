@@ -0,0 +1,91 @@
+"""
+Throughput of importer.import_tasks vs POST /tasks one row at a time
+
+Generates a CSV with user/project/tag names, imports it into a fresh SQLite
+database and compares against posting a sample of the same rows.
+
+Usage: python -m benchmarks.bench_import [N_ROWS ...]
+"""
+import io
+import os
+import random
+import sys
+import time
+from sqlalchemy.orm import sessionmaker
+from fastapi.testclient import TestClient
+from database import TrackedSession
+import counters
+import importer
+from benchmarks.seed import make_engine, seed_tasks, seed_related
+
+DEFAULT_SIZES = [10_000, 100_000]
+SINGLE_SAMPLE = 500
+
+
+def make_csv(n: int, seed: int = 3) -> str:
+    rng = random.Random(seed)
+    lines = ["title,description,status,priority,assignee,creator,project,tags"]
+    for i in range(n):
+        tags = ";".join(f"tag{t}" for t in rng.sample(range(1, 11), rng.randint(0, 2)))
+        lines.append(
+            f"Imported task {i},Migrated from the old tracker,{rng.choice(['todo', 'in_progress', 'done'])},"
+            f"{rng.choice(['low', 'medium', 'high'])},user{rng.randint(1, 50)},user1,project{rng.randint(1, 20)},{tags}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def single_rate(SessionFactory, n: int) -> float:
+    """Rows per second posting ``n`` tasks to POST /tasks"""
+    from main import app
+    from database import get_db
+
+    def override_get_db():
+        db = SessionFactory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        client = TestClient(app)
+        start = time.perf_counter()
+        for i in range(n):
+            client.post("/tasks", json={"title": f"Posted {i}", "creator_id": 1, "assignee_id": 2, "project_id": 3, "tag_ids": [1]})
+        return n / (time.perf_counter() - start)
+    finally:
+        app.dependency_overrides.clear()
+
+
+def main(sizes):
+    print(f"{'rows':>8} {'import rows/s':>13} {'POST rows/s':>12} {'speedup':>8}")
+    for n in sizes:
+        engine, path = make_engine()
+        try:
+            seed_tasks(engine, 1_000)
+            seed_related(engine)
+            SessionFactory = sessionmaker(bind=engine, class_=TrackedSession, autoflush=False)
+            db = SessionFactory()
+            counters.rebuild_counters(db)
+            data = make_csv(n)
+
+            run = importer.start_import(db, "bench.csv", "csv")
+            start = time.perf_counter()
+            importer.import_tasks(db, io.StringIO(data), run)
+            import_rate = n / (time.perf_counter() - start)
+            if run.imported != n:
+                raise AssertionError(f"Imported {run.imported} of {n}: {run.errors[:3]}")
+            drift = counters.verify_counters(db)
+            if drift:
+                raise AssertionError(f"Counter drift: {drift}")
+            db.close()
+
+            post_rate = single_rate(SessionFactory, SINGLE_SAMPLE)
+            print(f"{n:>8} {import_rate:>13.0f} {post_rate:>12.0f} {import_rate / post_rate:>7.1f}x")
+        finally:
+            engine.dispose()
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,77 @@
+"""
+Latency of GET /search's queries against the full-text index
+
+Seeds tasks with word-based titles and descriptions, builds the index and
+times each query (p50/p95 over repeated runs) next to the LIKE scan that
+text search would otherwise need.
+
+Usage: python -m benchmarks.bench_search [N_TASKS]
+"""
+import os
+import statistics
+import sys
+import time
+from sqlalchemy import or_
+from models import Task, TaskStatus
+import search
+from benchmarks.seed import make_engine, seed_tasks
+
+QUERIES = [
+    ("common word", "billing", {}),
+    ("two words", "payment invoice", {}),
+    ("rare word", "term4000", {}),
+    ("three words", "deploy release latency", {}),
+    ("prefix", "migr", {}),
+    ("word + status filter", "billing", {"status": TaskStatus.BLOCKED}),
+    ("page 5", "billing", {"offset": 80}),
+]
+REPEAT = 20
+
+
+def timed_ms(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return result, statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main(n_tasks: int):
+    engine, path = make_engine()
+    try:
+        start = time.perf_counter()
+        SessionFactory = seed_tasks(engine, n_tasks, text=True)
+        print(f"seeded {n_tasks:,} tasks in {time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            search.create_search_index(conn)
+        print(f"built index in {time.perf_counter() - start:.1f}s")
+
+        db = SessionFactory()
+        print(f"{'query':>22} {'hits':>5} {'p50 ms':>8} {'p95 ms':>8}")
+        for label, q, options in QUERIES:
+            offset = options.pop("offset", 0)
+            result, p50, p95 = timed_ms(
+                lambda: search.search(db, q, ["task"], limit=20, offset=offset, **options), REPEAT
+            )
+            print(f"{label:>22} {len(result['results']):>5} {p50:>8.2f} {p95:>8.2f}")
+
+        word = QUERIES[0][1]
+        _, p50, _ = timed_ms(lambda: db.query(Task.id).filter(or_(
+            Task.title.like(f"%{word}%"), Task.description.like(f"%{word}%")
+        )).limit(20).all(), 3)
+        _, full, _ = timed_ms(lambda: db.query(Task.id).filter(or_(
+            Task.title.like(f"%{word}%"), Task.description.like(f"%{word}%")
+        )).count(), 1)
+        print(f"{'LIKE first 20 (unranked)':>22} {'':>5} {p50:>8.2f}")
+        print(f"{'LIKE all matches':>22} {'':>5} {full:>8.2f}")
+        db.close()
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
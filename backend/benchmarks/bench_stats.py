@@ -0,0 +1,85 @@
+"""
+Compare the legacy in-Python /stats computation with a GROUP BY recount
+(counters.compute_counters) and the maintained counters table
+
+Usage: python -m benchmarks.bench_stats [N_TASKS ...]
+"""
+import os
+import sys
+import time
+import tracemalloc
+from models import Task, TaskStatus
+from counters import compute_counters, dashboard_stats, read_dashboard_stats, rebuild_counters
+from benchmarks.seed import make_engine, seed_tasks
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def legacy_dashboard_stats(db):
+    """The original implementation: load every Task and count in Python"""
+    all_tasks = db.query(Task).all()
+
+    stats = {
+        "total_tasks": len(all_tasks),
+        "todo_tasks": len([t for t in all_tasks if t.status == TaskStatus.TODO]),
+        "in_progress_tasks": len([t for t in all_tasks if t.status == TaskStatus.IN_PROGRESS]),
+        "completed_tasks": len([t for t in all_tasks if t.status == TaskStatus.DONE]),
+        "blocked_tasks": len([t for t in all_tasks if t.status == TaskStatus.BLOCKED]),
+        "tasks_by_user": {},
+        "tasks_by_priority": {"low": 0, "medium": 0, "high": 0, "urgent": 0}
+    }
+
+    for task in all_tasks:
+        if task.assignee:
+            user_name = task.assignee.name
+            stats["tasks_by_user"][user_name] = stats["tasks_by_user"].get(user_name, 0) + 1
+        if task.priority and task.status != TaskStatus.DONE:
+            stats["tasks_by_priority"][task.priority.value] += 1
+
+    return stats
+
+
+def recount_dashboard_stats(db):
+    """The payload from a full GROUP BY recount of the tasks table"""
+    return dashboard_stats(db, compute_counters(db))
+
+
+def measure(SessionFactory, fn):
+    """Run ``fn`` in a fresh session and return (result, seconds, peak MB)"""
+    db = SessionFactory()
+    try:
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = fn(db)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        db.close()
+    return result, elapsed, peak / (1024 * 1024)
+
+
+def main(sizes):
+    print(f"{'tasks':>10} {'legacy s':>10} {'legacy MB':>10} {'recount s':>10} {'recount MB':>10} "
+          f"{'counters s':>10} {'speedup':>8}")
+    for n in sizes:
+        engine, path = make_engine()
+        try:
+            SessionFactory = seed_tasks(engine, n)
+            db = SessionFactory()
+            rebuild_counters(db)  # seeding bypasses the flush hook
+            db.close()
+            old, old_s, old_mb = measure(SessionFactory, legacy_dashboard_stats)
+            new, new_s, new_mb = measure(SessionFactory, recount_dashboard_stats)
+            stored, stored_s, _ = measure(SessionFactory, read_dashboard_stats)
+            if not old == new == stored:
+                raise AssertionError(f"Stats mismatch at {n} tasks")
+            print(f"{n:>10} {old_s:>10.3f} {old_mb:>10.1f} {new_s:>10.3f} {new_mb:>10.1f} "
+                  f"{stored_s:>10.4f} {old_s / stored_s:>7.1f}x")
+        finally:
+            engine.dispose()
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,95 @@
+"""
+Latency of process_transcript for long meetings, single prompt vs parallel chunks
+
+Uses FakeLLMClient with a latency model that grows with prompt length, so
+no network access or API key is needed.
+
+Usage: python -m benchmarks.bench_transcript_chunks [--turns N] [--base-latency S]
+"""
+import argparse
+import random
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, User, MeetingTranscript
+import transcript_processor
+from fake_llm import FakeLLMClient
+
+SPEAKERS = ["Dylan", "Heski", "Priya", "Marcus"]
+
+
+def make_transcript(turns: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    lines = []
+    for i in range(turns):
+        speaker = rng.choice(SPEAKERS)
+        words = " ".join(rng.choice(["ship", "review", "design", "deploy", "fix", "update", "the", "api", "docs"])
+                         for _ in range(rng.randint(10, 60)))
+        lines.append(f"[{i // 60:02d}:{i % 60:02d}] {speaker}: {words}")
+        if i % 25 == 0:
+            lines.append(f"{speaker}: ACTION item {i // 25} for {rng.choice(SPEAKERS)}")
+    return "\n".join(lines)
+
+
+def responder(messages):
+    """Return one task per ACTION line in the prompt's transcript"""
+    prompt = messages[-1]["content"]
+    transcript = prompt.split("Meeting Transcript", 1)[1]
+    tasks = [
+        {"title": line.split(": ", 1)[1], "priority": "medium", "assignee_name": line.rsplit(" ", 1)[1]}
+        for line in transcript.splitlines() if ": ACTION" in line
+    ]
+    return {"summary": "Discussed items.", "new_tasks": tasks, "task_updates": []}
+
+
+def run(text: str, chunk_tokens: int, concurrency: int, base_latency: float, per_kchar: float):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user = User(name="Dylan")
+    transcript = MeetingTranscript(title="Long meeting", transcript=text)
+    db.add_all([user, transcript])
+    db.commit()
+
+    client = FakeLLMClient(
+        responder,
+        latency=lambda messages: base_latency + per_kchar * len(messages[-1]["content"]) / 1000
+    )
+    transcript_processor.CHUNK_TOKENS = chunk_tokens
+    transcript_processor.CHUNK_CONCURRENCY = concurrency
+
+    start = time.perf_counter()
+    result = transcript_processor.process_transcript(
+        transcript_text=text,
+        transcript_id=transcript.id,
+        db=db,
+        available_users=[{"id": user.id, "name": user.name}],
+        llm_client=client
+    )
+    elapsed = time.perf_counter() - start
+    db.close()
+    engine.dispose()
+    assert result["success"], result
+    return elapsed, len(client.calls), result["tasks_created"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=2_000)
+    parser.add_argument("--base-latency", type=float, default=0.5, help="seconds per LLM call")
+    parser.add_argument("--per-kchar", type=float, default=0.02, help="extra seconds per 1000 prompt chars")
+    args = parser.parse_args()
+
+    text = make_transcript(args.turns)
+    print(f"transcript: {len(text):,} chars (~{len(text) // transcript_processor.CHARS_PER_TOKEN:,} tokens)")
+    print(f"{'chunk tokens':>12} {'concurrency':>11} {'calls':>6} {'tasks':>6} {'seconds':>8}")
+
+    configs = [(10 ** 9, 1), (4_000, 1), (4_000, 4), (4_000, 8), (2_000, 8), (2_000, 16)]
+    for chunk_tokens, concurrency in configs:
+        elapsed, calls, tasks = run(text, chunk_tokens, concurrency, args.base_latency, args.per_kchar)
+        label = "whole" if chunk_tokens >= 10 ** 9 else f"{chunk_tokens:,}"
+        print(f"{label:>12} {concurrency:>11} {calls:>6} {tasks:>6} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
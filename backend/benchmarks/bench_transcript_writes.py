@@ -0,0 +1,149 @@
+"""
+Write phase of process_transcript: the original row-by-row loop vs save_results
+
+Each run applies an extraction result with N new tasks and N task updates
+to a seeded database, records the SQL statement count and elapsed time, and
+rolls back so every run starts from the same state.
+
+Usage: python -m benchmarks.bench_transcript_writes [N_ACTIONS ...]
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from sqlalchemy.orm import sessionmaker
+from database import TrackedSession
+from models import MeetingTranscript, Task, TaskStatus, TranscriptAction, User
+import counters
+from transcript_processor import save_results
+import diagnostics
+from benchmarks.seed import make_engine, seed_tasks
+
+DEFAULT_SIZES = [10, 100, 500, 1_000]
+N_TASKS = 20_000
+
+
+def legacy_save_results(db, transcript_id, result, available_users):
+    """The original implementation: flush per new task, one query per update"""
+    transcript = db.query(MeetingTranscript).filter(MeetingTranscript.id == transcript_id).first()
+    if transcript:
+        transcript.summary = result.get("summary", "")
+        transcript.processed = True
+        transcript.processed_at = datetime.utcnow()
+
+    created_tasks = []
+    for task_data in result.get("new_tasks", []):
+        assignee = None
+        assignee_name = task_data.get("assignee_name")
+        if assignee_name:
+            for user in available_users:
+                if user["name"].lower() == assignee_name.lower():
+                    assignee = user["id"]
+                    break
+        new_task = Task(
+            title=task_data["title"],
+            description=task_data.get("description", ""),
+            priority=task_data.get("priority", "medium").lower(),
+            assignee_id=assignee,
+            creator_id=available_users[0]["id"],
+            status=TaskStatus.TODO
+        )
+        db.add(new_task)
+        db.flush()
+        db.add(TranscriptAction(
+            transcript_id=transcript_id,
+            task_id=new_task.id,
+            action_type="created",
+            description=f"Created task: {task_data['title']}"
+        ))
+        created_tasks.append(new_task.id)
+
+    updated_tasks = []
+    for update_data in result.get("task_updates", []):
+        task = db.query(Task).filter(Task.id == update_data.get("task_id")).first()
+        if task:
+            action_type = update_data.get("action", "updated")
+            if action_type == "completed":
+                task.status = TaskStatus.DONE
+                task.completed_at = datetime.utcnow()
+            elif action_type == "blocked":
+                task.status = TaskStatus.BLOCKED
+            task.updated_at = datetime.utcnow()
+            db.add(TranscriptAction(
+                transcript_id=transcript_id,
+                task_id=task.id,
+                action_type=action_type,
+                description=update_data.get("note", f"Task {action_type}")
+            ))
+            updated_tasks.append(task.id)
+
+    db.flush()
+    return created_tasks, updated_tasks
+
+
+def make_result(n: int, users, seed: int = 11):
+    rng = random.Random(seed)
+    return {
+        "summary": "Weekly sync",
+        "new_tasks": [
+            {
+                "title": f"Follow-up {i}",
+                "description": "From the meeting",
+                "priority": rng.choice(["low", "medium", "high", "urgent"]),
+                "assignee_name": rng.choice(users)["name"],
+            }
+            for i in range(n)
+        ],
+        "task_updates": [
+            {"task_id": task_id, "action": rng.choice(["completed", "blocked", "updated"]), "note": "Discussed"}
+            for task_id in rng.sample(range(1, N_TASKS + 1), n)
+        ],
+    }
+
+
+def measure(SessionFactory, fn, transcript_id, result, users):
+    """Run ``fn`` and roll back; returns (statements, seconds, counter drift)"""
+    db = SessionFactory()
+    try:
+        with diagnostics.budget(max_repeats=0, label=fn.__name__) as tracker:
+            start = time.perf_counter()
+            fn(db, transcript_id, result, users)
+            db.flush()
+            elapsed = time.perf_counter() - start
+        drift = counters.verify_counters(db)
+        db.rollback()
+    finally:
+        db.close()
+    return tracker.statements, elapsed, drift
+
+
+def main(sizes):
+    engine, path = make_engine()
+    try:
+        seed_tasks(engine, N_TASKS)
+        SessionFactory = sessionmaker(bind=engine, class_=TrackedSession, autoflush=False)
+        db = SessionFactory()
+        counters.rebuild_counters(db)
+        transcript = MeetingTranscript(title="Weekly sync", transcript="...")
+        db.add(transcript)
+        db.commit()
+        transcript_id = transcript.id
+        users = [{"id": u.id, "name": u.name} for u in db.query(User).all()]
+        db.close()
+
+        print(f"{'actions':>8} {'legacy stmts':>12} {'legacy s':>9} {'bulk stmts':>10} {'bulk s':>8} {'speedup':>8}")
+        for n in sizes:
+            result = make_result(n, users)
+            old_q, old_s, old_drift = measure(SessionFactory, legacy_save_results, transcript_id, result, users)
+            new_q, new_s, new_drift = measure(SessionFactory, save_results, transcript_id, result, users)
+            if old_drift or new_drift:
+                raise AssertionError(f"Counter drift at {n} actions: {old_drift or new_drift}")
+            print(f"{2 * n:>8} {old_q:>12} {old_s:>9.3f} {new_q:>10} {new_s:>8.3f} {old_s / new_s:>7.1f}x")
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
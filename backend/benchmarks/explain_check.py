@@ -0,0 +1,106 @@
+"""
+Verify that every endpoint query is served by an index (SQLite EXPLAIN QUERY PLAN)
+
+Captures the SELECTs each endpoint issues through an in-process client, and
+those task_context.rank_tasks issues to build a transcript prompt, runs
+EXPLAIN QUERY PLAN on them and fails on any full table scan of a table that
+grows with usage.
+
+Usage: python -m benchmarks.explain_check
+(tests/test_query_plans.py runs the same check under pytest)
+"""
+import sys
+from typing import Any, List, Tuple
+import diagnostics
+from models import User
+from name_index import NameIndex
+from task_context import rank_tasks
+from benchmarks.query_budget import request_statements, seeded_client
+
+N_TASKS = 5_000
+
+# Small reference tables where a scan is expected and cheap
+SCAN_ALLOWED = {"users", "projects", "tags", "task_counters"}
+
+ENDPOINTS = [
+    "/tasks",
+    "/tasks?status=todo",
+    "/tasks?assignee_id=1",
+    "/tasks?project_id=1",
+    "/tasks?assignee_id=1&status=todo",
+    "/tasks?sort=-updated_at",
+    "/tasks/1",
+    "/transcripts",
+    "/transcripts/1",
+    "/goals",
+    "/goals/1",
+    "/stats",
+]
+
+
+def full_scans(conn, statement, parameters):
+    """Plan details that scan a growing table without an index"""
+    plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    scans = []
+    for row in plan:
+        detail = row[-1]
+        if not detail.startswith("SCAN") or "USING" in detail:
+            continue
+        # A full-text MATCH is a lookup in the virtual table's own index ("INDEX 0:M2")
+        if "VIRTUAL TABLE INDEX" in detail and not detail.endswith(":"):
+            continue
+        table = detail.split()[1]
+        if table not in SCAN_ALLOWED:
+            scans.append(detail)
+    return scans
+
+
+def endpoint_statements(client, url: str) -> List[Tuple[str, Any]]:
+    """(statement, parameters) for each statement one GET of ``url`` runs, reference cache cold"""
+    return request_statements(client, url, max_repeats=0, warm=False)
+
+
+# Hits every candidate query in task_context.rank_tasks: words in the
+# full-text index, task numbers and a mentioned assignee
+CONTEXT_TRANSCRIPT = "user3 said task 12 and task 40 are blocked; the Task 7 review slipped"
+
+
+def transcript_context_statements(SessionFactory) -> List[Tuple[str, Any]]:
+    """Statements task_context.rank_tasks runs to pick the active tasks for a transcript prompt"""
+    db = SessionFactory()
+    try:
+        users = NameIndex(db.query(User).all())
+        with diagnostics.budget(max_repeats=0, label="rank_tasks") as tracker:
+            rank_tasks(db, CONTEXT_TRANSCRIPT, users)
+    finally:
+        db.close()
+    return tracker.executed
+
+
+def plan_failures(engine, statements: List[Tuple[str, Any]]) -> List[Tuple[str, List[str]]]:
+    """(statement, full scans) for every SELECT in ``statements``"""
+    with engine.connect() as conn:
+        return [
+            (statement, full_scans(conn, statement, parameters))
+            for statement, parameters in statements
+            if statement.lstrip().upper().startswith("SELECT")
+        ]
+
+
+def main() -> int:
+    failures = 0
+    with seeded_client(N_TASKS, upgrade=True) as (client, engine, SessionFactory):
+        captured = [(url, endpoint_statements(client, url)) for url in ENDPOINTS]
+        captured.append(("task_context.rank_tasks", transcript_context_statements(SessionFactory)))
+
+        for source, statements in captured:
+            for statement, scans in plan_failures(engine, statements):
+                failures += bool(scans)
+                print(f"{'FAIL' if scans else 'ok  '} {source:<34} {' '.join(statement.split())[:70]}")
+                for detail in scans:
+                    print(f"       {detail}")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
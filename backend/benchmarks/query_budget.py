@@ -0,0 +1,119 @@
+"""
+Assert an upper bound on SQL statements per request for the list/detail endpoints
+
+Seeds a database, drives main.app in-process and fails if any endpoint issues
+more statements than its budget (e.g. after a lazy relationship load sneaks
+into serialization). Budgets do not grow with the number of rows returned.
+
+Usage: python -m benchmarks.query_budget [N_TASKS]
+(tests/test_query_budget.py runs the same check under pytest)
+"""
+import asyncio
+import os
+import sys
+from contextlib import contextmanager
+from typing import Any, List, Tuple
+import httpx
+from fastapi.testclient import TestClient
+import diagnostics
+from migrations import migrate
+from benchmarks.seed import make_engine, seed_tasks, seed_related
+
+# endpoint -> maximum number of SQL statements; selectinload fetches
+# collections in batches of 500 parent ids, and every endpoint first reads
+# table_versions for its ETag
+BUDGETS = {
+    "/tasks?limit=100": 3,
+    "/tasks?limit=1000": 5,
+    "/tasks?limit=500&fields=id,title,status,assignee": 2,
+    "/tasks/1": 3,
+    "/goals": 2,
+    "/goals/1": 2,
+    "/transcripts": 3,
+    "/transcripts/1": 3,
+}
+
+
+@contextmanager
+def seeded_client(n_tasks: int, upgrade: bool = False):
+    """
+    A TestClient for main.app over a fresh database with ``n_tasks`` seeded tasks
+
+    Yields (client, engine, session factory). ``upgrade`` runs the
+    migrations first, for the indexes they create.
+    """
+    from main import app
+    from database import get_db
+
+    engine, path = make_engine()
+    try:
+        if upgrade:
+            migrate(engine)
+        SessionFactory = seed_tasks(engine, n_tasks)
+        seed_related(engine)
+
+        def override_get_db():
+            db = SessionFactory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        yield TestClient(app), engine, SessionFactory
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+        os.remove(path)
+
+
+def get(app, url: str) -> httpx.Response:
+    """
+    GET ``url`` from ``app`` in-process, in the caller's context
+
+    Unlike a TestClient request, its statements count towards an enclosing
+    diagnostics.budget().
+    """
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            return await client.get(url)
+
+    response = asyncio.run(send())
+    response.raise_for_status()
+    return response
+
+
+def request_statements(
+    client, url: str, max_statements: int = 0, max_repeats: int = diagnostics.QUERY_REPEAT_LIMIT, warm: bool = True
+) -> List[Tuple[str, Any]]:
+    """
+    (statement, parameters) for each statement one GET of ``url`` runs
+
+    Raises QueryBudgetExceeded past ``max_statements`` or ``max_repeats``
+    (0 = no limit). ``warm`` requests ``url`` once first, so the reference
+    cache is already filled.
+    """
+    if warm:
+        get(client.app, url)
+    with diagnostics.budget(max_statements, max_repeats, label=f"GET {url}") as tracker:
+        get(client.app, url)
+    return tracker.executed
+
+
+def main(n_tasks: int) -> int:
+    failures = 0
+    with seeded_client(n_tasks) as (client, _, _):
+        for url, budget in BUDGETS.items():
+            statements = request_statements(client, url, max_repeats=0)
+            ok = len(statements) <= budget
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {url:<50} {len(statements):>4} queries (budget {budget})")
+            if not ok:
+                for statement, _ in statements:
+                    print(f"       {' '.join(statement.split())[:120]}")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000) else 0)
@@ -0,0 +1,363 @@
+"""
+Synthetic data helpers shared by the benchmarks
+
+``seed_dataset`` fills every table with a realistically skewed dataset; run
+this module to build one once (e.g. a million tasks) and reuse it with
+``bench_api --db``.
+
+Usage: python -m benchmarks.seed PATH [--tasks N] [--seed S]
+"""
+import argparse
+import itertools
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from models import (
+    Base, User, Project, Task, TaskStatus, TaskPriority, Tag, TaskTag,
+    Goal, GoalStatus, MeetingTranscript, TranscriptAction
+)
+from migrations import migrate
+import diagnostics
+import versions
+
+BATCH_SIZE = 50_000
+
+# Word pool for text=True: common words first, then a long tail, drawn with
+# Zipf-like weights so term frequencies resemble real task text
+COMMON_WORDS = (
+    "fix update review deploy add remove refactor test write docs api billing "
+    "login search dashboard report export import migrate database index cache "
+    "release bug customer invoice payment onboarding email notification mobile "
+    "design meeting follow up schedule budget roadmap metrics alert outage "
+    "security audit upgrade dependency performance latency timeout retry queue"
+).split()
+VOCABULARY = COMMON_WORDS + [f"term{i}" for i in range(5_000)]
+WORD_CUM_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+
+
+def random_text(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choices(VOCABULARY, cum_weights=WORD_CUM_WEIGHTS, k=rng.randint(low, high)))
+
+
+def make_engine(path: str = None):
+    """
+    Create a fresh SQLite database for a benchmark run
+
+    The engine is instrumented like the app's: diagnostics.budget() sees its
+    statements and writes bump the table versions.
+    """
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix="bench_", suffix=".db")
+        os.close(fd)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    diagnostics.instrument_engine(engine)
+    versions.instrument_engine(engine)
+    return engine, path
+
+
+def seed_tasks(engine, n_tasks: int, n_users: int = 50, n_projects: int = 20, seed: int = 42, text: bool = False):
+    """
+    Insert users, projects and ``n_tasks`` tasks using executemany batches
+
+    ``text`` gives tasks word-based titles and descriptions (for search).
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "name": f"user{i}", "email": f"user{i}@example.com", "created_at": now}
+            for i in range(1, n_users + 1)
+        ])
+        conn.execute(Project.__table__.insert(), [
+            {"id": i, "name": f"project{i}", "created_at": now, "archived": False}
+            for i in range(1, n_projects + 1)
+        ])
+
+    statuses = list(TaskStatus)
+    priorities = list(TaskPriority)
+    for start in range(0, n_tasks, BATCH_SIZE):
+        rows = []
+        for i in range(start, min(start + BATCH_SIZE, n_tasks)):
+            created = now - timedelta(minutes=i)
+            rows.append({
+                "title": random_text(rng, 3, 7) if text else f"Task {i}",
+                "description": random_text(rng, 10, 40) if text else "",
+                "status": rng.choice(statuses),
+                "priority": rng.choice(priorities),
+                "assignee_id": rng.randint(1, n_users) if rng.random() < 0.9 else None,
+                "creator_id": rng.randint(1, n_users),
+                "project_id": rng.randint(1, n_projects),
+                "created_at": created,
+                "updated_at": created,
+            })
+        with engine.begin() as conn:
+            conn.execute(Task.__table__.insert(), rows)
+
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def seed_related(engine, n_tags: int = 10, n_goals: int = 100, n_transcripts: int = 50, seed: int = 42):
+    """Add tags on a sample of tasks, goals and transcripts with actions"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    with engine.begin() as conn:
+        user_ids = [row[0] for row in conn.execute(User.__table__.select().with_only_columns(User.id))]
+        task_ids = [row[0] for row in conn.execute(
+            Task.__table__.select().with_only_columns(Task.id).limit(10_000)
+        )]
+
+        conn.execute(Tag.__table__.insert(), [
+            {"id": i, "name": f"tag{i}", "color": "#3B82F6"} for i in range(1, n_tags + 1)
+        ])
+        conn.execute(TaskTag.__table__.insert(), [
+            {"task_id": task_id, "tag_id": rng.randint(1, n_tags)}
+            for task_id in task_ids if rng.random() < 0.5
+        ])
+        conn.execute(Goal.__table__.insert(), [
+            {
+                "title": f"Goal {i}",
+                "status": rng.choice(list(GoalStatus)),
+                "owner_id": rng.choice(user_ids),
+                "created_at": now - timedelta(hours=i),
+                "updated_at": now,
+            }
+            for i in range(n_goals)
+        ])
+        for i in range(n_transcripts):
+            transcript_id = conn.execute(MeetingTranscript.__table__.insert().values(
+                title=f"Meeting {i}",
+                transcript=f"Speaker: notes for meeting {i}",
+                processed=True,
+                created_at=now - timedelta(days=i),
+            )).inserted_primary_key[0]
+            conn.execute(TranscriptAction.__table__.insert(), [
+                {
+                    "transcript_id": transcript_id,
+                    "task_id": rng.choice(task_ids) if task_ids else None,
+                    "action_type": "created",
+                    "description": "Created task",
+                    "created_at": now,
+                }
+                for _ in range(5)
+            ])
+
+
+# ============================================================================
+# REALISTIC DATASET
+# ============================================================================
+
+FIRST_NAMES = (
+    "Alice Bob Carmen Dylan Elena Farid Grace Heski Ines Jonas Kenji Laila Marco Nadia Omar Priya "
+    "Quinn Rosa Samir Tara Uma Victor Wen Xavier Yara Zoe Aaron Bianca Chidi Dana"
+).split()
+LAST_NAMES = (
+    "Adams Baker Chen Diaz Evans Fischer Garcia Haddad Ito Jensen Kowalski Lopez Moreau Nguyen "
+    "Okafor Patel Quist Redfield Silva Tanaka Umar Varga Weber Xu Yilmaz Zhang Abbott Brennan Costa Dubois"
+).split()
+
+# Status mix by age: recent work is mostly open, work older than
+# STATUS_SETTLE_DAYS is mostly done (weights follow TaskStatus order)
+RECENT_STATUS_WEIGHTS = (45, 25, 10, 12, 8)   # todo, in_progress, in_review, done, blocked
+SETTLED_STATUS_WEIGHTS = (8, 4, 2, 82, 4)
+STATUS_SETTLE_DAYS = 30
+PRIORITY_WEIGHTS = (20, 50, 22, 8)            # low, medium, high, urgent
+TAGS_PER_TASK_WEIGHTS = (35, 40, 18, 7)       # 0, 1, 2 or 3 tags
+UNASSIGNED_SHARE = 0.15
+HISTORY_DAYS = 365
+
+
+def zipf_cum_weights(n: int, exponent: float = 1.1) -> list:
+    """Cumulative weights giving rank r a share proportional to 1 / r^exponent"""
+    return list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(n)))
+
+
+def person_names(n: int) -> list:
+    """``n`` distinct "First Last" names, numbered once the combinations run out"""
+    names = [f"{first} {last}" for last in LAST_NAMES for first in FIRST_NAMES]
+    return [names[i] if i < len(names) else f"{names[i % len(names)]} {i // len(names) + 1}" for i in range(n)]
+
+
+def _status_tables() -> list:
+    """Cumulative status weights for each task age in days, up to STATUS_SETTLE_DAYS"""
+    tables = []
+    for day in range(STATUS_SETTLE_DAYS + 1):
+        mix = day / STATUS_SETTLE_DAYS
+        weights = [recent * (1 - mix) + settled * mix for recent, settled in zip(RECENT_STATUS_WEIGHTS, SETTLED_STATUS_WEIGHTS)]
+        tables.append(list(itertools.accumulate(weights)))
+    return tables
+
+
+def seed_dataset(
+    engine,
+    n_tasks: int,
+    n_users: int = None,
+    n_projects: int = None,
+    n_tags: int = 30,
+    n_goals: int = None,
+    n_transcripts: int = None,
+    seed: int = 42,
+    text: bool = True,
+    progress=None,
+):
+    """
+    Fill every table with a skewed dataset of ``n_tasks`` tasks spread over a year
+
+    Assignees, creators, projects and tags follow Zipf-like popularity, so a
+    few users and projects own most of the work; recent tasks are mostly
+    open and old ones mostly done. Other volumes scale with ``n_tasks``
+    unless given. ``progress(table, rows)`` is called after each batch.
+    Returns a sessionmaker bound to ``engine``.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    n_users = n_users or min(5_000, max(20, n_tasks // 200))
+    n_projects = n_projects or max(5, n_users // 5)
+    n_goals = n_goals or max(50, n_tasks // 100)
+    n_transcripts = n_transcripts or max(20, n_tasks // 1_000)
+    report = progress or (lambda table, rows: None)
+
+    user_ids = list(range(1, n_users + 1))
+    project_ids = list(range(1, n_projects + 1))
+    tag_ids = list(range(1, n_tags + 1))
+    # Popularity rank is independent of id order
+    busy_users = rng.sample(user_ids, n_users)
+    busy_projects = rng.sample(project_ids, n_projects)
+    user_weights = zipf_cum_weights(n_users)
+    project_weights = zipf_cum_weights(n_projects)
+    tag_weights = zipf_cum_weights(n_tags)
+
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": user_id, "name": name, "email": f"{name.lower().replace(' ', '.')}@example.com",
+             "created_at": now - timedelta(days=HISTORY_DAYS)}
+            for user_id, name in zip(user_ids, person_names(n_users))
+        ])
+        conn.execute(Project.__table__.insert(), [
+            {"id": project_id, "name": f"{random_text(rng, 1, 2).title()} {project_id}",
+             "created_at": now - timedelta(days=HISTORY_DAYS), "archived": rng.random() < 0.1}
+            for project_id in project_ids
+        ])
+        conn.execute(Tag.__table__.insert(), [
+            {"id": tag_id, "name": f"{COMMON_WORDS[tag_id % len(COMMON_WORDS)]}-{tag_id}", "color": "#3B82F6"}
+            for tag_id in tag_ids
+        ])
+        first_id = (conn.execute(select(func.max(Task.id))).scalar() or 0) + 1
+    report("users", n_users)
+
+    statuses = list(TaskStatus)
+    priorities = list(TaskPriority)
+    status_tables = _status_tables()
+    priority_weights = list(itertools.accumulate(PRIORITY_WEIGHTS))
+    tag_counts = list(itertools.accumulate(TAGS_PER_TASK_WEIGHTS))
+    history = timedelta(days=HISTORY_DAYS).total_seconds()
+
+    for start in range(0, n_tasks, BATCH_SIZE):
+        tasks, task_tags = [], []
+        for i in range(start, min(start + BATCH_SIZE, n_tasks)):
+            task_id = first_id + i
+            age = history * (1 - i / n_tasks) * rng.uniform(0.98, 1.0)  # ids grow with created_at
+            created = now - timedelta(seconds=age)
+            status = rng.choices(statuses, cum_weights=status_tables[min(int(age // 86400), STATUS_SETTLE_DAYS)])[0]
+            updated = created + timedelta(seconds=age * rng.random() ** 3)
+            tasks.append({
+                "id": task_id,
+                "title": random_text(rng, 3, 8) if text else f"Task {task_id}",
+                "description": random_text(rng, 10, 60) if text else "",
+                "status": status,
+                "priority": rng.choices(priorities, cum_weights=priority_weights)[0],
+                "assignee_id": None if rng.random() < UNASSIGNED_SHARE
+                else rng.choices(busy_users, cum_weights=user_weights)[0],
+                "creator_id": rng.choices(busy_users, cum_weights=user_weights)[0],
+                "project_id": rng.choices(busy_projects, cum_weights=project_weights)[0],
+                "created_at": created,
+                "updated_at": updated,
+                "due_date": created + timedelta(days=rng.randint(1, 60)) if rng.random() < 0.4 else None,
+                "completed_at": updated if status == TaskStatus.DONE else None,
+            })
+            n = rng.choices(range(len(TAGS_PER_TASK_WEIGHTS)), cum_weights=tag_counts)[0]
+            for tag_id in set(rng.choices(tag_ids, cum_weights=tag_weights, k=n)):
+                task_tags.append({"task_id": task_id, "tag_id": tag_id})
+        with engine.begin() as conn:
+            conn.execute(Task.__table__.insert(), tasks)
+            if task_tags:
+                conn.execute(TaskTag.__table__.insert(), task_tags)
+        report("tasks", start + len(tasks))
+
+    goal_statuses = list(GoalStatus)
+    with engine.begin() as conn:
+        conn.execute(Goal.__table__.insert(), [
+            {
+                "title": random_text(rng, 3, 6).capitalize(),
+                "description": random_text(rng, 5, 20),
+                "status": rng.choices(goal_statuses, weights=(25, 45, 20, 10))[0],
+                "owner_id": rng.choices(busy_users, cum_weights=user_weights)[0],
+                "created_at": now - timedelta(days=rng.uniform(0, HISTORY_DAYS)),
+                "updated_at": now - timedelta(days=rng.uniform(0, 30)),
+                "target_date": now + timedelta(days=rng.randint(-60, 180)),
+            }
+            for _ in range(n_goals)
+        ])
+    report("goals", n_goals)
+
+    names = dict(zip(user_ids, person_names(n_users)))
+    last_id = first_id + n_tasks - 1
+    for i in range(n_transcripts):
+        speakers = [names[user_id] for user_id in rng.choices(busy_users, cum_weights=user_weights, k=4)]
+        lines = [f"{rng.choice(speakers)}: {random_text(rng, 8, 25)}" for _ in range(rng.randint(20, 80))]
+        with engine.begin() as conn:
+            transcript_id = conn.execute(MeetingTranscript.__table__.insert().values(
+                title=f"{random_text(rng, 1, 3).title()} sync",
+                transcript="\n".join(lines),
+                summary=random_text(rng, 15, 40),
+                processed=True,
+                created_at=now - timedelta(days=HISTORY_DAYS * i / n_transcripts),
+                processed_at=now - timedelta(days=HISTORY_DAYS * i / n_transcripts),
+            )).inserted_primary_key[0]
+            actions = [
+                {
+                    "transcript_id": transcript_id,
+                    "task_id": rng.randint(first_id, last_id) if n_tasks else None,
+                    "action_type": rng.choice(("created", "completed", "blocked", "updated")),
+                    "description": random_text(rng, 3, 10),
+                    "created_at": now,
+                }
+                for _ in range(rng.randint(0, 8))
+            ]
+            if actions:
+                conn.execute(TranscriptAction.__table__.insert(), actions)
+    report("transcripts", n_transcripts)
+
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a benchmark database with seed_dataset")
+    parser.add_argument("path")
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        os.remove(args.path)
+    engine, _ = make_engine(args.path)
+    migrate(engine)
+    started = time.perf_counter()
+
+    def progress(table, rows):
+        print(f"  {table}: {rows:,} ({time.perf_counter() - started:.0f}s)")
+
+    seed_dataset(engine, args.tasks, seed=args.seed, progress=progress)
+    engine.dispose()
+    print(f"Seeded {args.path} in {time.perf_counter() - started:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
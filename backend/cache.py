@@ -0,0 +1,401 @@
+"""
+Pluggable cache backends shared by the app's worker processes
+
+Each uvicorn worker (or replica) otherwise has its own cold caches and its
+own idea of what was invalidated. Backends, chosen with CACHE_BACKEND:
+
+- ``memory``: a dict in this process (the default; one worker)
+- ``sqlite``: a WAL-mode SQLite file (CACHE_URL is its path), shared by the
+  workers on one host
+- ``redis``: any server speaking the Redis protocol at CACHE_URL
+  (redis://[:password@]host:port/db); only GET/MGET/SET/DEL/INCR are used
+
+``Namespace`` adds versioned keys on top: bumping a namespace's version
+(one INCR in the shared store) invalidates every entry for all workers at
+once, and ``get_or_set`` lets one caller rebuild a missing entry while the
+others wait for it instead of stampeding the database.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  # "memory", "sqlite" or "redis"
+CACHE_URL = os.getenv("CACHE_URL", "")
+CACHE_LOCK_TIMEOUT = float(os.getenv("CACHE_LOCK_TIMEOUT", "5"))  # seconds a rebuild may hold its lock
+CACHE_DEFAULT_TTL = float(os.getenv("CACHE_DEFAULT_TTL", "3600"))  # also reaps entries orphaned by a bump
+CACHE_MEMORY_ENTRIES = int(os.getenv("CACHE_MEMORY_ENTRIES", "100000"))
+
+MISSING = object()
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class MemoryBackend:
+    """Process-local LRU store; values are strings, ``ttl`` in seconds"""
+
+    def __init__(self, max_entries: int = CACHE_MEMORY_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _put(self, key: str, value: str, expires_at: Optional[float]) -> None:
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def _live(self, key: str, now: float) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._live(key, time.monotonic())
+
+    def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        with self._lock:
+            now = time.monotonic()
+            return [self._live(key, now) for key in keys]
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._put(key, value, time.monotonic() + ttl if ttl else None)
+
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        """Set ``key`` only if it is absent; True if this call set it"""
+        with self._lock:
+            now = time.monotonic()
+            if self._live(key, now) is not None:
+                return False
+            self._put(key, value, now + ttl if ttl else None)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._live(key, time.monotonic()) or 0) + 1
+            self._put(key, str(value), None)
+            return value
+
+
+class SQLiteBackend:
+    """Store in a SQLite file, one connection per thread, shared across processes"""
+
+    PURGE_EVERY = 1000  # sets between sweeps of expired rows
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._sets = 0
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _expiry(ttl: Optional[float]) -> Optional[float]:
+        return time.time() + ttl if ttl else None
+
+    def get(self, key: str) -> Optional[str]:
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        if not keys:
+            return []
+        now = time.time()
+        rows = self._conn().execute(
+            f"SELECT key, value FROM cache WHERE key IN ({','.join('?' * len(keys))}) "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            (*keys, now),
+        ).fetchall()
+        found = dict(rows)
+        return [found.get(key) for key in keys]
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO cache (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (key, value, self._expiry(ttl)),
+        )
+        self._sets += 1
+        if self._sets % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?", (key, time.time()))
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, self._expiry(ttl)),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def incr(self, key: str) -> int:
+        row = self._conn().execute(
+            "INSERT INTO cache (key, value, expires_at) VALUES (?, '1', NULL) "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1 RETURNING value",
+            (key,),
+        ).fetchone()
+        return int(row[0])
+
+
+class RedisError(Exception):
+    """Error reply from the server"""
+
+
+class RedisBackend:
+    """Minimal RESP client for the handful of commands the cache needs"""
+
+    def __init__(self, url: str, timeout: float = 2.0):
+        parsed = urlparse(url or "redis://localhost:6379/0")
+        self.address = (parsed.hostname or "localhost", parsed.port or 6379)
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, timeout=self.timeout)
+        self._local.sock, self._local.reader = sock, sock.makefile("rb")
+        if self.password:
+            self._write("AUTH", self.password)
+            self._read()
+        if self.db:
+            self._write("SELECT", self.db)
+            self._read()
+
+    def _disconnect(self):
+        sock, self._local.sock = getattr(self._local, "sock", None), None
+        if sock is not None:
+            self._local.reader.close()
+            sock.close()
+
+    def _write(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._local.sock.sendall(b"".join(parts))
+
+    def _read(self):
+        line = self._local.reader.readline()
+        if not line:
+            raise ConnectionError("Cache server closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._local.reader.read(length + 2)[:-2]
+            return data.decode()
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [self._read() for _ in range(length)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def _command(self, *args):
+        """
+        Send one command and read its reply
+
+        Only a refused or reset connection before the command was written is
+        retried (once, on a new connection): after that the server may have
+        run it, and running INCR twice is worse than an error. Any other
+        failure leaves the reply stream out of step, so the socket is closed.
+        """
+        for attempt in (1, 2):
+            try:
+                if getattr(self._local, "sock", None) is None:
+                    self._connect()
+                self._write(*args)
+                break
+            except ConnectionError:
+                self._disconnect()
+                if attempt == 2:
+                    raise
+            except Exception:
+                self._disconnect()
+                raise
+        try:
+            return self._read()
+        except RedisError:
+            raise
+        except Exception:
+            self._disconnect()
+            raise
+
+    @staticmethod
+    def _px(ttl: Optional[float]) -> tuple:
+        return ("PX", max(1, int(ttl * 1000))) if ttl else ()
+
+    def get(self, key: str) -> Optional[str]:
+        return self._command("GET", key)
+
+    def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        return self._command("MGET", *keys) if keys else []
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self._command("SET", key, value, *self._px(ttl))
+
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        return self._command("SET", key, value, "NX", *self._px(ttl)) == "OK"
+
+    def delete(self, key: str) -> None:
+        self._command("DEL", key)
+
+    def incr(self, key: str) -> int:
+        return self._command("INCR", key)
+
+
+def make_backend(kind: str = CACHE_BACKEND, url: str = CACHE_URL):
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(url or "cache.db")
+    if kind == "redis":
+        return RedisBackend(url)
+    raise ValueError(f"Unknown CACHE_BACKEND: {kind} (use memory, sqlite or redis)")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Process-wide backend configured by CACHE_BACKEND / CACHE_URL"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = make_backend()
+    return _backend
+
+
+# ============================================================================
+# NAMESPACES
+# ============================================================================
+
+class Namespace:
+    """
+    JSON values under ``<name>:<version>:<key>`` in a shared backend
+
+    ``bump`` moves every worker to a new version, orphaning the old entries;
+    every entry gets a TTL (``default_ttl`` unless given) so orphans expire.
+    """
+
+    def __init__(self, name: str, backend=None, default_ttl: float = CACHE_DEFAULT_TTL, lock_timeout: float = CACHE_LOCK_TIMEOUT):
+        self.name = name
+        self.backend = backend or get_backend()
+        self.default_ttl = default_ttl
+        self.lock_timeout = lock_timeout
+        self._stats_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "rebuilds": 0, "lock_waits": 0}
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def version(self) -> int:
+        return int(self.backend.get(f"{self.name}:version") or 0)
+
+    def bump(self) -> int:
+        """Invalidate the whole namespace for every process sharing the backend"""
+        return self.backend.incr(f"{self.name}:version")
+
+    def _key(self, version: int, key: Any) -> str:
+        return f"{self.name}:{version}:{key}"
+
+    def _fetch(self, key: Any, version: int) -> Any:
+        raw = self.backend.get(self._key(version, key))
+        return MISSING if raw is None else json.loads(raw)
+
+    def get(self, key: Any, version: Optional[int] = None) -> Any:
+        """The cached value, or MISSING"""
+        value = self._fetch(key, self.version() if version is None else version)
+        self._count("misses" if value is MISSING else "hits")
+        return value
+
+    def get_many(self, keys: Iterable[Any], version: Optional[int] = None) -> Dict[Any, Any]:
+        """Cached values for the keys that are present"""
+        keys = list(keys)
+        version = self.version() if version is None else version
+        raws = self.backend.get_many([self._key(version, key) for key in keys])
+        found = {key: json.loads(raw) for key, raw in zip(keys, raws) if raw is not None}
+        self._count("hits", len(found))
+        self._count("misses", len(keys) - len(found))
+        return found
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None, version: Optional[int] = None) -> None:
+        version = self.version() if version is None else version
+        self.backend.set(self._key(version, key), json.dumps(value), ttl or self.default_ttl)
+
+    def get_or_set(self, key: Any, loader: Callable[[], Any], ttl: Optional[float] = None, version: Optional[int] = None) -> Any:
+        """
+        Cached value, or ``loader()`` stored for everyone
+
+        Only the caller holding the rebuild lock runs the loader; the others
+        poll for its result, and give up waiting (and load themselves) after
+        ``lock_timeout`` in case the holder died.
+        """
+        version = self.version() if version is None else version
+        value = self.get(key, version)
+        if value is not MISSING:
+            return value
+
+        lock = f"{self.name}:lock:{version}:{key}"
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.005
+        while not self.backend.add(lock, "1", self.lock_timeout):
+            self._count("lock_waits")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+            value = self._fetch(key, version)
+            if value is not MISSING:
+                return value
+            if time.monotonic() >= deadline:
+                return loader()
+        try:
+            value = loader()
+            self.set(key, value, ttl, version)
+            self._count("rebuilds")
+            return value
+        finally:
+            self.backend.delete(lock)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {"version": self.version(), **self.stats}
@@ -0,0 +1,353 @@
+"""
+In-process change feed for live dashboards
+
+Committed writes to tasks, goals and transcripts become compact change
+events ({token, entity, op, id, fields}) that are broadcast to subscribers
+of GET /events (server-sent events) and the /events/ws WebSocket.
+
+Subscriptions may be filtered by project and assignee. Task updates carry
+the ``previous`` values of those fields when they changed, so a subscriber
+whose filter the task no longer matches gets the update as ``removed``.
+
+ORM writes on a ``SessionLocal`` session are picked up by session hooks;
+bulk statements that bypass the unit of work call ``record`` themselves.
+Events are only published once the transaction commits.
+
+Each subscriber has a bounded queue. A subscriber that falls behind gets a
+single ``reset`` event instead of the backlog and should refetch. Recent
+events are kept in a ring buffer so a client can reconnect with ``since=``
+(its last token) and receive just what it missed; a token from another
+process lifetime, or older than the buffer, also yields ``reset``.
+"""
+import asyncio
+import json
+import os
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import inspect
+
+from models import Goal, MeetingTranscript, Task
+
+CHANGEFEED_BUFFER = int(os.getenv("CHANGEFEED_BUFFER", "10000"))  # events kept for since= resume
+CHANGEFEED_QUEUE_SIZE = int(os.getenv("CHANGEFEED_QUEUE_SIZE", "1000"))  # per subscriber
+CHANGEFEED_HEARTBEAT = float(os.getenv("CHANGEFEED_HEARTBEAT", "15"))  # seconds
+
+ENTITIES = ("task", "goal", "transcript")
+
+# model -> (entity name, fields included in its events)
+TRACKED = {
+    Task: ("task", ("title", "status", "priority", "assignee_id", "project_id")),
+    Goal: ("goal", ("title", "status", "owner_id")),
+    MeetingTranscript: ("transcript", ("title", "processed")),
+}
+
+# Task fields subscriptions filter on; updates record their previous values
+FILTERED = ("project_id", "assignee_id")
+
+PENDING = "changefeed_pending"
+
+
+def _plain(value: Any) -> Any:
+    return getattr(value, "value", value)
+
+
+# ============================================================================
+# BROADCASTER
+# ============================================================================
+
+class Subscription:
+    """One client's filtered view of the feed, drained from its event loop"""
+
+    def __init__(
+        self,
+        broadcaster: "Broadcaster",
+        loop: asyncio.AbstractEventLoop,
+        types: Optional[Set[str]] = None,
+        project_id: Optional[int] = None,
+        assignee_id: Optional[int] = None,
+        queue_size: int = CHANGEFEED_QUEUE_SIZE,
+    ):
+        self.broadcaster = broadcaster
+        self.loop = loop
+        self.types = types
+        self.project_id = project_id
+        self.assignee_id = assignee_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def _in_filter(self, fields: Dict[str, Any]) -> bool:
+        return (
+            (self.project_id is None or fields.get("project_id") == self.project_id)
+            and (self.assignee_id is None or fields.get("assignee_id") == self.assignee_id)
+        )
+
+    def view(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        ``event`` as this subscriber sees it, or None if it is filtered out
+
+        A task update that moves the task out of the subscriber's project or
+        assignee filter is sent as ``removed``.
+        """
+        if event["op"] == "reset":
+            return event
+        if self.types and event["entity"] not in self.types:
+            return None
+        if event["entity"] != "task" or event["op"] not in ("created", "updated"):
+            return event
+        fields = event.get("fields", {})
+        if self._in_filter(fields):
+            return event
+        if event["op"] == "updated" and self._in_filter({**fields, **event.get("previous", {})}):
+            return {**event, "op": "removed"}
+        return None
+
+    def offer(self, events: List[Dict[str, Any]]) -> None:
+        """Hand events over from any thread"""
+        self.loop.call_soon_threadsafe(self._enqueue, events)
+
+    def _enqueue(self, events: List[Dict[str, Any]]) -> None:
+        for event in events:
+            event = self.view(event)
+            if event is None:
+                continue
+            if self.queue.full():
+                # Too slow to keep up: replace the backlog with one reset
+                self.dropped += self.queue.qsize()
+                while not self.queue.empty():
+                    self.queue.get_nowait()
+                self.queue.put_nowait(self.broadcaster.reset_event())
+                continue
+            self.queue.put_nowait(event)
+
+    async def next_event(self, timeout: float = CHANGEFEED_HEARTBEAT) -> Optional[Dict[str, Any]]:
+        """The next event, or None after ``timeout`` seconds (time for a heartbeat)"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.broadcaster.unsubscribe(self)
+
+
+class Broadcaster:
+    """Sequences committed changes and fans them out to subscriptions"""
+
+    def __init__(self, buffer_size: int = CHANGEFEED_BUFFER):
+        self.boot_id = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self._subscriptions: Set[Subscription] = set()
+
+    def token(self, seq: int) -> str:
+        return f"{self.boot_id}-{seq}"
+
+    def reset_event(self) -> Dict[str, Any]:
+        return {"token": self.token(self._seq), "op": "reset"}
+
+    def publish(self, changes: Iterable[Dict[str, Any]]) -> None:
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            events = []
+            for change in changes:
+                self._seq += 1
+                event = {"token": self.token(self._seq), "ts": now, **change}
+                self._buffer.append(event)
+                events.append(event)
+            subscriptions = list(self._subscriptions)
+        if not events:
+            return
+        for subscription in subscriptions:
+            try:
+                subscription.offer(events)
+            except RuntimeError:
+                # The subscriber's event loop is gone
+                self.unsubscribe(subscription)
+
+    def subscribe(self, since: Optional[str] = None, **filters) -> Subscription:
+        """Register a subscription on the running loop, pre-filled with events after ``since``"""
+        subscription = Subscription(self, asyncio.get_running_loop(), **filters)
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if since is not None:
+                backlog = self._backlog(since)
+                if backlog is None:
+                    subscription._enqueue([self.reset_event()])
+                else:
+                    subscription._enqueue(backlog)
+        return subscription
+
+    def _backlog(self, since: str) -> Optional[List[Dict[str, Any]]]:
+        """Buffered events after ``since``, or None if the gap cannot be filled"""
+        boot_id, _, seq = since.rpartition("-")
+        if boot_id != self.boot_id or not seq.isdigit() or int(seq) > self._seq:
+            return None
+        seq = int(seq)
+        oldest = self._seq - len(self._buffer) + 1
+        if seq + 1 < oldest:
+            return None
+        return list(self._buffer)[seq + 1 - oldest:]
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "token": self.token(self._seq),
+                "buffered": len(self._buffer),
+                "subscribers": len(self._subscriptions),
+                "dropped": sum(s.dropped for s in self._subscriptions),
+            }
+
+
+broadcaster = Broadcaster()
+
+
+# ============================================================================
+# SESSION HOOKS
+# ============================================================================
+
+def record(session, entity: str, op: str, id: Optional[int], previous: Optional[Dict[str, Any]] = None, **fields) -> None:
+    """Queue a change on ``session``; it is published when the session commits"""
+    change = {"entity": entity, "op": op, "id": id}
+    if fields:
+        change["fields"] = {key: _plain(value) for key, value in fields.items()}
+    if previous:
+        change["previous"] = {key: _plain(value) for key, value in previous.items()}
+    session.info.setdefault(PENDING, []).append(change)
+
+
+def record_task(
+    session, op: str, task_id: int, values: Dict[str, Any], previous: Optional[Dict[str, Any]] = None
+) -> None:
+    """
+    ``record`` for a task written with a bulk statement, given its column
+    values (and for an update, the values it had before)
+    """
+    changed = {
+        name: previous.get(name) for name in FILTERED
+        if previous is not None and previous.get(name) != values.get(name)
+    }
+    record(session, "task", op, task_id, changed, **{name: values.get(name) for name in TRACKED[Task][1]})
+
+
+def _previous_filtered(obj) -> Dict[str, Any]:
+    """Loaded values of a task's FILTERED fields that this flush changes"""
+    state = inspect(obj)
+    previous = {}
+    for name in FILTERED:
+        history = state.attrs[name].history
+        if history.deleted:
+            previous[name] = history.deleted[0]
+    return previous
+
+
+def _record_object(session, obj, op: str) -> None:
+    tracked = TRACKED.get(type(obj))
+    if tracked is None:
+        return
+    entity, names = tracked
+    fields = {} if op == "deleted" else {name: getattr(obj, name) for name in names}
+    previous = _previous_filtered(obj) if op == "updated" and isinstance(obj, Task) else None
+    record(session, entity, op, obj.id, previous, **fields)
+
+
+def track_flush(session, flush_context) -> None:
+    """after_flush hook: queue changes for tracked objects in this flush"""
+    for obj in session.new:
+        _record_object(session, obj, "created")
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            _record_object(session, obj, "updated")
+    for obj in session.deleted:
+        _record_object(session, obj, "deleted")
+
+
+def _coalesce(changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One change per row: created+updated stays created, created+deleted vanishes"""
+    merged: Dict[tuple, Dict[str, Any]] = {}
+    for change in changes:
+        if change["id"] is None:
+            merged[(change["entity"], id(change))] = change
+            continue
+        key = (change["entity"], change["id"])
+        previous = merged.get(key)
+        if previous is None:
+            merged[key] = change
+        elif previous["op"] == "created" and change["op"] == "deleted":
+            del merged[key]
+        elif previous["op"] == "created":
+            merged[key] = {name: value for name, value in change.items() if name != "previous"}
+            merged[key]["op"] = "created"
+        else:
+            # Keep the earliest previous values: those before the transaction
+            earlier = {**change.get("previous", {}), **previous.get("previous", {})}
+            merged[key] = {**change, "previous": earlier} if earlier else change
+    return list(merged.values())
+
+
+def publish_committed(session) -> None:
+    """after_commit hook"""
+    changes = session.info.pop(PENDING, None)
+    if changes:
+        broadcaster.publish(_coalesce(changes))
+
+
+def discard_pending(session, transaction) -> None:
+    """after_transaction_end hook: drop changes of a transaction that did not commit"""
+    if transaction.parent is None:
+        session.info.pop(PENDING, None)
+
+
+def parse_types(types: Optional[str]) -> Optional[Set[str]]:
+    """Comma-separated entity names from a query string; ValueError if unknown"""
+    if not types:
+        return None
+    selected = {name.strip() for name in types.split(",") if name.strip()}
+    unknown = selected - set(ENTITIES)
+    if unknown:
+        raise ValueError(f"Unknown event types: {', '.join(sorted(unknown))}")
+    return selected
+
+
+# ============================================================================
+# TRANSPORTS
+# ============================================================================
+
+async def sse_stream(subscription: Subscription, request):
+    """Server-sent events: ``id`` is the resume token, ``event`` is change or reset"""
+    try:
+        yield "retry: 3000\n\n"
+        while not await request.is_disconnected():
+            event = await subscription.next_event()
+            if event is None:
+                yield ": ping\n\n"
+                continue
+            kind = "reset" if event["op"] == "reset" else "change"
+            yield f"id: {event['token']}\nevent: {kind}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        subscription.close()
+
+
+async def websocket_stream(subscription: Subscription, websocket) -> None:
+    """Send events as JSON messages, with {"op": "ping"} heartbeats, until the client leaves"""
+    async def send():
+        while True:
+            event = await subscription.next_event()
+            await websocket.send_json(event if event is not None else {"op": "ping"})
+
+    sender = asyncio.ensure_future(send())
+    try:
+        # Clients don't send anything; receiving is how a disconnect is noticed
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        sender.cancel()
+        subscription.close()
@@ -0,0 +1,245 @@
+"""
+Incrementally maintained task counters backing GET /stats
+
+Every flush of a ``SessionLocal`` session that inserts, updates or deletes a
+Task adjusts the rows of the ``task_counters`` table inside the same
+transaction, so reading the dashboard stats never scans the tasks table.
+Writes that bypass the ORM unit of work (bulk INSERT/UPDATE statements) must
+call ``apply_deltas`` themselves.
+
+Usage: python counters.py [verify|rebuild]
+"""
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import func, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from models import Task, TaskCounter, User, TaskStatus, TaskPriority
+
+STATUS = "status"
+PRIORITY = "priority"  # open (not done) tasks only, matching the dashboard
+ASSIGNEE = "assignee"
+
+CounterKey = Tuple[str, str]
+
+# Dialects with INSERT .. ON CONFLICT DO UPDATE
+UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def task_keys(status, priority, assignee_id) -> List[CounterKey]:
+    """Counter keys a task with the given column values contributes to"""
+    status = TaskStatus(status) if status is not None else TaskStatus.TODO
+    keys = [(STATUS, status.value)]
+    if priority is not None and status != TaskStatus.DONE:
+        keys.append((PRIORITY, TaskPriority(priority).value))
+    if assignee_id is not None:
+        keys.append((ASSIGNEE, str(assignee_id)))
+    return keys
+
+
+def task_delta(old: Optional[List[CounterKey]], new: Optional[List[CounterKey]]) -> Counter:
+    """Counter deltas for a task moving from ``old`` keys to ``new`` keys"""
+    delta = Counter()
+    for key in old or []:
+        delta[key] -= 1
+    for key in new or []:
+        delta[key] += 1
+    return delta
+
+
+def apply_deltas(connection, deltas: Counter) -> None:
+    """Add ``deltas`` to the counter rows, creating missing rows"""
+    table = TaskCounter.__table__
+    rows = [
+        {"dimension": dimension, "key": key, "count": delta}
+        for (dimension, key), delta in sorted(deltas.items())
+        if delta
+    ]
+    if not rows:
+        return
+    dialect = connection.dialect.name
+    if dialect in UPSERT_DIALECTS:
+        # One executemany upsert instead of an UPDATE (and maybe INSERT) per key
+        statement = UPSERT_DIALECTS[dialect](table)
+        connection.execute(
+            statement.on_conflict_do_update(
+                index_elements=[table.c.dimension, table.c.key],
+                set_={"count": table.c.count + statement.excluded.count},
+            ),
+            rows,
+        )
+        return
+    for row in rows:
+        result = connection.execute(
+            table.update()
+            .where(table.c.dimension == row["dimension"], table.c.key == row["key"])
+            .values(count=table.c.count + row["count"])
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+
+def _previous_value(task: Task, attr: str):
+    """Value of ``attr`` as last loaded from the database"""
+    history = inspect(task).attrs[attr].load_history()
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+
+def _previous_keys(task: Task) -> List[CounterKey]:
+    return task_keys(
+        _previous_value(task, "status"),
+        _previous_value(task, "priority"),
+        _previous_value(task, "assignee_id"),
+    )
+
+
+def track_task_changes(session, flush_context, instances):
+    """before_flush hook folding pending Task inserts, updates and deletes into the counters"""
+    deltas = Counter()
+
+    for obj in session.new:
+        if isinstance(obj, Task):
+            # priority's column default is only applied at INSERT time
+            priority = obj.priority if obj.priority is not None else TaskPriority.MEDIUM
+            deltas.update(task_delta(None, task_keys(obj.status, priority, obj.assignee_id)))
+
+    for obj in session.dirty:
+        if isinstance(obj, Task) and session.is_modified(obj):
+            new = task_keys(obj.status, obj.priority, obj.assignee_id)
+            deltas.update(task_delta(_previous_keys(obj), new))
+
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            deltas.update(task_delta(_previous_keys(obj), None))
+
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+def compute_counters(db: Session) -> Counter:
+    """Recompute every counter from the tasks table"""
+    counts = Counter()
+    for status, count in db.query(Task.status, func.count(Task.id)).group_by(Task.status):
+        counts[(STATUS, status.value)] = count
+    open_priorities = (
+        db.query(Task.priority, func.count(Task.id))
+        .filter(Task.priority.isnot(None), Task.status != TaskStatus.DONE)
+        .group_by(Task.priority)
+    )
+    for priority, count in open_priorities:
+        counts[(PRIORITY, priority.value)] = count
+    assignees = (
+        db.query(Task.assignee_id, func.count(Task.id))
+        .filter(Task.assignee_id.isnot(None))
+        .group_by(Task.assignee_id)
+    )
+    for assignee_id, count in assignees:
+        counts[(ASSIGNEE, str(assignee_id))] = count
+    return counts
+
+
+def stored_counters(db: Session) -> Counter:
+    """Current contents of the counters table"""
+    return Counter({
+        (dimension, key): count
+        for dimension, key, count in db.query(TaskCounter.dimension, TaskCounter.key, TaskCounter.count)
+    })
+
+
+def verify_counters(db: Session) -> List[Dict[str, Any]]:
+    """Compare stored counters against a full recount and return any drift"""
+    stored = stored_counters(db)
+    actual = compute_counters(db)
+    drift = []
+    for dimension, key in sorted(set(stored) | set(actual)):
+        if stored[(dimension, key)] != actual[(dimension, key)]:
+            drift.append({
+                "dimension": dimension,
+                "key": key,
+                "stored": stored[(dimension, key)],
+                "actual": actual[(dimension, key)],
+            })
+    return drift
+
+
+def rebuild_counters(db: Session) -> List[Dict[str, Any]]:
+    """Recompute the counters from scratch, returning the drift that was fixed"""
+    drift = verify_counters(db)
+    db.query(TaskCounter).delete()
+    db.add_all([
+        TaskCounter(dimension=dimension, key=key, count=count)
+        for (dimension, key), count in compute_counters(db).items()
+    ])
+    db.commit()
+    return drift
+
+
+def ensure_counters(db: Session) -> None:
+    """Populate the counters for a database that predates them"""
+    if db.query(TaskCounter.id).first() is None and db.query(Task.id).first() is not None:
+        rebuild_counters(db)
+
+
+def read_dashboard_stats(db: Session) -> Dict[str, Any]:
+    """Build the DashboardStats payload from the counters table"""
+    return dashboard_stats(db, stored_counters(db))
+
+
+def dashboard_stats(db: Session, counts: Counter) -> Dict[str, Any]:
+    """The DashboardStats payload for ``counts`` (stored, or from compute_counters)"""
+    statuses = {key: count for (dimension, key), count in counts.items() if dimension == STATUS}
+
+    assignee_counts = {
+        int(key): count
+        for (dimension, key), count in counts.items()
+        if dimension == ASSIGNEE and count
+    }
+    names = dict(
+        db.query(User.id, User.name).filter(User.id.in_(assignee_counts)).all()
+    ) if assignee_counts else {}
+
+    return {
+        "total_tasks": sum(statuses.values()),
+        "todo_tasks": statuses.get(TaskStatus.TODO.value, 0),
+        "in_progress_tasks": statuses.get(TaskStatus.IN_PROGRESS.value, 0),
+        "completed_tasks": statuses.get(TaskStatus.DONE.value, 0),
+        "blocked_tasks": statuses.get(TaskStatus.BLOCKED.value, 0),
+        "tasks_by_user": {
+            names[user_id]: count
+            for user_id, count in sorted(assignee_counts.items(), key=lambda item: names.get(item[0], ""))
+            if user_id in names
+        },
+        "tasks_by_priority": {
+            priority.value: counts[(PRIORITY, priority.value)]
+            for priority in TaskPriority
+        }
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    from database import SessionLocal, init_db
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "verify"
+    if command not in ("verify", "rebuild"):
+        sys.exit("Usage: python counters.py [verify|rebuild]")
+
+    init_db()
+    db = SessionLocal()
+    try:
+        drift = rebuild_counters(db) if command == "rebuild" else verify_counters(db)
+    finally:
+        db.close()
+
+    for row in drift:
+        print(f"{row['dimension']}:{row['key']} stored={row['stored']} actual={row['actual']}")
+    if command == "rebuild":
+        print(f"Counters rebuilt ({len(drift)} drifted)")
+    elif drift:
+        sys.exit(f"{len(drift)} counters drifted; run 'python counters.py rebuild'")
+    else:
+        print("Counters OK")
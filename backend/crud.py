@@ -0,0 +1,601 @@
+"""
+Database operations behind the API endpoints
+
+Each function takes a synchronous Session and returns response schemas (or
+plain JSON-ready data), so serialization finishes while the session is still
+usable. main.py runs them through ``database.run_db``, which works with both
+the threadpool-backed sync sessions and AsyncSession.run_sync.
+"""
+import os
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from models import User, Task, Project, Tag, TaskTag, MeetingTranscript, TaskStatus, Goal, GoalStatus, Job, ImportRun, JobStatus
+import schemas
+import pagination
+import loaders
+import jobs
+import importer
+import counters
+import search as search_index
+import changefeed
+import delta_sync
+import refcache
+from counters import read_dashboard_stats
+
+
+# ============================================================================
+# USERS
+# ============================================================================
+
+def create_user(db: Session, user: schemas.UserCreate) -> schemas.User:
+    """Create a new user"""
+    db_user = db.query(User).filter(User.name == user.name).first()
+    if db_user:
+        raise HTTPException(status_code=400, detail="User already exists")
+
+    new_user = User(**user.dict())
+    db.add(new_user)
+    db.commit()
+    db.refresh(new_user)
+    return schemas.User.model_validate(new_user)
+
+
+def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate) -> schemas.User:
+    """Update a user's name, email or aliases"""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    update_data = user_update.dict(exclude_unset=True)
+    if "name" in update_data and update_data["name"] != user.name:
+        if db.query(User.id).filter(User.name == update_data["name"]).first():
+            raise HTTPException(status_code=400, detail="User already exists")
+
+    for key, value in update_data.items():
+        setattr(user, key, value)
+
+    db.commit()
+    db.refresh(user)
+    return schemas.User.model_validate(user)
+
+
+def list_users(db: Session) -> List[schemas.User]:
+    """Get all users"""
+    return refcache.cache.all(db, User)
+
+
+def get_user(db: Session, user_id: int) -> schemas.User:
+    """Get user by ID"""
+    user = refcache.cache.get(db, User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
+# ============================================================================
+# PROJECTS
+# ============================================================================
+
+def create_project(db: Session, project: schemas.ProjectCreate) -> schemas.Project:
+    """Create a new project"""
+    new_project = Project(**project.dict())
+    db.add(new_project)
+    db.commit()
+    db.refresh(new_project)
+    return schemas.Project.model_validate(new_project)
+
+
+def list_projects(db: Session, include_archived: bool = False) -> List[schemas.Project]:
+    """Get all projects"""
+    projects = refcache.cache.all(db, Project)
+    if not include_archived:
+        projects = [project for project in projects if not project.archived]
+    return projects
+
+
+def get_project(db: Session, project_id: int) -> schemas.Project:
+    """Get project by ID"""
+    project = refcache.cache.get(db, Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project
+
+
+def archive_project(db: Session, project_id: int) -> dict:
+    """Archive a project"""
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    project.archived = True
+    db.commit()
+    return {"message": "Project archived"}
+
+
+# ============================================================================
+# TAGS
+# ============================================================================
+
+def create_tag(db: Session, tag: schemas.TagCreate) -> schemas.Tag:
+    """Create a new tag"""
+    new_tag = Tag(**tag.dict())
+    db.add(new_tag)
+    db.commit()
+    db.refresh(new_tag)
+    return schemas.Tag.model_validate(new_tag)
+
+
+def list_tags(db: Session) -> List[schemas.Tag]:
+    """Get all tags"""
+    return refcache.cache.all(db, Tag)
+
+
+# ============================================================================
+# TASKS
+# ============================================================================
+
+def _load_task(db: Session, task_id: int) -> schemas.Task:
+    task = db.query(Task).options(*loaders.task_options()).filter(Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return pagination.serialize_tasks(db, [task])[0]
+
+
+def create_task(db: Session, task: schemas.TaskCreate) -> schemas.Task:
+    """Create a new task"""
+    tag_ids = task.tag_ids
+    task_data = task.dict(exclude={"tag_ids"})
+
+    new_task = Task(**task_data)
+    db.add(new_task)
+    db.flush()
+
+    # Add tags
+    valid_tags = _valid_tag_ids(db, [tag_ids])
+    for tag_id in dict.fromkeys(tag_ids):
+        if tag_id in valid_tags:
+            db.add(TaskTag(task_id=new_task.id, tag_id=tag_id))
+
+    db.commit()
+    return _load_task(db, new_task.id)
+
+
+def list_tasks(
+    db: Session,
+    assignee_id: Optional[int] = None,
+    status: Optional[TaskStatus] = None,
+    project_id: Optional[int] = None,
+    limit: int = pagination.DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    sort: str = pagination.DEFAULT_SORT,
+    fields: Optional[str] = None,
+) -> Tuple[list, Optional[str]]:
+    """Get a page of tasks with optional filters; returns (items, next cursor)"""
+    selected_fields = pagination.parse_fields(fields)
+    query = db.query(Task).options(*loaders.task_options(selected_fields))
+    query = pagination.load_fields(query, selected_fields, sort)
+
+    if assignee_id:
+        query = query.filter(Task.assignee_id == assignee_id)
+    if status:
+        query = query.filter(Task.status == status)
+    if project_id:
+        query = query.filter(Task.project_id == project_id)
+
+    rows = pagination.paginate(query, sort, cursor, limit).all()
+    tasks, has_more = pagination.page_items(rows, limit)
+    next_cursor = pagination.encode_cursor(sort, tasks[-1]) if has_more else None
+
+    return pagination.serialize_tasks(db, tasks, selected_fields), next_cursor
+
+
+def task_changes(db: Session, since: Optional[str] = None, limit: int = pagination.DEFAULT_LIMIT, fields: Optional[str] = None):
+    """Tasks changed and deleted since a sync token"""
+    return delta_sync.task_changes(db, since=since, limit=limit, fields=fields)
+
+
+def get_task(db: Session, task_id: int) -> schemas.Task:
+    """Get task by ID"""
+    return _load_task(db, task_id)
+
+
+def update_task(db: Session, task_id: int, task_update: schemas.TaskUpdate) -> schemas.Task:
+    """Update a task"""
+    task = db.query(Task).filter(Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    update_data = task_update.dict(exclude_unset=True)
+    tag_ids = update_data.pop("tag_ids", None)
+
+    # Handle status changes
+    if task_update.status == TaskStatus.DONE and task.status != TaskStatus.DONE:
+        task.completed_at = datetime.utcnow()
+
+    for field, value in update_data.items():
+        setattr(task, field, value)
+
+    task.updated_at = datetime.utcnow()
+
+    # Update tags if provided
+    if tag_ids is not None:
+        # Remove existing tags
+        db.query(TaskTag).filter(TaskTag.task_id == task_id).delete()
+
+        # Add new tags
+        valid_tags = _valid_tag_ids(db, [tag_ids])
+        for tag_id in dict.fromkeys(tag_ids):
+            if tag_id in valid_tags:
+                db.add(TaskTag(task_id=task_id, tag_id=tag_id))
+
+    db.commit()
+    db.expire_all()
+    return _load_task(db, task_id)
+
+
+def delete_task(db: Session, task_id: int) -> None:
+    """Delete a task"""
+    task = db.query(Task).filter(Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    db.delete(task)
+    delta_sync.prune_deletions(db)
+    db.commit()
+
+
+def _valid_tag_ids(db: Session, tag_id_lists) -> set:
+    """The subset of all referenced tag IDs that exist (from the reference cache)"""
+    referenced = {tag_id for tag_ids in tag_id_lists if tag_ids for tag_id in tag_ids}
+    if not referenced:
+        return set()
+    return set(refcache.cache.get_many(db, Tag, referenced))
+
+
+def _unknown_tags_error(tag_ids, valid: set) -> Optional[str]:
+    unknown = sorted(set(tag_ids or []) - valid)
+    return f"Tags not found: {unknown}" if unknown else None
+
+
+def _bulk_result(results: List[schemas.BulkItemResult]) -> schemas.BulkResult:
+    failed = sum(1 for result in results if result.status == "error")
+    return schemas.BulkResult(succeeded=len(results) - failed, failed=failed, results=results)
+
+
+def bulk_create_tasks(db: Session, bulk: schemas.TaskBulkCreate) -> schemas.BulkResult:
+    """
+    Create many tasks in one transaction
+
+    Tag IDs are validated with a single query; items referencing unknown tags
+    are reported as errors and skipped. Tasks and task tags are bulk inserted,
+    so the task counters are adjusted here rather than by the flush hook.
+    """
+    now = datetime.utcnow()
+    valid_tags = _valid_tag_ids(db, (item.tag_ids for item in bulk.tasks))
+
+    results: List[Optional[schemas.BulkItemResult]] = [None] * len(bulk.tasks)
+    rows, row_items = [], []
+    for index, item in enumerate(bulk.tasks):
+        error = _unknown_tags_error(item.tag_ids, valid_tags)
+        if error:
+            results[index] = schemas.BulkItemResult(index=index, status="error", error=error)
+            continue
+        rows.append({**item.dict(exclude={"tag_ids"}), "created_at": now, "updated_at": now})
+        row_items.append(index)
+
+    if rows:
+        # Core INSERT keeps this one batched statement (the ORM bulk insert
+        # splits rows by which keys are None); IDs come back in ``rows``
+        # order, matched by tasks.insert_ordinal
+        task_ids = db.scalars(Task.__table__.insert().returning(Task.__table__.c.id, sort_by_parameter_order=True), rows).all()
+        deltas = Counter()
+        task_tags = []
+        for task_id, row, index in zip(task_ids, rows, row_items):
+            deltas.update(counters.task_delta(None, counters.task_keys(row["status"], row["priority"], row["assignee_id"])))
+            task_tags.extend(
+                {"task_id": task_id, "tag_id": tag_id}
+                for tag_id in dict.fromkeys(bulk.tasks[index].tag_ids)
+            )
+            results[index] = schemas.BulkItemResult(index=index, id=task_id, status="created")
+            changefeed.record_task(db, "created", task_id, row)
+        if task_tags:
+            db.execute(insert(TaskTag), task_tags)
+        counters.apply_deltas(db.connection(), deltas)
+
+    db.commit()
+    return _bulk_result(results)
+
+
+def bulk_update_tasks(db: Session, bulk: schemas.TaskBulkUpdate) -> schemas.BulkResult:
+    """
+    Patch many tasks in one transaction
+
+    Current rows and tag IDs are each fetched with one query; changes are
+    applied with a bulk UPDATE by primary key. Repeated IDs are applied in
+    order. Unknown tasks or tags are reported per item.
+    """
+    now = datetime.utcnow()
+    ids = {item.id for item in bulk.tasks}
+    current = {
+        row.id: row for row in db.query(
+            Task.id, Task.title, Task.status, Task.priority, Task.assignee_id, Task.project_id, Task.completed_at
+        ).filter(Task.id.in_(ids))
+    }
+    valid_tags = _valid_tag_ids(db, (item.tag_ids for item in bulk.tasks))
+
+    results = []
+    changes = {}
+    new_tags = {}
+    for index, item in enumerate(bulk.tasks):
+        update_data = item.dict(exclude_unset=True, exclude={"id"})
+        tag_ids = update_data.pop("tag_ids", None)
+        error = None
+        if item.id not in current:
+            error = "Task not found"
+        elif "title" in update_data and update_data["title"] is None:
+            error = "title cannot be null"
+        elif "status" in update_data and update_data["status"] is None:
+            error = "status cannot be null"
+        else:
+            error = _unknown_tags_error(tag_ids, valid_tags)
+        if error:
+            results.append(schemas.BulkItemResult(index=index, id=item.id, status="error", error=error))
+            continue
+
+        task = current[item.id]
+        change = changes.setdefault(item.id, {
+            "id": item.id,
+            "status": task.status,
+            "completed_at": task.completed_at,
+        })
+        if update_data.get("status") == TaskStatus.DONE and change["status"] != TaskStatus.DONE:
+            change["completed_at"] = now
+        change.update(update_data)
+        change["updated_at"] = now
+        if tag_ids is not None:
+            new_tags[item.id] = list(dict.fromkeys(tag_ids))
+        results.append(schemas.BulkItemResult(index=index, id=item.id, status="updated"))
+
+    if changes:
+        deltas = Counter()
+        for task_id, change in changes.items():
+            task = current[task_id]
+            deltas.update(counters.task_delta(
+                counters.task_keys(task.status, task.priority, task.assignee_id),
+                counters.task_keys(
+                    change["status"],
+                    change.get("priority", task.priority),
+                    change.get("assignee_id", task.assignee_id),
+                ),
+            ))
+            changefeed.record_task(db, "updated", task_id, {**task._asdict(), **change}, task._asdict())
+        db.execute(update(Task), list(changes.values()))
+        counters.apply_deltas(db.connection(), deltas)
+
+    if new_tags:
+        db.query(TaskTag).filter(TaskTag.task_id.in_(new_tags)).delete(synchronize_session=False)
+        rows = [{"task_id": task_id, "tag_id": tag_id} for task_id, tag_ids in new_tags.items() for tag_id in tag_ids]
+        if rows:
+            db.execute(insert(TaskTag), rows)
+
+    db.commit()
+    return _bulk_result(results)
+
+
+def bulk_delete_tasks(db: Session, bulk: schemas.TaskBulkDelete) -> schemas.BulkResult:
+    """Delete many tasks (and their tag links) with one DELETE per table"""
+    current = {
+        row.id: row for row in db.query(
+            Task.id, Task.status, Task.priority, Task.assignee_id
+        ).filter(Task.id.in_(set(bulk.ids)))
+    }
+
+    results = [
+        schemas.BulkItemResult(index=index, id=task_id, status="deleted")
+        if task_id in current else
+        schemas.BulkItemResult(index=index, id=task_id, status="error", error="Task not found")
+        for index, task_id in enumerate(bulk.ids)
+    ]
+
+    if current:
+        deltas = Counter()
+        for task in current.values():
+            deltas.update(counters.task_delta(counters.task_keys(task.status, task.priority, task.assignee_id), None))
+            changefeed.record(db, "task", "deleted", task.id)
+        db.query(TaskTag).filter(TaskTag.task_id.in_(current)).delete(synchronize_session=False)
+        db.query(Task).filter(Task.id.in_(current)).delete(synchronize_session=False)
+        counters.apply_deltas(db.connection(), deltas)
+        delta_sync.prune_deletions(db)
+
+    db.commit()
+    return _bulk_result(results)
+
+
+# ============================================================================
+# MEETING TRANSCRIPTS
+# ============================================================================
+
+def create_transcript(db: Session, transcript: schemas.TranscriptCreate) -> schemas.MeetingTranscript:
+    """Upload a meeting transcript"""
+    new_transcript = MeetingTranscript(**transcript.dict())
+    db.add(new_transcript)
+    db.commit()
+    db.refresh(new_transcript)
+    return schemas.MeetingTranscript.model_validate(new_transcript)
+
+
+def list_transcripts(db: Session) -> List[schemas.MeetingTranscript]:
+    """Get all transcripts"""
+    transcripts = db.query(MeetingTranscript).options(*loaders.transcript_options()).order_by(
+        MeetingTranscript.created_at.desc()
+    ).all()
+    return [schemas.MeetingTranscript.model_validate(transcript) for transcript in transcripts]
+
+
+def get_transcript(db: Session, transcript_id: int) -> schemas.MeetingTranscript:
+    """Get transcript by ID"""
+    transcript = db.query(MeetingTranscript).options(*loaders.transcript_options()).filter(
+        MeetingTranscript.id == transcript_id
+    ).first()
+    if not transcript:
+        raise HTTPException(status_code=404, detail="Transcript not found")
+    return schemas.MeetingTranscript.model_validate(transcript)
+
+
+def enqueue_transcript_processing(db: Session, transcript_id: int) -> schemas.Job:
+    """Queue a transcript for LLM processing"""
+    exists = db.query(MeetingTranscript.id).filter(MeetingTranscript.id == transcript_id).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Transcript not found")
+    job = jobs.enqueue(db, "process_transcript", {"transcript_id": transcript_id})
+    return schemas.Job.model_validate(job)
+
+
+def enqueue_import(
+    db: Session,
+    binary,
+    filename: str,
+    fmt: Optional[str] = None,
+    creator_id: Optional[int] = None,
+    resume: Optional[int] = None
+) -> schemas.ImportRun:
+    """Save an uploaded task file and queue its import"""
+    temp_path = importer.spool_upload(binary)
+    try:
+        if resume is not None:
+            run = importer.resume_import(db, resume, status=JobStatus.QUEUED, abandoned=jobs.import_abandoned(db, resume))
+        else:
+            run = importer.start_import(db, filename, importer.detect_format(filename, fmt), creator_id, JobStatus.QUEUED)
+    except importer.InvalidImport as e:
+        os.remove(temp_path)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        os.remove(temp_path)
+        raise
+    # Only now that the run is ours: a running import may still be reading its file
+    path = importer.place_spool(temp_path, run)
+    # A failed import is resumed by uploading the file again, not retried
+    jobs.enqueue(db, "import_tasks", {"run_id": run.id, "path": path}, max_attempts=1)
+    db.refresh(run)
+    return schemas.ImportRun.model_validate(run)
+
+
+# ============================================================================
+# JOBS
+# ============================================================================
+
+def get_job(db: Session, job_id: int) -> schemas.Job:
+    """Get background job status, progress and result"""
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return schemas.Job.model_validate(job)
+
+
+# ============================================================================
+# IMPORTS
+# ============================================================================
+
+def get_import_run(db: Session, run_id: int) -> schemas.ImportRun:
+    """Get task import progress"""
+    run = db.query(ImportRun).filter(ImportRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return schemas.ImportRun.model_validate(run)
+
+
+# ============================================================================
+# GOALS
+# ============================================================================
+
+def _load_goal(db: Session, goal_id: int) -> schemas.Goal:
+    goal = db.query(Goal).options(*loaders.goal_options()).filter(Goal.id == goal_id).first()
+    if not goal:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    return schemas.Goal.model_validate(goal)
+
+
+def create_goal(db: Session, goal: schemas.GoalCreate) -> schemas.Goal:
+    """Create a new goal"""
+    new_goal = Goal(**goal.dict())
+    db.add(new_goal)
+    db.commit()
+    return _load_goal(db, new_goal.id)
+
+
+def list_goals(db: Session) -> List[schemas.Goal]:
+    """Get all goals"""
+    goals = db.query(Goal).options(*loaders.goal_options()).order_by(Goal.created_at.desc()).all()
+    return [schemas.Goal.model_validate(goal) for goal in goals]
+
+
+def get_goal(db: Session, goal_id: int) -> schemas.Goal:
+    """Get goal by ID"""
+    return _load_goal(db, goal_id)
+
+
+def update_goal(db: Session, goal_id: int, goal_update: schemas.GoalUpdate) -> schemas.Goal:
+    """Update a goal"""
+    goal = db.query(Goal).filter(Goal.id == goal_id).first()
+    if not goal:
+        raise HTTPException(status_code=404, detail="Goal not found")
+
+    update_data = goal_update.dict(exclude_unset=True)
+
+    # If status is being changed to achieved, set completed_at
+    if "status" in update_data and update_data["status"] == GoalStatus.ACHIEVED:
+        update_data["completed_at"] = datetime.utcnow()
+
+    for key, value in update_data.items():
+        setattr(goal, key, value)
+
+    db.commit()
+    db.expire_all()
+    return _load_goal(db, goal_id)
+
+
+def delete_goal(db: Session, goal_id: int) -> dict:
+    """Delete a goal"""
+    goal = db.query(Goal).filter(Goal.id == goal_id).first()
+    if not goal:
+        raise HTTPException(status_code=404, detail="Goal not found")
+
+    db.delete(goal)
+    db.commit()
+    return {"message": "Goal deleted successfully"}
+
+
+# ============================================================================
+# SEARCH
+# ============================================================================
+
+def search(
+    db: Session,
+    q: str,
+    type: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+    status: Optional[TaskStatus] = None,
+    assignee_id: Optional[int] = None,
+    project_id: Optional[int] = None,
+) -> schemas.SearchResults:
+    """Ranked full-text search over tasks and transcripts"""
+    types = [type] if type else list(search_index.TYPES)
+    return schemas.SearchResults(**search_index.search(
+        db, q, types, limit, offset,
+        status=status, assignee_id=assignee_id, project_id=project_id,
+    ))
+
+
+# ============================================================================
+# DASHBOARD / STATS
+# ============================================================================
+
+def dashboard_stats(db: Session) -> dict:
+    """Get dashboard statistics"""
+    return read_dashboard_stats(db)
@@ -1,33 +1,227 @@
 """
 Database configuration and session management
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
-from models import Base
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from starlette.concurrency import run_in_threadpool
+from counters import track_task_changes, ensure_counters
+import changefeed
+import refcache
+import metrics
+import diagnostics
+import versions
+from migrations import migrate
 import os
+import time
 
 # SQLite database URL
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./tasks.db")
 
+# Serve API requests from an asyncio engine (aiosqlite / asyncpg) instead of
+# blocking sessions on the threadpool
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+IS_MEMORY_SQLITE = IS_SQLITE and (":memory:" in DATABASE_URL or DATABASE_URL.rstrip("/") == "sqlite:")
+
+# Connection pool tuning
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds, -1 disables
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# SQLite connection pragmas
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-64000"))  # negative = KiB
+
+
+class WaitTimingMixin:
+    """Record how long callers wait to check a connection out of the pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_count = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            self.wait_count += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+
+class TimedQueuePool(WaitTimingMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(WaitTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(async_driver: bool = False) -> dict:
+    """Pool and driver keyword arguments for create_engine/create_async_engine"""
+    if IS_MEMORY_SQLITE:
+        return {"connect_args": {"check_same_thread": False}} if not async_driver else {}
+    options = {
+        "poolclass": TimedAsyncQueuePool if async_driver else TimedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+    if IS_SQLITE and not async_driver:
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Configure every new SQLite connection for concurrent readers and writers"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+    if not IS_MEMORY_SQLITE:
+        cursor.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size = {SQLITE_CACHE_SIZE}")
+    cursor.close()
+
+
+def pool_status(target_engine) -> dict:
+    """Snapshot of a pool's checkout, overflow and wait-time statistics"""
+    pool = target_engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    if isinstance(pool, WaitTimingMixin):
+        status["wait"] = {
+            "checkouts": pool.wait_count,
+            "total_seconds": round(pool.wait_seconds, 6),
+            "avg_ms": round(pool.wait_seconds / pool.wait_count * 1000, 3) if pool.wait_count else 0.0,
+            "max_ms": round(pool.max_wait_seconds * 1000, 3),
+        }
+    return status
+
+
 # Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+engine = create_engine(DATABASE_URL, **engine_options())
+if IS_SQLITE:
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+metrics.instrument_engine(engine)
+diagnostics.instrument_engine(engine)
+versions.instrument_engine(engine)
+
+
+class TrackedSession(Session):
+    """Session class shared by the sync and async factories"""
+
+
+# Keep task_counters in step with every task write
+event.listen(TrackedSession, "before_flush", track_task_changes)
+
+# Publish committed task/goal/transcript changes to the live change feed
+event.listen(TrackedSession, "after_flush", changefeed.track_flush)
+event.listen(TrackedSession, "after_commit", changefeed.publish_committed)
+event.listen(TrackedSession, "after_transaction_end", changefeed.discard_pending)
+
+# Drop cached users/projects/tags once a write to them commits
+event.listen(TrackedSession, "after_flush", refcache.track_flush)
+event.listen(TrackedSession, "after_commit", refcache.invalidate_committed)
+event.listen(TrackedSession, "after_transaction_end", refcache.discard_touched)
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=TrackedSession)
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync database URL onto its asyncio driver"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql:") or url.startswith("postgresql+psycopg2:"):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(async_database_url(DATABASE_URL), **engine_options(async_driver=True))
+    if IS_SQLITE:
+        event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+    metrics.instrument_engine(async_engine.sync_engine)
+    diagnostics.instrument_engine(async_engine.sync_engine)
+    versions.instrument_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+        sync_session_class=TrackedSession,
+    )
 
 
 def init_db():
-    """Initialize database tables"""
-    Base.metadata.create_all(bind=engine)
+    """Bring the database schema up to date"""
+    migrate(engine)
+
+    db = SessionLocal()
+    try:
+        ensure_counters(db)
+    finally:
+        db.close()
+
+
+def pool_statistics() -> dict:
+    """Pool statistics for every engine the app uses"""
+    stats = {"sync": pool_status(engine)}
+    if DB_ASYNC:
+        stats["async"] = pool_status(async_engine.sync_engine)
+    return stats
 
 
-def get_db():
-    """Dependency for getting database session"""
+def get_sync_db():
+    """Dependency for a blocking session, for endpoints that must stay synchronous"""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+if DB_ASYNC:
+    async def get_db():
+        """Dependency for getting database session"""
+        async with AsyncSessionLocal() as db:
+            yield db
+else:
+    get_db = get_sync_db
+
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Run ``fn(session, *args, **kwargs)`` without blocking the event loop
+
+    AsyncSession runs it through run_sync on the asyncio driver; a sync
+    Session runs it on the threadpool, as sync FastAPI endpoints do.
+    """
+    if DB_ASYNC:
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
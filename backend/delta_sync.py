@@ -0,0 +1,148 @@
+"""
+Delta sync of tasks: what changed since a token
+
+GET /tasks/changes walks tasks in (updated_at, id) order and the
+``task_deletions`` log in (deleted_at, id) order, each from the position
+stored in the opaque token. Tombstones are written by a trigger on
+``tasks``, so bulk and ORM deletes are both logged, and pruned after
+TASK_DELETION_RETENTION_DAYS; older tokens get 410 and must resync.
+
+Timestamps are taken before commit, so a slow transaction can commit rows
+older than a position already handed out. The token therefore never moves
+past ``now - TASK_CHANGES_SETTLE`` (unless a full page forces it to):
+rows changed in that window are sent again on the next call, which is
+harmless because applying a change is idempotent.
+"""
+import base64
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import text, tuple_
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from models import Task, TaskDeletion
+import loaders
+import pagination
+
+TASK_CHANGES_SETTLE = timedelta(seconds=float(os.getenv("TASK_CHANGES_SETTLE", "5")))
+TASK_DELETION_RETENTION = timedelta(days=float(os.getenv("TASK_DELETION_RETENTION_DAYS", "30")))
+
+Position = Tuple[datetime, int]
+
+SQLITE_DDL = [
+    "CREATE TRIGGER IF NOT EXISTS tasks_log_deletion AFTER DELETE ON tasks BEGIN "
+    # %f has milliseconds; pad to the microseconds SQLAlchemy's DateTime expects
+    "INSERT INTO task_deletions (task_id, deleted_at) "
+    "VALUES (old.id, strftime('%Y-%m-%d %H:%M:%f', 'now') || '000'); END",
+]
+
+POSTGRES_DDL = [
+    "CREATE OR REPLACE FUNCTION log_task_deletion() RETURNS trigger AS $$ BEGIN "
+    "INSERT INTO task_deletions (task_id, deleted_at) VALUES (OLD.id, now() AT TIME ZONE 'utc'); "
+    "RETURN NULL; END $$ LANGUAGE plpgsql",
+    "DROP TRIGGER IF EXISTS tasks_log_deletion ON tasks",
+    "CREATE TRIGGER tasks_log_deletion AFTER DELETE ON tasks FOR EACH ROW EXECUTE FUNCTION log_task_deletion()",
+]
+
+
+def create_deletion_log(conn: Connection) -> None:
+    """Create the tombstone table and the trigger that fills it"""
+    TaskDeletion.__table__.create(conn, checkfirst=True)
+    for statement in (POSTGRES_DDL if conn.dialect.name == "postgresql" else SQLITE_DDL):
+        conn.execute(text(statement))
+
+
+def prune_deletions(db: Session) -> int:
+    """Drop tombstones older than the retention period"""
+    cutoff = datetime.utcnow() - TASK_DELETION_RETENTION
+    return db.query(TaskDeletion).filter(TaskDeletion.deleted_at < cutoff).delete(synchronize_session=False)
+
+
+# ============================================================================
+# TOKENS
+# ============================================================================
+
+def encode_token(tasks: Optional[Position], deletions: Position) -> str:
+    payload = {
+        "t": [tasks[0].isoformat(), tasks[1]] if tasks else None,
+        "d": [deletions[0].isoformat(), deletions[1]],
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_token(token: str) -> Tuple[Optional[Position], Position]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        tasks = payload["t"] and (datetime.fromisoformat(payload["t"][0]), int(payload["t"][1]))
+        deletions = (datetime.fromisoformat(payload["d"][0]), int(payload["d"][1]))
+    except (ValueError, KeyError, TypeError, IndexError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    return tasks or None, deletions
+
+
+def _advance(since: Optional[Position], last: Optional[Position], horizon: Position, has_more: bool):
+    """Next position: after the last row sent, but not past the settle horizon"""
+    if last is None:
+        return since
+    if has_more:
+        return last
+    position = min(last, horizon)
+    return max(since, position) if since else position
+
+
+# ============================================================================
+# CHANGES
+# ============================================================================
+
+def task_changes(
+    db: Session,
+    since: Optional[str] = None,
+    limit: int = pagination.DEFAULT_LIMIT,
+    fields: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Tasks created or updated and IDs deleted after ``since``
+
+    Without ``since`` every task is returned (page by page), which seeds a
+    replica. Apply ``deleted`` before ``tasks``, then call again with
+    ``next`` while ``has_more`` is set.
+    """
+    selected_fields = pagination.parse_fields(fields)
+    now = datetime.utcnow()
+    horizon = (now - TASK_CHANGES_SETTLE, 0)
+    if since is None:
+        task_position, deletion_position = None, horizon
+    else:
+        task_position, deletion_position = decode_token(since)
+        if deletion_position[0] < now - TASK_DELETION_RETENTION:
+            raise HTTPException(status_code=410, detail="Sync token expired; fetch all tasks again")
+
+    query = db.query(Task).options(*loaders.task_options(selected_fields))
+    query = pagination.load_fields(query, selected_fields, "updated_at")
+    if task_position:
+        query = query.filter(tuple_(Task.updated_at, Task.id) > task_position)
+    rows = query.order_by(Task.updated_at, Task.id).limit(limit + 1).all()
+    tasks, more_tasks = pagination.page_items(rows, limit)
+
+    tombstones = (
+        db.query(TaskDeletion.deleted_at, TaskDeletion.id, TaskDeletion.task_id)
+        .filter(tuple_(TaskDeletion.deleted_at, TaskDeletion.id) > deletion_position)
+        .order_by(TaskDeletion.deleted_at, TaskDeletion.id)
+        .limit(limit + 1)
+        .all()
+    )
+    tombstones, more_deleted = pagination.page_items(tombstones, limit)
+
+    next_token = encode_token(
+        _advance(task_position, (tasks[-1].updated_at, tasks[-1].id) if tasks else None, horizon, more_tasks),
+        _advance(deletion_position, tuple(tombstones[-1][:2]) if tombstones else None, horizon, more_deleted),
+    )
+    return {
+        "tasks": pagination.serialize_tasks(db, tasks, selected_fields),
+        "deleted": list(dict.fromkeys(task_id for _, _, task_id in tombstones)),
+        "next": next_token,
+        "has_more": more_tasks or more_deleted,
+    }
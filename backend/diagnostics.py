@@ -0,0 +1,251 @@
+"""
+Slow-query log and N+1 detection for the ORM layer
+
+query_timing times every statement on the engines. Statements slower than
+SLOW_QUERY_MS are logged (to the ``diagnostics`` logger) with their
+parameters and the application code that issued them, and kept for
+GET /diagnostics/slow-queries.
+
+With QUERY_DIAGNOSTICS=log or raise, every HTTP request and background job
+is tracked: a statement shape (the SQL with IN lists collapsed) repeated
+more than QUERY_REPEAT_LIMIT times is the N+1 signature, e.g. a lazy
+relationship loaded once per row. ``log`` reports it when the request
+ends; ``raise`` fails the statement that crosses the limit (or
+QUERY_STATEMENT_LIMIT) with QueryBudgetExceeded, so a test suite run with
+it set fails on the regression. ``budget()`` applies the same check to a
+block of code directly, including requests served in its context, and
+keeps the statements it saw.
+
+Loops that repeat a query by design (export batches, import chunks) run
+inside ``batched()`` and are not counted.
+"""
+import logging
+import os
+import re
+import sys
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import query_timing
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))  # 0 disables the slow-query log
+QUERY_DIAGNOSTICS = os.getenv("QUERY_DIAGNOSTICS", "off").lower()  # "off", "log" or "raise"
+QUERY_REPEAT_LIMIT = int(os.getenv("QUERY_REPEAT_LIMIT", "5"))  # identical shapes per request
+QUERY_STATEMENT_LIMIT = int(os.getenv("QUERY_STATEMENT_LIMIT", "0"))  # statements per request, 0 = no limit
+SLOW_QUERY_KEEP = 100
+
+MODES = ("off", "log", "raise")
+if QUERY_DIAGNOSTICS not in MODES:
+    raise ValueError(f"QUERY_DIAGNOSTICS must be one of {', '.join(MODES)}")
+
+logger = logging.getLogger("diagnostics")
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+_OWN_FILES = {os.path.join(BACKEND_DIR, name) for name in ("diagnostics.py", "metrics.py", "query_timing.py", "database.py")}
+
+# "IN (?, ?, ?)" in any paramstyle; selectinload batches differ only in length
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)"
+_IN_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request or budget() block ran too many statements, or one shape too often"""
+
+
+def query_shape(statement: str) -> str:
+    """The statement on one line with IN lists collapsed, to group repeats"""
+    return _IN_LIST.sub("(…)", " ".join(statement.split()))
+
+
+def caller() -> str:
+    """``file:line in function`` of the innermost application frame on the stack"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(BACKEND_DIR)
+            and filename not in _OWN_FILES
+            and "site-packages" not in filename
+        ):
+            return f"{os.path.relpath(filename, BACKEND_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def _short(value: Any, limit: int) -> str:
+    text = value if isinstance(value, str) else repr(value)
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+class QueryTracker:
+    """Statement counts and repeated shapes for one request, job or budget() block"""
+
+    def __init__(self, label: str, repeat_limit: int, statement_limit: int, strict: bool, keep: bool = False):
+        self.label = label
+        self.repeat_limit = repeat_limit
+        self.statement_limit = statement_limit
+        self.strict = strict
+        self.keep = keep
+        self.statements = 0
+        self.shapes: Counter = Counter()
+        self.locations: Dict[str, str] = {}  # shape -> where it first went over the limit
+        self.batched = 0
+        self.executed: List[Tuple[str, Any]] = []  # (statement, parameters), with keep
+
+    def record(self, statement: str, parameters: Any = None) -> None:
+        if self.batched:
+            return
+        self.statements += 1
+        if self.keep:
+            self.executed.append((statement, parameters))
+        if self.statement_limit and self.statements == self.statement_limit + 1:
+            self._exceeded(f"more than {self.statement_limit} statements, the last at {caller()}: "
+                           f"{_short(query_shape(statement), 300)}")
+        shape = query_shape(statement)
+        self.shapes[shape] += 1
+        if self.repeat_limit and self.shapes[shape] == self.repeat_limit + 1:
+            self.locations[shape] = caller()
+            self._exceeded(f"query repeated more than {self.repeat_limit} times (N+1?) at "
+                           f"{self.locations[shape]}: {_short(shape, 300)}")
+
+    def _exceeded(self, message: str) -> None:
+        if self.strict:
+            raise QueryBudgetExceeded(f"{self.label}: {message}")
+
+    def repeats(self) -> List[Dict[str, Any]]:
+        """Shapes that went over the repeat limit, most repeated first"""
+        return [
+            {"count": count, "location": self.locations[shape], "statement": shape}
+            for shape, count in self.shapes.most_common()
+            if shape in self.locations
+        ]
+
+    def report(self) -> None:
+        """Log repeated shapes and an exceeded statement limit"""
+        for repeat in self.repeats():
+            logger.warning(
+                "Possible N+1 in %s: %d identical queries from %s: %s",
+                self.label, repeat["count"], repeat["location"], _short(repeat["statement"], 500),
+            )
+        if self.statement_limit and self.statements > self.statement_limit:
+            logger.warning("%s ran %d statements (limit %d)", self.label, self.statements, self.statement_limit)
+
+
+_current: ContextVar[Optional[QueryTracker]] = ContextVar("query_tracker", default=None)
+
+_slow_queries: Deque[Dict[str, Any]] = deque(maxlen=SLOW_QUERY_KEEP)
+_slow_lock = threading.Lock()
+
+
+@contextmanager
+def track(label: str):
+    """
+    Track statements in the block per QUERY_DIAGNOSTICS (a no-op when it is off)
+
+    Inside a budget() block the budget keeps counting instead.
+    """
+    enclosing = _current.get()
+    if QUERY_DIAGNOSTICS == "off" or enclosing is not None:
+        yield enclosing
+        return
+    tracker = QueryTracker(label, QUERY_REPEAT_LIMIT, QUERY_STATEMENT_LIMIT, strict=QUERY_DIAGNOSTICS == "raise")
+    token = _current.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current.reset(token)
+        tracker.report()
+
+
+@contextmanager
+def budget(max_statements: int = 0, max_repeats: int = QUERY_REPEAT_LIMIT, label: str = "budget"):
+    """
+    Raise QueryBudgetExceeded if the block runs more than ``max_statements``
+    statements (0 = no limit) or any shape more than ``max_repeats`` times
+
+    The tracker it yields keeps the (statement, parameters) pairs. Only
+    statements run in this context are seen: sessions used directly and
+    requests served in-process by an ASGI client awaited here, not those
+    served by a TestClient, which runs the app in another thread (use
+    QUERY_DIAGNOSTICS=raise for those).
+    """
+    tracker = QueryTracker(label, max_repeats, max_statements, strict=True, keep=True)
+    token = _current.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def batched():
+    """Don't count the block's statements: it repeats a query on purpose, once per batch"""
+    tracker = _current.get()
+    if tracker is None:
+        yield
+        return
+    tracker.batched += 1
+    try:
+        yield
+    finally:
+        tracker.batched -= 1
+
+
+def slow_queries() -> List[Dict[str, Any]]:
+    """The most recent slow statements, newest first"""
+    with _slow_lock:
+        return list(reversed(_slow_queries))
+
+
+# ============================================================================
+# HOOKS
+# ============================================================================
+
+def _statement_started(statement, parameters):
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.record(statement, parameters)
+
+
+def _statement_finished(cursor, statement, parameters, elapsed):
+    elapsed_ms = elapsed * 1000
+    if SLOW_QUERY_MS <= 0 or elapsed_ms < SLOW_QUERY_MS:
+        return
+    tracker = _current.get()
+    entry = {
+        "at": datetime.utcnow().isoformat(),
+        "ms": round(elapsed_ms, 3),
+        "location": caller(),
+        "context": tracker.label if tracker is not None else None,
+        "statement": _short(" ".join(statement.split()), 2000),
+        "parameters": _short(parameters, 500),
+    }
+    with _slow_lock:
+        _slow_queries.append(entry)
+    logger.warning(
+        "Slow query (%.1f ms) from %s: %s; parameters: %s",
+        elapsed_ms, entry["location"], entry["statement"], entry["parameters"],
+    )
+
+
+def instrument_engine(engine) -> None:
+    """Time and track statements on ``engine`` (a sync Engine, or an AsyncEngine's sync_engine)"""
+    query_timing.listen(engine, on_start=_statement_started, on_finish=_statement_finished)
+
+
+class DiagnosticsMiddleware:
+    """ASGI middleware tracking each HTTP request's statements per QUERY_DIAGNOSTICS"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or QUERY_DIAGNOSTICS == "off":
+            await self.app(scope, receive, send)
+            return
+        with track(f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
@@ -0,0 +1,175 @@
+"""
+Streaming NDJSON/CSV export of tasks, transcripts and goals
+
+Rows are read with ``yield_per`` (a server-side cursor on PostgreSQL) and
+encoded one batch at a time, so memory use stays flat however large the
+table is. Each export opens its own session: the response body is produced
+after the endpoint has returned.
+"""
+import csv
+import enum
+import io
+import json
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session, aliased
+from starlette.responses import StreamingResponse
+
+from database import SessionLocal
+import diagnostics
+from models import Goal, MeetingTranscript, Project, Tag, Task, TaskStatus, TaskTag, User
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+
+class ExportFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+Record = Dict[str, Any]
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_ndjson(records: List[Record]) -> str:
+    return "".join(json.dumps({k: _plain(v) for k, v in record.items()}) + "\n" for record in records)
+
+
+def encode_csv(records: List[Record]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow([
+            ";".join(value) if isinstance(value, list) else _plain(value)
+            for value in record.values()
+        ])
+    return buffer.getvalue()
+
+
+def stream_records(
+    statement: Select,
+    fmt: ExportFormat,
+    enrich: Optional[Callable[[Session, List[Record]], None]] = None,
+    extra_columns: List[str] = (),
+    session_factory=SessionLocal,
+) -> Iterator[str]:
+    """Yield ``statement``'s rows as encoded chunks of EXPORT_BATCH_SIZE records"""
+    db = session_factory()
+    try:
+        result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        columns = list(result.keys()) + list(extra_columns)
+        if fmt == ExportFormat.CSV:
+            yield encode_csv([dict(zip(columns, columns))])
+
+        encode = encode_csv if fmt == ExportFormat.CSV else encode_ndjson
+        with diagnostics.batched():
+            for partition in result.partitions():
+                records = [dict(row._mapping) for row in partition]
+                if enrich is not None:
+                    enrich(db, records)
+                yield encode(records)
+    finally:
+        db.close()
+
+
+def export_response(name: str, fmt: ExportFormat, chunks: Iterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt.value}"'},
+    )
+
+
+# ============================================================================
+# TASKS
+# ============================================================================
+
+def task_statement(
+    assignee_id: Optional[int] = None,
+    status: Optional[TaskStatus] = None,
+    project_id: Optional[int] = None,
+) -> Select:
+    assignee = aliased(User)
+    statement = (
+        select(
+            Task.id, Task.title, Task.description, Task.status, Task.priority,
+            Task.assignee_id, assignee.name.label("assignee"), Task.creator_id,
+            Task.project_id, Project.name.label("project"), Task.due_date,
+            Task.created_at, Task.updated_at, Task.completed_at,
+        )
+        .outerjoin(assignee, Task.assignee_id == assignee.id)
+        .outerjoin(Project, Task.project_id == Project.id)
+        .order_by(Task.id)
+    )
+    if assignee_id:
+        statement = statement.where(Task.assignee_id == assignee_id)
+    if status:
+        statement = statement.where(Task.status == status)
+    if project_id:
+        statement = statement.where(Task.project_id == project_id)
+    return statement
+
+
+def add_task_tags(db: Session, records: List[Record]) -> None:
+    """Attach tag names to a batch of task records with one query"""
+    tags = {record["id"]: [] for record in records}
+    rows = db.execute(
+        select(TaskTag.task_id, Tag.name)
+        .join(Tag, TaskTag.tag_id == Tag.id)
+        .where(TaskTag.task_id.in_(tags))
+        .order_by(TaskTag.task_id, Tag.name)
+    )
+    for task_id, name in rows:
+        tags[task_id].append(name)
+    for record in records:
+        record["tags"] = tags[record["id"]]
+
+
+def stream_tasks(fmt: ExportFormat, session_factory=SessionLocal, **filters) -> Iterator[str]:
+    return stream_records(task_statement(**filters), fmt, add_task_tags, ["tags"], session_factory)
+
+
+# ============================================================================
+# TRANSCRIPTS AND GOALS
+# ============================================================================
+
+def transcript_statement() -> Select:
+    return select(
+        MeetingTranscript.id, MeetingTranscript.title, MeetingTranscript.summary,
+        MeetingTranscript.processed, MeetingTranscript.created_at,
+        MeetingTranscript.processed_at, MeetingTranscript.transcript,
+    ).order_by(MeetingTranscript.id)
+
+
+def goal_statement() -> Select:
+    return (
+        select(
+            Goal.id, Goal.title, Goal.description, Goal.status, Goal.owner_id,
+            User.name.label("owner"), Goal.target_date, Goal.created_at,
+            Goal.updated_at, Goal.completed_at,
+        )
+        .outerjoin(User, Goal.owner_id == User.id)
+        .order_by(Goal.id)
+    )
+
+
+def stream_transcripts(fmt: ExportFormat, session_factory=SessionLocal) -> Iterator[str]:
+    return stream_records(transcript_statement(), fmt, session_factory=session_factory)
+
+
+def stream_goals(fmt: ExportFormat, session_factory=SessionLocal) -> Iterator[str]:
+    return stream_records(goal_statement(), fmt, session_factory=session_factory)
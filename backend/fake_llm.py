@@ -0,0 +1,47 @@
+"""
+Local stand-in for the OpenAI client used by transcript_processor
+
+Implements just ``client.chat.completions.create`` so the processor, the job
+worker and the benchmarks can run without network access or an API key.
+"""
+import json
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Union
+
+Responder = Callable[[List[Dict[str, str]]], Dict[str, Any]]
+
+
+class FakeLLMClient:
+    """
+    Returns a canned extraction result for every chat completion
+
+    ``response`` is either the JSON object to return or a callable receiving
+    the chat messages and returning it. ``latency`` simulates the API round
+    trip, in seconds or as a function of the messages; ``fail_times`` raises
+    on the first N calls to exercise retries.
+    """
+
+    def __init__(
+        self,
+        response: Optional[Union[Dict[str, Any], Responder]] = None,
+        latency: Union[float, Callable[[List[Dict[str, str]]], float]] = 0.0,
+        fail_times: int = 0,
+    ):
+        self.response = response if response is not None else {"summary": "", "new_tasks": [], "task_updates": []}
+        self.latency = latency
+        self.fail_times = fail_times
+        self.calls: List[Dict[str, Any]] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages: List[Dict[str, str]], **kwargs):
+        self.calls.append({"model": model, "messages": messages, **kwargs})
+        latency = self.latency(messages) if callable(self.latency) else self.latency
+        if latency:
+            time.sleep(latency)
+        if len(self.calls) <= self.fail_times:
+            raise RuntimeError("Fake LLM failure")
+
+        result = self.response(messages) if callable(self.response) else self.response
+        message = SimpleNamespace(content=json.dumps(result))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
@@ -0,0 +1,339 @@
+"""
+Streaming bulk import of tasks from CSV or NDJSON
+
+The input is read row by row, validated against schemas.TaskImportRow and
+written in chunks of IMPORT_CHUNK_SIZE rows, each chunk in its own
+transaction together with the import_runs progress row. Users, projects and
+tags may be referenced by name; the name -> ID maps are loaded once per run.
+A failed or interrupted import can be resumed: rows already committed are
+skipped. The CSV columns and NDJSON keys match the /export/tasks output.
+
+Uploads (POST /tasks/import) are saved to IMPORT_SPOOL_DIR and imported by
+an ``import_tasks`` background job (see jobs.py); the spooled file is removed
+once the import succeeds. Every app process running job workers must see the
+same IMPORT_SPOOL_DIR.
+
+Usage: python importer.py FILE [--format csv|ndjson] [--creator-id ID] [--resume RUN_ID]
+"""
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from models import ImportRun, JobStatus, Project, Tag, Task, TaskStatus, TaskTag, User
+import counters
+import changefeed
+import diagnostics
+import schemas
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+IMPORT_MAX_ERRORS = 100  # row errors kept on the run; the rest are only counted
+IMPORT_SPOOL_DIR = os.getenv("IMPORT_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "task-imports"))
+
+FORMATS = ("csv", "ndjson")
+
+
+class InvalidImport(ValueError):
+    """Raised for problems with the import as a whole (not a single row)"""
+
+
+def detect_format(filename: str, fmt: Optional[str] = None) -> str:
+    fmt = fmt or os.path.splitext(filename or "")[1].lstrip(".").lower()
+    if fmt in ("jsonl", "json"):
+        fmt = "ndjson"
+    if fmt not in FORMATS:
+        raise InvalidImport(f"Unsupported import format: {fmt or 'unknown'} (use csv or ndjson)")
+    return fmt
+
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[Any]:
+    """Yield raw rows (dicts, or the offending line for bad NDJSON) without loading the file"""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            yield line
+
+
+class Lookups:
+    """Name/ID maps for users, projects and tags, loaded once per import"""
+
+    def __init__(self, db: Session):
+        self.users: Dict[str, int] = {}
+        self.projects: Dict[str, int] = {}
+        self.tags: Dict[str, int] = {}
+        for user_id, name in db.query(User.id, User.name).order_by(User.id):
+            self.users.setdefault(name.lower(), user_id)
+        for project_id, name in db.query(Project.id, Project.name).order_by(Project.id):
+            self.projects.setdefault(name.lower(), project_id)
+        for tag_id, name in db.query(Tag.id, Tag.name).order_by(Tag.id):
+            self.tags.setdefault(name.lower(), tag_id)
+        self.user_ids = set(self.users.values())
+        self.project_ids = set(self.projects.values())
+
+    def _resolve(self, kind: str, name: Optional[str], given_id: Optional[int], by_name: Dict[str, int], ids: set):
+        if name is not None:
+            resolved = by_name.get(name.strip().lower())
+            if resolved is None:
+                raise ValueError(f"Unknown {kind}: {name}")
+            return resolved
+        if given_id is not None and given_id not in ids:
+            raise ValueError(f"Unknown {kind}_id: {given_id}")
+        return given_id
+
+    def user(self, kind: str, name: Optional[str], user_id: Optional[int]) -> Optional[int]:
+        return self._resolve(kind, name, user_id, self.users, self.user_ids)
+
+    def project(self, name: Optional[str], project_id: Optional[int]) -> Optional[int]:
+        return self._resolve("project", name, project_id, self.projects, self.project_ids)
+
+    def tag_ids(self, names: List[str]) -> List[int]:
+        unknown = [name for name in names if name.lower() not in self.tags]
+        if unknown:
+            raise ValueError(f"Unknown tags: {unknown}")
+        return list(dict.fromkeys(self.tags[name.lower()] for name in names))
+
+
+def build_task(raw: Any, lookups: Lookups, default_creator_id: Optional[int], now: datetime) -> Tuple[Dict[str, Any], List[int]]:
+    """Validate one raw row into Task column values and tag IDs; raises ValueError"""
+    if not isinstance(raw, dict):
+        raise ValueError("Row is not a JSON object")
+    row = schemas.TaskImportRow.model_validate(raw)
+    creator_id = lookups.user("creator", row.creator, row.creator_id) or default_creator_id
+    if creator_id is None:
+        raise ValueError("No creator given and no default creator_id")
+    completed_at = row.completed_at
+    if row.status == TaskStatus.DONE and completed_at is None:
+        completed_at = now
+    task = {
+        "title": row.title,
+        "description": row.description,
+        "status": row.status,
+        "priority": row.priority,
+        "assignee_id": lookups.user("assignee", row.assignee, row.assignee_id),
+        "creator_id": creator_id,
+        "project_id": lookups.project(row.project, row.project_id),
+        "due_date": row.due_date,
+        "created_at": row.created_at or now,
+        "updated_at": now,
+        "completed_at": completed_at,
+    }
+    return task, lookups.tag_ids(row.tags)
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'row'}: {e['msg']}" for e in error.errors())
+    return str(error)
+
+
+def write_chunk(db: Session, run: ImportRun, chunk: List[Any], first_row: int, lookups: Lookups) -> None:
+    """Validate and insert one chunk and advance the run, in a single transaction"""
+    now = datetime.utcnow()
+    tasks, task_tags, errors = [], [], []
+    for number, raw in enumerate(chunk, start=first_row):
+        try:
+            task, tag_ids = build_task(raw, lookups, run.creator_id, now)
+        except (ValidationError, ValueError) as e:
+            errors.append({"row": number, "error": _error_message(e)})
+            continue
+        tasks.append(task)
+        task_tags.append(tag_ids)
+
+    if tasks:
+        # Core INSERT keeps this one batched statement (the ORM bulk insert
+        # splits rows by which keys are None); IDs come back in ``tasks``
+        # order, matched by tasks.insert_ordinal
+        task_ids = db.scalars(Task.__table__.insert().returning(Task.__table__.c.id, sort_by_parameter_order=True), tasks).all()
+        links = [
+            {"task_id": task_id, "tag_id": tag_id}
+            for task_id, tag_ids in zip(task_ids, task_tags)
+            for tag_id in tag_ids
+        ]
+        if links:
+            db.execute(insert(TaskTag), links)
+        deltas = Counter()
+        for task in tasks:
+            deltas.update(counters.task_delta(None, counters.task_keys(task["status"], task["priority"], task["assignee_id"])))
+        counters.apply_deltas(db.connection(), deltas)
+        # One summary event per chunk: subscribers refetch rather than
+        # receive thousands of row events
+        changefeed.record(db, "task", "imported", None, count=len(tasks), import_id=run.id)
+
+    run.rows_processed += len(chunk)
+    run.imported += len(tasks)
+    run.failed += len(errors)
+    if errors and len(run.errors) < IMPORT_MAX_ERRORS:
+        run.errors = run.errors + errors[:IMPORT_MAX_ERRORS - len(run.errors)]
+    db.commit()
+
+
+def start_import(
+    db: Session, source: str, fmt: str, creator_id: Optional[int] = None, status: JobStatus = JobStatus.RUNNING
+) -> ImportRun:
+    run = ImportRun(source=source, format=fmt, creator_id=creator_id, status=status)
+    db.add(run)
+    db.commit()
+    return run
+
+
+def resume_import(db: Session, run_id: int, status: JobStatus = JobStatus.RUNNING, abandoned: bool = False) -> ImportRun:
+    """
+    Reopen a failed or interrupted run as ``status``
+
+    A RUNNING run is still being written by its worker and is only reopened
+    when ``abandoned`` (its job was given up on, see jobs.requeue_stale).
+    The status moves with a conditional UPDATE, so two resumes can't both
+    claim the run.
+    """
+    run = db.get(ImportRun, run_id)
+    if run is None:
+        raise InvalidImport(f"Import run {run_id} not found")
+    if run.status == JobStatus.SUCCEEDED:
+        raise InvalidImport(f"Import run {run_id} already completed")
+    if run.status == JobStatus.QUEUED:
+        raise InvalidImport(f"Import run {run_id} is already queued")
+    if run.status == JobStatus.RUNNING and not abandoned:
+        raise InvalidImport(f"Import run {run_id} is still running")
+    claimed = db.query(ImportRun).filter(
+        ImportRun.id == run_id,
+        ImportRun.status == run.status
+    ).update({
+        ImportRun.status: status,
+        ImportRun.error: None,
+        ImportRun.finished_at: None,
+    }, synchronize_session=False)
+    db.commit()
+    if not claimed:
+        raise InvalidImport(f"Import run {run_id} was resumed by another request")
+    db.refresh(run)
+    return run
+
+
+def import_tasks(
+    db: Session,
+    stream: TextIO,
+    run: ImportRun,
+    chunk_size: int = None,
+    on_progress: Optional[Callable[[ImportRun], None]] = None
+) -> ImportRun:
+    """
+    Import rows from ``stream`` into ``run``, skipping rows it already committed
+
+    Progress is committed after every chunk, so a crash loses at most one
+    chunk of work and resuming with the same file continues where it stopped.
+    """
+    chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+    if run.status != JobStatus.RUNNING:
+        run.status = JobStatus.RUNNING
+        db.commit()
+    lookups = Lookups(db)
+    skip = run.rows_processed
+    chunk: List[Any] = []
+    try:
+        # One chunk's statements repeat per chunk by design
+        with diagnostics.batched():
+            for number, raw in enumerate(read_rows(stream, run.format), start=1):
+                if number <= skip:
+                    continue
+                chunk.append(raw)
+                if len(chunk) >= chunk_size:
+                    write_chunk(db, run, chunk, number - len(chunk) + 1, lookups)
+                    chunk = []
+                    if on_progress:
+                        on_progress(run)
+            if chunk:
+                write_chunk(db, run, chunk, run.rows_processed + 1, lookups)
+    except Exception as e:
+        db.rollback()
+        run.status = JobStatus.FAILED
+        run.error = f"{type(e).__name__}: {e}"
+        run.finished_at = datetime.utcnow()
+        db.commit()
+        raise
+
+    run.status = JobStatus.SUCCEEDED
+    run.finished_at = datetime.utcnow()
+    db.commit()
+    if on_progress:
+        on_progress(run)
+    return run
+
+
+def spool_path(run: ImportRun) -> str:
+    return os.path.join(IMPORT_SPOOL_DIR, f"{run.id}.{run.format}")
+
+
+def spool_upload(binary) -> str:
+    """Save an uploaded file to a temporary file in IMPORT_SPOOL_DIR"""
+    os.makedirs(IMPORT_SPOOL_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile("wb", dir=IMPORT_SPOOL_DIR, suffix=".part", delete=False) as spooled:
+        shutil.copyfileobj(binary, spooled)
+    return spooled.name
+
+
+def place_spool(temp_path: str, run: ImportRun) -> str:
+    """Move a spooled upload into place for the run's import job; a resumed run replaces its file"""
+    path = spool_path(run)
+    os.replace(temp_path, path)
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal, init_db
+
+    parser = argparse.ArgumentParser(description="Import tasks from a CSV or NDJSON file")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--creator-id", type=int, help="creator for rows without one")
+    parser.add_argument("--resume", type=int, metavar="RUN_ID", help="continue a failed or interrupted import")
+    parser.add_argument("--force", action="store_true", help="resume a run left running by a killed process")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        try:
+            fmt = detect_format(args.path, args.format)
+        except InvalidImport as e:
+            sys.exit(str(e))
+        if args.resume is not None:
+            try:
+                run = resume_import(db, args.resume, abandoned=args.force)
+            except InvalidImport as e:
+                sys.exit(str(e))
+            print(f"Resuming import {run.id} after row {run.rows_processed}")
+        else:
+            run = start_import(db, os.path.abspath(args.path), fmt, args.creator_id)
+            print(f"Started import {run.id}")
+
+        def report(run: ImportRun):
+            print(f"  rows {run.rows_processed:,}: {run.imported:,} imported, {run.failed:,} failed")
+
+        with open(args.path, encoding="utf-8-sig", newline="") as stream:
+            try:
+                import_tasks(db, stream, run, args.chunk_size, report)
+            except Exception as e:
+                sys.exit(f"Import {run.id} stopped after row {run.rows_processed}: {e}\n"
+                         f"Resume with: python importer.py {args.path} --resume {run.id}")
+        for error in run.errors[:20]:
+            print(f"  row {error['row']}: {error['error']}")
+        print(f"Import {run.id} finished: {run.imported:,} imported, {run.failed:,} failed")
+    finally:
+        db.close()
@@ -0,0 +1,355 @@
+"""
+Background job queue backed by the ``jobs`` table
+
+Endpoints enqueue a job and return its ID straight away; a pool of worker
+threads claims queued jobs, runs the registered handler and records progress,
+the result or the error. Failed jobs are retried with exponential backoff
+until ``max_attempts`` is reached. Claims are a conditional UPDATE, so several
+app processes can share one queue.
+
+A claim takes a lease of JOB_LEASE_SECONDS on the job, which a heartbeat
+thread renews while the handler runs. Only jobs whose lease has expired
+(their worker crashed or hung) are requeued, so a pool starting in another
+process never reruns a job that is still running.
+"""
+import os
+import socket
+import threading
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import ImportRun, Job, JobStatus, MeetingTranscript, User
+from transcript_processor import process_transcript
+import importer
+import name_index
+import refcache
+import diagnostics
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))  # seconds
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "5.0"))  # seconds, doubled per attempt
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))  # renewed every third of this while running
+
+# kind -> handler(db, payload, report, llm_client) returning a JSON-able result
+HANDLERS: Dict[str, Callable] = {}
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help"""
+
+
+def job_handler(kind: str):
+    """Register a handler for jobs of ``kind``"""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(db: Session, kind: str, payload: Dict[str, Any], max_attempts: int = None) -> Job:
+    """Persist a new job and wake the in-process workers"""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = Job(kind=kind, payload=payload, max_attempts=max_attempts or JOB_MAX_ATTEMPTS)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    if worker_pool is not None:
+        worker_pool.wake()
+    return job
+
+
+def claim_next(db: Session, worker_id: str) -> Optional[Job]:
+    """Atomically move the oldest runnable job to RUNNING, leased to ``worker_id``, and return it"""
+    while True:
+        now = datetime.utcnow()
+        candidate = db.query(Job.id).filter(
+            Job.status == JobStatus.QUEUED,
+            Job.run_after <= now
+        ).order_by(Job.run_after, Job.id).first()
+        if candidate is None:
+            return None
+
+        claimed = db.query(Job).filter(
+            Job.id == candidate.id,
+            Job.status == JobStatus.QUEUED
+        ).update({
+            Job.status: JobStatus.RUNNING,
+            Job.started_at: now,
+            Job.attempts: Job.attempts + 1,
+            Job.progress: "started",
+            Job.worker_id: worker_id,
+            Job.locked_until: now + timedelta(seconds=JOB_LEASE_SECONDS),
+        }, synchronize_session=False)
+        db.commit()
+        if claimed:
+            return db.get(Job, candidate.id)
+        # Another worker won the race; try the next job
+
+
+def requeue_stale(db: Session) -> int:
+    """
+    Return RUNNING jobs whose lease expired (their worker died) to the queue
+
+    A job that has used all its attempts is marked FAILED instead, so an
+    import (one attempt) can be resumed rather than rerun behind its back.
+    """
+    now = datetime.utcnow()
+    stale = db.query(Job).filter(Job.status == JobStatus.RUNNING, Job.locked_until < now)
+    released = {Job.worker_id: None, Job.locked_until: None}
+    count = stale.filter(Job.attempts < Job.max_attempts).update(
+        {Job.status: JobStatus.QUEUED, Job.progress: "requeued", **released}, synchronize_session=False
+    )
+    count += stale.update({
+        Job.status: JobStatus.FAILED,
+        Job.progress: "failed",
+        Job.error: "Abandoned by its worker",
+        Job.finished_at: now,
+        **released,
+    }, synchronize_session=False)
+    db.commit()
+    return count
+
+
+def import_abandoned(db: Session, run_id: int) -> bool:
+    """Whether the latest job importing ``run_id`` was abandoned while the run was RUNNING"""
+    job = db.query(Job.status).filter(
+        Job.kind == "import_tasks",
+        Job.payload["run_id"].as_integer() == run_id
+    ).order_by(Job.id.desc()).first()
+    return job is not None and job.status == JobStatus.FAILED
+
+
+@contextmanager
+def lease(session_factory, job: Job):
+    """Renew ``job``'s lease every JOB_LEASE_SECONDS / 3 until the block ends"""
+    job_id, worker_id = job.id, job.worker_id
+    done = threading.Event()
+
+    def renew():
+        while not done.wait(JOB_LEASE_SECONDS / 3):
+            db = session_factory()
+            try:
+                renewed = db.query(Job).filter(
+                    Job.id == job_id,
+                    Job.worker_id == worker_id,
+                    Job.status == JobStatus.RUNNING
+                ).update({
+                    Job.locked_until: datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)
+                }, synchronize_session=False)
+                db.commit()
+            except Exception:
+                traceback.print_exc()
+                continue
+            finally:
+                db.close()
+            if not renewed:
+                return  # Requeued by another worker; run_job won't record the outcome
+
+    heartbeat = threading.Thread(target=renew, name=f"job-lease-{job_id}", daemon=True)
+    heartbeat.start()
+    try:
+        yield
+    finally:
+        done.set()
+        heartbeat.join()
+
+
+def run_job(session_factory, job_db: Session, job: Job, llm_client=None) -> bool:
+    """
+    Run a claimed job's handler in its own session and record the outcome
+
+    Returns False if the job's lease was lost (it was requeued while the
+    handler ran), in which case the outcome is discarded.
+    """
+    def report(stage: str):
+        job.progress = stage
+        job_db.commit()
+
+    work_db = session_factory()
+    try:
+        with lease(session_factory, job), diagnostics.track(f"job {job.kind} #{job.id}"):
+            result = HANDLERS[job.kind](work_db, job.payload, report, llm_client)
+    except Exception as e:
+        work_db.rollback()
+        outcome = {Job.error: f"{type(e).__name__}: {e}"}
+        if job.attempts < job.max_attempts and not isinstance(e, PermanentJobError):
+            outcome.update({
+                Job.status: JobStatus.QUEUED,
+                Job.progress: f"retrying (attempt {job.attempts} failed)",
+                Job.run_after: datetime.utcnow() + timedelta(seconds=JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)),
+            })
+        else:
+            outcome.update({
+                Job.status: JobStatus.FAILED,
+                Job.progress: "failed",
+                Job.finished_at: datetime.utcnow(),
+            })
+            traceback.print_exc()
+    else:
+        outcome = {
+            Job.status: JobStatus.SUCCEEDED,
+            Job.progress: "done",
+            Job.result: result,
+            Job.error: None,
+            Job.finished_at: datetime.utcnow(),
+        }
+    finally:
+        work_db.close()
+
+    # Only while the lease is still ours: an expired one may have been
+    # requeued and claimed by another worker
+    recorded = job_db.query(Job).filter(
+        Job.id == job.id,
+        Job.worker_id == job.worker_id,
+        Job.status == JobStatus.RUNNING
+    ).update({**outcome, Job.worker_id: None, Job.locked_until: None}, synchronize_session=False)
+    job_db.commit()
+    return bool(recorded)
+
+
+class JobWorkerPool:
+    """Worker threads that poll the jobs table and run handlers"""
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        concurrency: int = JOB_WORKERS,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        llm_client=None
+    ):
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.llm_client = llm_client
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        self.requeue_stale()
+        self._stopping.clear()
+        for n in range(self.concurrency):
+            thread = threading.Thread(target=self._loop, name=f"job-worker-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def requeue_stale(self) -> int:
+        db = self.session_factory()
+        try:
+            return requeue_stale(db)
+        finally:
+            db.close()
+
+    def run_once(self) -> Optional[int]:
+        """Claim and run a single job; returns its ID, or None if the queue is empty"""
+        db = self.session_factory()
+        try:
+            # One lease holder per thread, which runs one job at a time
+            job = claim_next(db, f"{self.worker_id}:{threading.current_thread().name}")
+            if job is None:
+                return None
+            run_job(self.session_factory, db, job, self.llm_client)
+            return job.id
+        finally:
+            db.close()
+
+    def _loop(self) -> None:
+        next_requeue = datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)
+        while not self._stopping.is_set():
+            try:
+                # Pick up jobs of workers that died after this pool started
+                if datetime.utcnow() >= next_requeue:
+                    self.requeue_stale()
+                    next_requeue = datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)
+                job_id = self.run_once()
+            except Exception:
+                traceback.print_exc()
+                job_id = None
+            if job_id is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+
+worker_pool: Optional[JobWorkerPool] = None
+
+
+def start_workers(**kwargs) -> Optional[JobWorkerPool]:
+    """Start the process-wide worker pool (no-op when JOB_WORKERS=0)"""
+    global worker_pool
+    if worker_pool is None and kwargs.get("concurrency", JOB_WORKERS) > 0:
+        worker_pool = JobWorkerPool(**kwargs)
+        worker_pool.start()
+    return worker_pool
+
+
+def stop_workers() -> None:
+    global worker_pool
+    if worker_pool is not None:
+        worker_pool.stop()
+        worker_pool = None
+
+
+# ============================================================================
+# HANDLERS
+# ============================================================================
+
+@job_handler("process_transcript")
+def process_transcript_job(db: Session, payload: Dict[str, Any], report, llm_client=None) -> Dict[str, Any]:
+    """Extract tasks from a stored transcript with the LLM"""
+    transcript_id = payload["transcript_id"]
+    transcript = db.query(MeetingTranscript).filter(
+        MeetingTranscript.id == transcript_id
+    ).first()
+    if not transcript:
+        raise PermanentJobError("Transcript not found")
+
+    users = refcache.cache.all(db, User)
+    user_list = [{"id": u.id, "name": u.name, "aliases": u.aliases} for u in users]
+    assignees = refcache.cache.derived(db, User, "name_index", name_index.NameIndex)
+
+    result = process_transcript(
+        transcript_text=transcript.transcript,
+        transcript_id=transcript_id,
+        db=db,
+        available_users=user_list,
+        llm_client=llm_client,
+        on_progress=report,
+        assignees=assignees
+    )
+    if not result["success"]:
+        raise RuntimeError(result.get("error", "Processing failed"))
+    return result
+
+
+@job_handler("import_tasks")
+def import_tasks_job(db: Session, payload: Dict[str, Any], report, llm_client=None) -> Dict[str, Any]:
+    """Import a task file spooled by POST /tasks/import into its ImportRun"""
+    run = db.get(ImportRun, payload["run_id"])
+    if run is None:
+        raise PermanentJobError("Import run not found")
+
+    def progress(run: ImportRun):
+        report(f"{run.rows_processed} rows: {run.imported} imported, {run.failed} failed")
+
+    with open(payload["path"], encoding="utf-8-sig", newline="") as stream:
+        importer.import_tasks(db, stream, run, on_progress=progress)
+    os.remove(payload["path"])
+    return {"import_id": run.id, "imported": run.imported, "failed": run.failed}
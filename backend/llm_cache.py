@@ -0,0 +1,212 @@
+"""
+Content-addressed cache for LLM transcript extraction results
+
+Keys are a SHA-256 over everything that determines the model's answer: the
+normalized transcript text, the team roster, the active-task context, the
+model name and the prompt version. A hit skips the API call entirely.
+
+Lookups go through a bounded in-process LRU first and then, with the "db"
+backend, the ``llm_cache_entries`` table, which survives restarts and is
+shared by every app process.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from models import LLMCacheEntry
+
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "db")  # "db", "memory" or "off"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))  # seconds, 0 = never expire
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+# Sentinel for "use the process-wide cache" in function signatures
+DEFAULT = object()
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of a transcript: NFC, unified newlines, collapsed whitespace"""
+    text = unicodedata.normalize("NFC", text or "").replace("\r\n", "\n").replace("\r", "\n")
+    lines = (re.sub(r"[ \t]+", " ", line).strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def cache_key(
+    transcript: str,
+    user_context: str,
+    tasks_context: str,
+    model: str,
+    prompt_version: int,
+    part: str = ""
+) -> str:
+    """Hash of every input that shapes an extraction result"""
+    material = json.dumps({
+        "transcript": normalize_text(transcript),
+        "users": normalize_text(user_context),
+        "tasks": normalize_text(tasks_context),
+        "model": model,
+        "prompt_version": prompt_version,
+        "part": part,
+    }, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Two-tier (memory LRU, optional DB) cache with TTL and hit/miss counters"""
+
+    def __init__(
+        self,
+        session_factory=None,
+        ttl: int = LLM_CACHE_TTL,
+        memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES
+    ):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+
+    def _expiry(self, now: datetime) -> Optional[datetime]:
+        return now + timedelta(seconds=self.ttl) if self.ttl else None
+
+    def _count(self, *names: str) -> None:
+        with self._lock:
+            for name in names:
+                self.stats[name] += 1
+
+    def _remember(self, key: str, result: Dict[str, Any], expires_at: Optional[datetime]) -> None:
+        with self._lock:
+            self._memory[key] = (result, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                result, expires_at = cached
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats["hits"] += 1
+                    self.stats["memory_hits"] += 1
+                    return result
+                del self._memory[key]
+                self.stats["expired"] += 1
+
+        if self.session_factory is not None:
+            db = self.session_factory()
+            try:
+                entry = db.get(LLMCacheEntry, key)
+                if entry is not None and entry.expires_at is not None and entry.expires_at <= now:
+                    db.delete(entry)
+                    db.commit()
+                    self._count("expired")
+                elif entry is not None:
+                    entry.hit_count += 1
+                    entry.last_used_at = now
+                    result, expires_at = entry.result, entry.expires_at
+                    db.commit()
+                    self._remember(key, result, expires_at)
+                    self._count("hits", "db_hits")
+                    return result
+            finally:
+                db.close()
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, result: Dict[str, Any], model: str, prompt_version: int) -> None:
+        now = datetime.utcnow()
+        expires_at = self._expiry(now)
+        self._remember(key, result, expires_at)
+        self._count("stores")
+
+        if self.session_factory is None:
+            return
+        db = self.session_factory()
+        try:
+            entry = db.get(LLMCacheEntry, key) or LLMCacheEntry(key=key)
+            entry.model = model
+            entry.prompt_version = prompt_version
+            entry.result = result
+            entry.last_used_at = now
+            entry.expires_at = expires_at
+            db.add(entry)
+            db.commit()
+            self._evict_persistent(db)
+        finally:
+            db.close()
+
+    def _evict_persistent(self, db) -> None:
+        """Drop expired rows, then least recently used rows beyond ``max_entries``"""
+        now = datetime.utcnow()
+        expired = db.query(LLMCacheEntry).filter(
+            LLMCacheEntry.expires_at.isnot(None),
+            LLMCacheEntry.expires_at <= now
+        ).delete(synchronize_session=False)
+        excess = db.query(LLMCacheEntry.key).count() - self.max_entries
+        evicted = 0
+        if excess > 0:
+            oldest = [
+                key for (key,) in db.query(LLMCacheEntry.key)
+                .order_by(LLMCacheEntry.last_used_at)
+                .limit(excess)
+            ]
+            evicted = db.query(LLMCacheEntry).filter(
+                LLMCacheEntry.key.in_(oldest)
+            ).delete(synchronize_session=False)
+        db.commit()
+        with self._lock:
+            self.stats["expired"] += expired
+            self.stats["evictions"] += evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self.session_factory is not None:
+            db = self.session_factory()
+            try:
+                db.query(LLMCacheEntry).delete()
+                db.commit()
+            finally:
+                db.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["backend"] = "db" if self.session_factory is not None else "memory"
+        return stats
+
+
+_default_cache: Optional[LLMCache] = None
+_default_lock = threading.Lock()
+
+
+def get_cache() -> Optional[LLMCache]:
+    """Process-wide cache configured by LLM_CACHE_BACKEND (None when "off")"""
+    global _default_cache
+    if LLM_CACHE_BACKEND == "off":
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            session_factory = None
+            if LLM_CACHE_BACKEND == "db":
+                from database import SessionLocal
+                session_factory = SessionLocal
+            _default_cache = LLMCache(session_factory=session_factory)
+    return _default_cache
@@ -0,0 +1,49 @@
+"""
+Eager-loading profiles for the relationships each endpoint serializes
+
+Every relationship in models.py is lazy, so serializing a list of rows
+through the response schemas would issue one SELECT per row and
+relationship. Endpoints apply the matching profile to load everything their
+response touches in a fixed number of queries.
+"""
+from typing import Iterable, List, Optional
+from sqlalchemy.orm import joinedload, noload, selectinload
+from models import Task, TaskTag, Goal, MeetingTranscript
+import refcache
+
+# Many-to-one relationships join into the main query; collections use a
+# second SELECT ... WHERE id IN (...) so LIMIT still applies to parent rows
+TASK_RELATIONSHIPS = {
+    "assignee": joinedload(Task.assignee),
+    "creator": joinedload(Task.creator),
+    "project": joinedload(Task.project),
+    "tags": selectinload(Task.tags).joinedload(TaskTag.tag),
+}
+
+
+# Users and projects embedded from refcache (refcache.embed_task_refs) instead
+CACHED_RELATIONSHIPS = {
+    "assignee": noload(Task.assignee),
+    "creator": noload(Task.creator),
+    "project": noload(Task.project),
+}
+
+
+def task_options(fields: Optional[Iterable[str]] = None) -> List:
+    """Loader options for schemas.Task, or only the relationships in ``fields``"""
+    relationships = TASK_RELATIONSHIPS
+    if refcache.cache.enabled:
+        relationships = {**TASK_RELATIONSHIPS, **CACHED_RELATIONSHIPS}
+    if fields is None:
+        return list(relationships.values())
+    return [relationships[field] for field in fields if field in relationships]
+
+
+def goal_options() -> List:
+    """Loader options for schemas.Goal"""
+    return [joinedload(Goal.owner)]
+
+
+def transcript_options() -> List:
+    """Loader options for schemas.MeetingTranscript"""
+    return [selectinload(MeetingTranscript.actions)]
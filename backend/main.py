@@ -1,18 +1,33 @@
 """
 FastAPI backend for Task Dashboard
 """
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import (
+    FastAPI, Depends, File, Header, HTTPException, Query, Request, Response, UploadFile,
+    WebSocket, status,
+)
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import List, Optional
 
-from database import get_db, init_db
-from models import User, Task, Project, Tag, TaskTag, MeetingTranscript, TaskStatus, Goal, GoalStatus
+from database import get_db, init_db, run_db, pool_statistics
+from models import TaskStatus
 import schemas
-from transcript_processor import process_transcript
-
-app = FastAPI(title="Task Dashboard API", version="1.0.0")
+import pagination
+import crud
+import jobs
+import export
+import llm_cache
+import search as search_index
+import changefeed
+import versions
+import refcache
+import metrics
+import diagnostics
+from metrics import JSONResponse
+
+app = FastAPI(title="Task Dashboard API", version="1.0.0", default_response_class=JSONResponse)
+# Routes time their response model validation for the serialization metrics
+app.router.route_class = metrics.TimedRoute
 
 # CORS middleware
 app.add_middleware(
@@ -21,14 +36,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Profile-Id"],
 )
 
+# Slow-query log and N+1 detection per request (QUERY_DIAGNOSTICS)
+app.add_middleware(diagnostics.DiagnosticsMiddleware)
+
+# Per-route latency, SQL and serialization metrics (outermost, so it times everything)
+app.add_middleware(metrics.MetricsMiddleware)
+
 
 @app.on_event("startup")
 def startup():
     """Initialize database on startup"""
     init_db()
     print("Database initialized")
+    jobs.start_workers()
+
+
+@app.on_event("shutdown")
+def shutdown():
+    """Stop background job workers"""
+    jobs.stop_workers()
+
+
+def not_modified_since(*tables: str):
+    """
+    Dependency for conditional GETs on responses built from ``tables``
+
+    Answers 304 when If-None-Match matches the tables' current versions,
+    before the endpoint runs its query; otherwise sets the ETag header.
+    """
+    async def check(response: Response, if_none_match: Optional[str] = Header(None), db=Depends(get_db)):
+        etag = await run_db(db, versions.etag, tables)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if versions.matches(if_none_match, etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+    return check
+
+
+TASKS_ETAG = Depends(not_modified_since(*versions.TASK_TABLES))
+TRANSCRIPTS_ETAG = Depends(not_modified_since(*versions.TRANSCRIPT_TABLES))
+GOALS_ETAG = Depends(not_modified_since(*versions.GOAL_TABLES))
+STATS_ETAG = Depends(not_modified_since(*versions.STATS_TABLES))
 
 
 @app.get("/")
@@ -41,32 +92,27 @@ def read_root():
 # ============================================================================
 
 @app.post("/users", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: schemas.UserCreate, db=Depends(get_db)):
     """Create a new user"""
-    db_user = db.query(User).filter(User.name == user.name).first()
-    if db_user:
-        raise HTTPException(status_code=400, detail="User already exists")
-
-    new_user = User(**user.dict())
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
+    return await run_db(db, crud.create_user, user)
 
 
 @app.get("/users", response_model=List[schemas.User])
-def get_users(db: Session = Depends(get_db)):
+async def get_users(db=Depends(get_db)):
     """Get all users"""
-    return db.query(User).all()
+    return await run_db(db, crud.list_users)
 
 
 @app.get("/users/{user_id}", response_model=schemas.User)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(user_id: int, db=Depends(get_db)):
     """Get user by ID"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return await run_db(db, crud.get_user, user_id)
+
+
+@app.patch("/users/{user_id}", response_model=schemas.User)
+async def update_user(user_id: int, user_update: schemas.UserUpdate, db=Depends(get_db)):
+    """Update a user, e.g. the aliases transcripts may use for them"""
+    return await run_db(db, crud.update_user, user_id, user_update)
 
 
 # ============================================================================
@@ -74,43 +120,27 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
 # ============================================================================
 
 @app.post("/projects", response_model=schemas.Project, status_code=status.HTTP_201_CREATED)
-def create_project(project: schemas.ProjectCreate, db: Session = Depends(get_db)):
+async def create_project(project: schemas.ProjectCreate, db=Depends(get_db)):
     """Create a new project"""
-    new_project = Project(**project.dict())
-    db.add(new_project)
-    db.commit()
-    db.refresh(new_project)
-    return new_project
+    return await run_db(db, crud.create_project, project)
 
 
 @app.get("/projects", response_model=List[schemas.Project])
-def get_projects(include_archived: bool = False, db: Session = Depends(get_db)):
+async def get_projects(include_archived: bool = False, db=Depends(get_db)):
     """Get all projects"""
-    query = db.query(Project)
-    if not include_archived:
-        query = query.filter(Project.archived == False)
-    return query.all()
+    return await run_db(db, crud.list_projects, include_archived)
 
 
 @app.get("/projects/{project_id}", response_model=schemas.Project)
-def get_project(project_id: int, db: Session = Depends(get_db)):
+async def get_project(project_id: int, db=Depends(get_db)):
     """Get project by ID"""
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    return project
+    return await run_db(db, crud.get_project, project_id)
 
 
 @app.patch("/projects/{project_id}/archive")
-def archive_project(project_id: int, db: Session = Depends(get_db)):
+async def archive_project(project_id: int, db=Depends(get_db)):
     """Archive a project"""
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    project.archived = True
-    db.commit()
-    return {"message": "Project archived"}
+    return await run_db(db, crud.archive_project, project_id)
 
 
 # ============================================================================
@@ -118,19 +148,15 @@ def archive_project(project_id: int, db: Session = Depends(get_db)):
 # ============================================================================
 
 @app.post("/tags", response_model=schemas.Tag, status_code=status.HTTP_201_CREATED)
-def create_tag(tag: schemas.TagCreate, db: Session = Depends(get_db)):
+async def create_tag(tag: schemas.TagCreate, db=Depends(get_db)):
     """Create a new tag"""
-    new_tag = Tag(**tag.dict())
-    db.add(new_tag)
-    db.commit()
-    db.refresh(new_tag)
-    return new_tag
+    return await run_db(db, crud.create_tag, tag)
 
 
 @app.get("/tags", response_model=List[schemas.Tag])
-def get_tags(db: Session = Depends(get_db)):
+async def get_tags(db=Depends(get_db)):
     """Get all tags"""
-    return db.query(Tag).all()
+    return await run_db(db, crud.list_tags)
 
 
 # ============================================================================
@@ -138,101 +164,124 @@ def get_tags(db: Session = Depends(get_db)):
 # ============================================================================
 
 @app.post("/tasks", response_model=schemas.Task, status_code=status.HTTP_201_CREATED)
-def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
+async def create_task(task: schemas.TaskCreate, db=Depends(get_db)):
     """Create a new task"""
-    tag_ids = task.tag_ids
-    task_data = task.dict(exclude={"tag_ids"})
+    return await run_db(db, crud.create_task, task)
 
-    new_task = Task(**task_data)
-    db.add(new_task)
-    db.flush()
 
-    # Add tags
-    for tag_id in tag_ids:
-        tag = db.query(Tag).filter(Tag.id == tag_id).first()
-        if tag:
-            task_tag = TaskTag(task_id=new_task.id, tag_id=tag_id)
-            db.add(task_tag)
-
-    db.commit()
-    db.refresh(new_task)
-    return new_task
-
-
-@app.get("/tasks", response_model=List[schemas.Task])
-def get_tasks(
+@app.get("/tasks", response_model=List[schemas.Task], dependencies=[TASKS_ETAG])
+async def get_tasks(
+    response: Response,
     assignee_id: int = None,
     status: TaskStatus = None,
     project_id: int = None,
-    db: Session = Depends(get_db)
+    limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    sort: str = pagination.DEFAULT_SORT,
+    fields: Optional[str] = None,
+    db=Depends(get_db)
 ):
-    """Get all tasks with optional filters"""
-    query = db.query(Task)
+    """
+    Get a page of tasks with optional filters
+
+    Pages are keyset-paginated over (sort column, id); pass the
+    X-Next-Cursor response header back as ``cursor`` for the next page.
+    ``fields`` selects a comma-separated subset of task fields.
+    """
+    tasks, next_cursor = await run_db(
+        db, crud.list_tasks,
+        assignee_id=assignee_id,
+        status=status,
+        project_id=project_id,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        fields=fields,
+    )
 
-    if assignee_id:
-        query = query.filter(Task.assignee_id == assignee_id)
-    if status:
-        query = query.filter(Task.status == status)
-    if project_id:
-        query = query.filter(Task.project_id == project_id)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if fields:
+        return JSONResponse(tasks, headers={**response.headers, **headers})
 
-    return query.order_by(Task.created_at.desc()).all()
+    response.headers.update(headers)
+    return tasks
 
 
-@app.get("/tasks/{task_id}", response_model=schemas.Task)
-def get_task(task_id: int, db: Session = Depends(get_db)):
-    """Get task by ID"""
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    return task
+@app.post("/tasks/bulk", response_model=schemas.BulkResult)
+async def bulk_create_tasks(bulk: schemas.TaskBulkCreate, db=Depends(get_db)):
+    """Create many tasks in one transaction; returns a result per item"""
+    return await run_db(db, crud.bulk_create_tasks, bulk)
 
 
-@app.patch("/tasks/{task_id}", response_model=schemas.Task)
-def update_task(task_id: int, task_update: schemas.TaskUpdate, db: Session = Depends(get_db)):
-    """Update a task"""
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    update_data = task_update.dict(exclude_unset=True)
-    tag_ids = update_data.pop("tag_ids", None)
+@app.patch("/tasks/bulk", response_model=schemas.BulkResult)
+async def bulk_update_tasks(bulk: schemas.TaskBulkUpdate, db=Depends(get_db)):
+    """Update many tasks in one transaction; returns a result per item"""
+    return await run_db(db, crud.bulk_update_tasks, bulk)
 
-    for field, value in update_data.items():
-        setattr(task, field, value)
 
-    # Handle status changes
-    if task_update.status == TaskStatus.DONE and task.status != TaskStatus.DONE:
-        task.completed_at = datetime.utcnow()
+@app.delete("/tasks/bulk", response_model=schemas.BulkResult)
+async def bulk_delete_tasks(bulk: schemas.TaskBulkDelete, db=Depends(get_db)):
+    """Delete many tasks in one transaction; returns a result per item"""
+    return await run_db(db, crud.bulk_delete_tasks, bulk)
 
-    task.updated_at = datetime.utcnow()
 
-    # Update tags if provided
-    if tag_ids is not None:
-        # Remove existing tags
-        db.query(TaskTag).filter(TaskTag.task_id == task_id).delete()
+@app.post("/tasks/import", response_model=schemas.ImportRun, status_code=status.HTTP_202_ACCEPTED)
+async def import_tasks(
+    file: UploadFile = File(...),
+    fmt: Optional[str] = Query(None, alias="format"),
+    creator_id: Optional[int] = None,
+    resume: Optional[int] = None,
+    db=Depends(get_db)
+):
+    """
+    Queue an import of tasks from an uploaded CSV or NDJSON file
+
+    Returns the import straight away; poll GET /imports/{id} for progress
+    (rows are committed in chunks). If the import fails, upload the same
+    file again with ``resume`` set to the import's ID to continue after the
+    last committed row.
+    """
+    return await run_db(db, crud.enqueue_import, file.file, file.filename, fmt, creator_id, resume)
+
+
+@app.get("/tasks/changes", response_model=schemas.TaskChanges, dependencies=[TASKS_ETAG])
+async def get_task_changes(
+    response: Response,
+    since: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT),
+    fields: Optional[str] = None,
+    db=Depends(get_db)
+):
+    """
+    Tasks created or updated, and IDs of tasks deleted, since a sync token
+
+    Without ``since`` all tasks are returned, to seed a local copy. Apply
+    ``deleted`` then ``tasks``, keep ``next`` for the following call and
+    call again at once while ``has_more`` is true. 410 means the token is
+    too old and the client must start over.
+    """
+    changes = await run_db(db, crud.task_changes, since=since, limit=limit, fields=fields)
+    if fields:
+        return JSONResponse(changes, headers=dict(response.headers))
+    return changes
+
+
+@app.get("/tasks/{task_id}", response_model=schemas.Task, dependencies=[TASKS_ETAG])
+async def get_task(task_id: int, db=Depends(get_db)):
+    """Get task by ID"""
+    return await run_db(db, crud.get_task, task_id)
 
-        # Add new tags
-        for tag_id in tag_ids:
-            tag = db.query(Tag).filter(Tag.id == tag_id).first()
-            if tag:
-                task_tag = TaskTag(task_id=task_id, tag_id=tag_id)
-                db.add(task_tag)
 
-    db.commit()
-    db.refresh(task)
-    return task
+@app.patch("/tasks/{task_id}", response_model=schemas.Task)
+async def update_task(task_id: int, task_update: schemas.TaskUpdate, db=Depends(get_db)):
+    """Update a task"""
+    return await run_db(db, crud.update_task, task_id, task_update)
 
 
 @app.delete("/tasks/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_task(task_id: int, db: Session = Depends(get_db)):
+async def delete_task(task_id: int, db=Depends(get_db)):
     """Delete a task"""
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    db.delete(task)
-    db.commit()
+    await run_db(db, crud.delete_task, task_id)
     return None
 
 
@@ -241,63 +290,55 @@ def delete_task(task_id: int, db: Session = Depends(get_db)):
 # ============================================================================
 
 @app.post("/transcripts", response_model=schemas.MeetingTranscript, status_code=status.HTTP_201_CREATED)
-def create_transcript(
+async def create_transcript(
     transcript: schemas.TranscriptCreate,
-    db: Session = Depends(get_db)
+    db=Depends(get_db)
 ):
     """Upload a meeting transcript"""
-    new_transcript = MeetingTranscript(**transcript.dict())
-    db.add(new_transcript)
-    db.commit()
-    db.refresh(new_transcript)
-    return new_transcript
-
-
-@app.post("/transcripts/{transcript_id}/process")
-def process_meeting_transcript(transcript_id: int, db: Session = Depends(get_db)):
-    """Process a transcript with OpenAI to extract tasks"""
-    transcript = db.query(MeetingTranscript).filter(
-        MeetingTranscript.id == transcript_id
-    ).first()
-
-    if not transcript:
-        raise HTTPException(status_code=404, detail="Transcript not found")
-
-    # Get available users
-    users = db.query(User).all()
-    user_list = [{"id": u.id, "name": u.name} for u in users]
-
-    # Process with OpenAI
-    result = process_transcript(
-        transcript_text=transcript.transcript,
-        transcript_id=transcript_id,
-        db=db,
-        available_users=user_list
-    )
+    return await run_db(db, crud.create_transcript, transcript)
 
-    if not result["success"]:
-        raise HTTPException(status_code=500, detail=result.get("error", "Processing failed"))
 
-    return result
+@app.post(
+    "/transcripts/{transcript_id}/process",
+    response_model=schemas.Job,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def process_meeting_transcript(transcript_id: int, db=Depends(get_db)):
+    """
+    Queue a transcript for processing with OpenAI to extract tasks
+
+    Returns the job straight away; poll GET /jobs/{job_id} for progress and
+    the result.
+    """
+    return await run_db(db, crud.enqueue_transcript_processing, transcript_id)
 
 
-@app.get("/transcripts", response_model=List[schemas.MeetingTranscript])
-def get_transcripts(db: Session = Depends(get_db)):
+@app.get("/transcripts", response_model=List[schemas.MeetingTranscript], dependencies=[TRANSCRIPTS_ETAG])
+async def get_transcripts(db=Depends(get_db)):
     """Get all transcripts"""
-    return db.query(MeetingTranscript).order_by(
-        MeetingTranscript.created_at.desc()
-    ).all()
+    return await run_db(db, crud.list_transcripts)
 
 
-@app.get("/transcripts/{transcript_id}", response_model=schemas.MeetingTranscript)
-def get_transcript(transcript_id: int, db: Session = Depends(get_db)):
+@app.get("/transcripts/{transcript_id}", response_model=schemas.MeetingTranscript, dependencies=[TRANSCRIPTS_ETAG])
+async def get_transcript(transcript_id: int, db=Depends(get_db)):
     """Get transcript by ID"""
-    transcript = db.query(MeetingTranscript).filter(
-        MeetingTranscript.id == transcript_id
-    ).first()
-    if not transcript:
-        raise HTTPException(status_code=404, detail="Transcript not found")
-    return transcript
+    return await run_db(db, crud.get_transcript, transcript_id)
+
+
+# ============================================================================
+# JOB ENDPOINTS
+# ============================================================================
+
+@app.get("/jobs/{job_id}", response_model=schemas.Job)
+async def get_job(job_id: int, db=Depends(get_db)):
+    """Get background job status, progress and result"""
+    return await run_db(db, crud.get_job, job_id)
+
+
+@app.get("/imports/{run_id}", response_model=schemas.ImportRun)
+async def get_import(run_id: int, db=Depends(get_db)):
+    """Get task import progress and row errors; a failed import has status ``failed`` and an ``error``"""
+    return await run_db(db, crud.get_import_run, run_id)
 
 
 # ============================================================================
@@ -305,100 +346,233 @@ def get_transcript(transcript_id: int, db: Session = Depends(get_db)):
 # ============================================================================
 
 @app.post("/goals", response_model=schemas.Goal, status_code=status.HTTP_201_CREATED)
-def create_goal(goal: schemas.GoalCreate, db: Session = Depends(get_db)):
+async def create_goal(goal: schemas.GoalCreate, db=Depends(get_db)):
     """Create a new goal"""
-    new_goal = Goal(**goal.dict())
-    db.add(new_goal)
-    db.commit()
-    db.refresh(new_goal)
-    return new_goal
+    return await run_db(db, crud.create_goal, goal)
 
 
-@app.get("/goals", response_model=List[schemas.Goal])
-def get_goals(db: Session = Depends(get_db)):
+@app.get("/goals", response_model=List[schemas.Goal], dependencies=[GOALS_ETAG])
+async def get_goals(db=Depends(get_db)):
     """Get all goals"""
-    return db.query(Goal).order_by(Goal.created_at.desc()).all()
+    return await run_db(db, crud.list_goals)
 
 
-@app.get("/goals/{goal_id}", response_model=schemas.Goal)
-def get_goal(goal_id: int, db: Session = Depends(get_db)):
+@app.get("/goals/{goal_id}", response_model=schemas.Goal, dependencies=[GOALS_ETAG])
+async def get_goal(goal_id: int, db=Depends(get_db)):
     """Get goal by ID"""
-    goal = db.query(Goal).filter(Goal.id == goal_id).first()
-    if not goal:
-        raise HTTPException(status_code=404, detail="Goal not found")
-    return goal
+    return await run_db(db, crud.get_goal, goal_id)
 
 
 @app.patch("/goals/{goal_id}", response_model=schemas.Goal)
-def update_goal(goal_id: int, goal_update: schemas.GoalUpdate, db: Session = Depends(get_db)):
+async def update_goal(goal_id: int, goal_update: schemas.GoalUpdate, db=Depends(get_db)):
     """Update a goal"""
-    goal = db.query(Goal).filter(Goal.id == goal_id).first()
-    if not goal:
-        raise HTTPException(status_code=404, detail="Goal not found")
+    return await run_db(db, crud.update_goal, goal_id, goal_update)
 
-    update_data = goal_update.dict(exclude_unset=True)
 
-    # If status is being changed to achieved, set completed_at
-    if "status" in update_data and update_data["status"] == GoalStatus.ACHIEVED:
-        update_data["completed_at"] = datetime.utcnow()
+@app.delete("/goals/{goal_id}")
+async def delete_goal(goal_id: int, db=Depends(get_db)):
+    """Delete a goal"""
+    return await run_db(db, crud.delete_goal, goal_id)
 
-    for key, value in update_data.items():
-        setattr(goal, key, value)
 
-    db.commit()
-    db.refresh(goal)
-    return goal
+# ============================================================================
+# SEARCH ENDPOINTS
+# ============================================================================
 
+@app.get("/search", response_model=schemas.SearchResults)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    type: Optional[str] = Query(None, pattern="^(task|transcript)$"),
+    limit: int = Query(20, ge=1, le=search_index.MAX_LIMIT),
+    offset: int = Query(0, ge=0, le=search_index.MAX_OFFSET),
+    status: TaskStatus = None,
+    assignee_id: int = None,
+    project_id: int = None,
+    db=Depends(get_db)
+):
+    """
+    Ranked full-text search over task titles/descriptions and transcripts
+
+    Words must all match (the last one as a prefix). ``type`` restricts the
+    search to tasks or transcripts; the task filters narrow task hits. Pass
+    ``next_offset`` back as ``offset`` for the next page.
+    """
+    return await run_db(
+        db, crud.search, q,
+        type=type, limit=limit, offset=offset,
+        status=status, assignee_id=assignee_id, project_id=project_id,
+    )
+
+
+# ============================================================================
+# EXPORT ENDPOINTS
+# ============================================================================
+
+@app.get("/export/tasks")
+def export_tasks(
+    fmt: export.ExportFormat = Query(export.ExportFormat.NDJSON, alias="format"),
+    assignee_id: int = None,
+    status: TaskStatus = None,
+    project_id: int = None
+):
+    """Stream every task (optionally filtered) as NDJSON or CSV"""
+    chunks = export.stream_tasks(fmt, assignee_id=assignee_id, status=status, project_id=project_id)
+    return export.export_response("tasks", fmt, chunks)
+
+
+@app.get("/export/transcripts")
+def export_transcripts(fmt: export.ExportFormat = Query(export.ExportFormat.NDJSON, alias="format")):
+    """Stream every meeting transcript as NDJSON or CSV"""
+    return export.export_response("transcripts", fmt, export.stream_transcripts(fmt))
+
+
+@app.get("/export/goals")
+def export_goals(fmt: export.ExportFormat = Query(export.ExportFormat.NDJSON, alias="format")):
+    """Stream every goal as NDJSON or CSV"""
+    return export.export_response("goals", fmt, export.stream_goals(fmt))
+
+
+# ============================================================================
+# CHANGE FEED ENDPOINTS
+# ============================================================================
+
+@app.get("/events")
+async def events(
+    request: Request,
+    types: Optional[str] = Query(None, description="comma-separated: task,goal,transcript"),
+    project_id: int = None,
+    assignee_id: int = None,
+    since: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Server-sent events for committed task, goal and transcript changes
+
+    Each event's ``id`` is a resume token: reconnecting with ``since=`` (or the
+    Last-Event-ID header EventSource sends) replays what was missed. A
+    ``reset`` event means the gap could not be filled and the client should
+    refetch. Project/assignee filters apply to task creates and updates; an
+    update that moves a task out of the filter arrives as ``removed``, and
+    deletions are always sent.
+    """
+    try:
+        selected = changefeed.parse_types(types)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    subscription = changefeed.broadcaster.subscribe(
+        since=since or last_event_id, types=selected, project_id=project_id, assignee_id=assignee_id
+    )
+    return StreamingResponse(
+        changefeed.sse_stream(subscription, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.websocket("/events/ws")
+async def events_ws(
+    websocket: WebSocket,
+    types: Optional[str] = None,
+    project_id: int = None,
+    assignee_id: int = None,
+    since: Optional[str] = None
+):
+    """The /events feed as JSON WebSocket messages"""
+    try:
+        selected = changefeed.parse_types(types)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    await websocket.accept()
+    subscription = changefeed.broadcaster.subscribe(
+        since=since, types=selected, project_id=project_id, assignee_id=assignee_id
+    )
+    await changefeed.websocket_stream(subscription, websocket)
 
-@app.delete("/goals/{goal_id}")
-def delete_goal(goal_id: int, db: Session = Depends(get_db)):
-    """Delete a goal"""
-    goal = db.query(Goal).filter(Goal.id == goal_id).first()
-    if not goal:
-        raise HTTPException(status_code=404, detail="Goal not found")
 
-    db.delete(goal)
-    db.commit()
-    return {"message": "Goal deleted successfully"}
+@app.get("/events/stats")
+def get_event_stats():
+    """Change feed position, buffered events and subscriber count"""
+    return changefeed.broadcaster.stats()
 
 
 # ============================================================================
 # DASHBOARD / STATS ENDPOINTS
 # ============================================================================
 
-@app.get("/stats", response_model=schemas.DashboardStats)
-def get_dashboard_stats(db: Session = Depends(get_db)):
+@app.get("/stats", response_model=schemas.DashboardStats, dependencies=[STATS_ETAG])
+async def get_dashboard_stats(db=Depends(get_db)):
     """Get dashboard statistics"""
-    all_tasks = db.query(Task).all()
-
-    stats = {
-        "total_tasks": len(all_tasks),
-        "todo_tasks": len([t for t in all_tasks if t.status == TaskStatus.TODO]),
-        "in_progress_tasks": len([t for t in all_tasks if t.status == TaskStatus.IN_PROGRESS]),
-        "completed_tasks": len([t for t in all_tasks if t.status == TaskStatus.DONE]),
-        "blocked_tasks": len([t for t in all_tasks if t.status == TaskStatus.BLOCKED]),
-        "tasks_by_user": {},
-        "tasks_by_priority": {
-            "low": 0,
-            "medium": 0,
-            "high": 0,
-            "urgent": 0
-        }
-    }
-
-    # Group by user
-    for task in all_tasks:
-        if task.assignee:
-            user_name = task.assignee.name
-            if user_name not in stats["tasks_by_user"]:
-                stats["tasks_by_user"][user_name] = 0
-            stats["tasks_by_user"][user_name] += 1
-
-        # Count by priority
-        if task.priority and task.status != TaskStatus.DONE:
-            stats["tasks_by_priority"][task.priority.value] += 1
-
-    return stats
+    return await run_db(db, crud.dashboard_stats)
+
+
+@app.get("/db/pool")
+def get_pool_stats():
+    """Connection pool statistics (checked out, overflow, checkout wait time)"""
+    return pool_statistics()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus metrics: per-route latency, SQL and serialization histograms, pool and cache gauges"""
+    extra = []
+    pools = pool_statistics()
+    extra += metrics.gauge("db_pool_checked_out", "Connections currently checked out", [
+        ({"engine": name}, pool["checked_out"]) for name, pool in pools.items() if "checked_out" in pool
+    ])
+    extra += metrics.gauge("db_pool_overflow", "Connections open beyond the pool size", [
+        ({"engine": name}, pool["overflow"]) for name, pool in pools.items() if "overflow" in pool
+    ])
+    extra += metrics.gauge("db_pool_wait_seconds_total", "Time spent waiting to check out a connection", [
+        ({"engine": name}, pool["wait"]["total_seconds"]) for name, pool in pools.items() if "wait" in pool
+    ], kind="counter")
+    reference = refcache.cache.metrics()
+    extra += metrics.gauge("reference_cache_lookups_total", "Users/projects/tags cache lookups", [
+        ({"result": "hit"}, reference["hits"]), ({"result": "miss"}, reference["misses"]),
+    ], kind="counter")
+    feed = changefeed.broadcaster.stats()
+    extra += metrics.gauge("changefeed_subscribers", "Open /events subscriptions", [({}, feed["subscribers"])])
+    return metrics.render(extra)
+
+
+@app.get("/metrics/routes")
+def get_route_metrics():
+    """Per-route latency percentiles and average SQL statements, SQL time and serialization time"""
+    return metrics.registry.summary()
+
+
+@app.get("/metrics/profiles")
+def get_profiles():
+    """Recent profiles taken for requests sent with ``X-Profile: 1`` (requires PROFILING=on)"""
+    return metrics.list_profiles()
+
+
+@app.get("/metrics/profiles/{profile_id}", response_class=PlainTextResponse)
+def get_profile(profile_id: str):
+    """Folded stacks of a profiled request, for flamegraph.pl or speedscope"""
+    profile = metrics.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile.folded()
+
+
+@app.get("/diagnostics/slow-queries")
+def get_slow_queries():
+    """Recent statements slower than SLOW_QUERY_MS, with parameters and calling code"""
+    return diagnostics.slow_queries()
+
+
+@app.get("/reference-cache/stats")
+def get_reference_cache_stats():
+    """Hit/miss counters and sizes of the users/projects/tags cache"""
+    return refcache.cache.metrics()
+
+
+@app.get("/llm-cache/stats")
+def get_llm_cache_stats():
+    """Hit/miss counters for the transcript extraction cache"""
+    cache = llm_cache.get_cache()
+    return cache.metrics() if cache is not None else {"backend": "off"}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,457 @@
+"""
+Request metrics and an opt-in sampling profiler
+
+``MetricsMiddleware`` times every HTTP request by route template, streamed
+responses to their first body chunk rather than until they close. Hooks on
+the database engines count each request's SQL statements, their duration
+and the rows they load or write; ``TimedRoute`` and ``JSONResponse``
+measure response model validation and JSON encoding. GET /metrics exports
+it all in the Prometheus text format; GET /metrics/routes summarises it per
+route with latency percentiles.
+
+With PROFILING=on, a request sent with ``X-Profile: 1`` is sampled by a
+background stack sampler. The response carries ``X-Profile-Id``, and the
+folded stacks (input for flamegraph.pl or speedscope) are served from
+GET /metrics/profiles/{id}. Only the event loop thread and threads that ran
+SQL for the request are sampled.
+"""
+import os
+import sys
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse as BaseJSONResponse
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.orm import Mapper
+
+import query_timing
+
+METRICS = os.getenv("METRICS", "on").lower() not in ("0", "off", "false", "no")
+PROFILING = os.getenv("PROFILING", "off").lower() in ("1", "on", "true", "yes")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))  # most recent profiles kept for download
+
+SECONDS_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0,
+)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+
+OPERATIONS = ("select", "insert", "update", "delete")
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation within its bucket"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def samples(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{name}_bucket{{{labels}{"," if labels else ""}le="{le}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum!r}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class RequestStats:
+    """What one request spent, filled in by the hooks while it runs"""
+
+    __slots__ = ("statements", "sql_seconds", "rows", "serialize_seconds", "threads")
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        self.serialize_seconds = 0.0
+        self.threads = {threading.get_ident()}
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.responses: Counter = Counter()  # status code -> count
+        self.duration = Histogram(SECONDS_BUCKETS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.sql_seconds = Histogram(SECONDS_BUCKETS)
+        self.serialize_seconds = Histogram(SECONDS_BUCKETS)
+        self.rows = 0
+
+
+class Registry:
+    """Per-route request metrics and engine-wide statement metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.statements = {op: Histogram(SECONDS_BUCKETS) for op in OPERATIONS + ("other",)}
+        self.rows: Counter = Counter()
+
+    def observe_request(self, method: str, route: str, status_code: int, seconds: float, stats: RequestStats) -> None:
+        with self._lock:
+            metrics = self.routes.get((method, route))
+            if metrics is None:
+                metrics = self.routes[(method, route)] = RouteMetrics()
+            metrics.responses[status_code] += 1
+            metrics.duration.observe(seconds)
+            metrics.statements.observe(stats.statements)
+            metrics.sql_seconds.observe(stats.sql_seconds)
+            metrics.serialize_seconds.observe(stats.serialize_seconds)
+            metrics.rows += stats.rows
+
+    def observe_statement(self, operation: str, seconds: float, rows: int) -> None:
+        with self._lock:
+            self.statements[operation].observe(seconds)
+            self.rows[operation] += rows
+
+    def observe_rows(self, operation: str, rows: int) -> None:
+        with self._lock:
+            self.rows[operation] += rows
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per-route latency percentiles and average SQL / serialization cost"""
+        def ms(seconds):
+            return round(seconds * 1000, 3) if seconds is not None else None
+
+        with self._lock:
+            routes = []
+            for (method, route), metrics in sorted(self.routes.items(), key=lambda item: item[0][1]):
+                count = metrics.duration.count
+                routes.append({
+                    "method": method,
+                    "route": route,
+                    "requests": count,
+                    "errors": sum(n for code, n in metrics.responses.items() if code >= 500),
+                    "p50_ms": ms(metrics.duration.quantile(0.5)),
+                    "p95_ms": ms(metrics.duration.quantile(0.95)),
+                    "p99_ms": ms(metrics.duration.quantile(0.99)),
+                    "avg_ms": ms(metrics.duration.sum / count),
+                    "avg_sql_statements": round(metrics.statements.sum / count, 2),
+                    "avg_sql_ms": ms(metrics.sql_seconds.sum / count),
+                    "avg_serialize_ms": ms(metrics.serialize_seconds.sum / count),
+                    "avg_rows": round(metrics.rows / count, 1),
+                })
+            return routes
+
+    def render(self) -> List[str]:
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            routes = sorted(self.routes.items())
+            family("http_requests_total", "counter", "HTTP responses by route and status code")
+            for (method, route), metrics in routes:
+                for code, count in sorted(metrics.responses.items()):
+                    lines.append(f'http_requests_total{{{_labels(method=method, route=route, status=code)}}} {count}')
+            for name, attribute, help_text in (
+                ("http_request_duration_seconds", "duration", "Time from receiving a request to sending its last byte (first byte if streamed)"),
+                ("http_request_sql_statements", "statements", "SQL statements executed per request"),
+                ("http_request_sql_duration_seconds", "sql_seconds", "Time spent executing SQL per request"),
+                ("http_request_serialization_seconds", "serialize_seconds",
+                 "Time spent validating and encoding response bodies per request"),
+            ):
+                family(name, "histogram", help_text)
+                for (method, route), metrics in routes:
+                    lines.extend(getattr(metrics, attribute).samples(name, _labels(method=method, route=route)))
+            family("http_request_sql_rows_total", "counter", "ORM objects loaded plus rows written, by route")
+            for (method, route), metrics in routes:
+                lines.append(f"http_request_sql_rows_total{{{_labels(method=method, route=route)}}} {metrics.rows}")
+
+            family("db_statement_duration_seconds", "histogram", "SQL statement execution time by operation")
+            for operation, histogram in self.statements.items():
+                lines.extend(histogram.samples("db_statement_duration_seconds", _labels(operation=operation)))
+            family("db_rows_total", "counter", "ORM objects loaded (select) and rows written, by operation")
+            for operation in OPERATIONS:
+                lines.append(f"db_rows_total{{{_labels(operation=operation)}}} {self.rows[operation]}")
+        return lines
+
+
+def _labels(**labels) -> str:
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{key}="{escape(value)}"' for key, value in labels.items())
+
+
+registry = Registry()
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_metrics", default=None)
+
+
+# ============================================================================
+# HOOKS
+# ============================================================================
+
+def _operation(statement: str) -> str:
+    verb = statement.lstrip()[:6].lower()
+    return verb if verb in OPERATIONS else "other"
+
+
+def _statement_finished(cursor, statement, parameters, elapsed):
+    operation = _operation(statement)
+    # Drivers don't report rows a SELECT returns before they are fetched;
+    # those are counted as the ORM loads them instead
+    rows = max(cursor.rowcount, 0) if operation in ("insert", "update", "delete") else 0
+    registry.observe_statement(operation, elapsed, rows)
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += elapsed
+        stats.rows += rows
+        stats.threads.add(threading.get_ident())
+
+
+def _object_loaded(target, context):
+    registry.observe_rows("select", 1)
+    stats = _current.get()
+    if stats is not None:
+        stats.rows += 1
+
+
+def instrument_engine(engine) -> None:
+    """Count and time statements on ``engine`` (a sync Engine, or an AsyncEngine's sync_engine)"""
+    if METRICS:
+        query_timing.listen(engine, on_finish=_statement_finished)
+
+
+if METRICS:
+    event.listen(Mapper, "load", _object_loaded)
+
+
+@contextmanager
+def serializing():
+    """Attribute the enclosed block to serialization, minus any SQL run by lazy loads inside it"""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    started, sql_before = time.perf_counter(), stats.sql_seconds
+    try:
+        yield
+    finally:
+        stats.serialize_seconds += time.perf_counter() - started - (stats.sql_seconds - sql_before)
+
+
+class JSONResponse(BaseJSONResponse):
+    """JSONResponse whose encoding counts as serialization time"""
+
+    def render(self, content: Any) -> bytes:
+        with serializing():
+            return super().render(content)
+
+
+class _TimedResponseField:
+    """A route's response field whose validation and serialization count as serialization time"""
+
+    def __init__(self, field):
+        self._field = field
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._field, name)
+
+    def validate(self, *args, **kwargs):
+        with serializing():
+            return self._field.validate(*args, **kwargs)
+
+    def serialize(self, *args, **kwargs):
+        with serializing():
+            return self._field.serialize(*args, **kwargs)
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that times response_model validation and serialization
+
+    Set as the app router's ``route_class`` before routes are declared;
+    encoding the result is timed by the JSONResponse above.
+    """
+
+    def get_route_handler(self):
+        if METRICS and self.secure_cloned_response_field is not None:
+            self.secure_cloned_response_field = _TimedResponseField(self.secure_cloned_response_field)
+        return super().get_route_handler()
+
+
+# ============================================================================
+# PROFILER
+# ============================================================================
+
+class Profile:
+    """Stack samples of the threads working on one request"""
+
+    def __init__(self, stats: RequestStats, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.id = uuid.uuid4().hex[:12]
+        self.stats = stats
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.route: Optional[str] = None
+        self.seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profile-{self.id}", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.stats.threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[_fold(frame)] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """One ``frame;frame;frame count`` line per distinct stack, root first"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def info(self) -> Dict[str, Any]:
+        return {"id": self.id, "route": self.route, "ms": round(self.seconds * 1000, 3), "samples": self.samples}
+
+
+def _fold(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+_profiles: "OrderedDict[str, Profile]" = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def _keep(profile: Profile) -> None:
+    with _profiles_lock:
+        _profiles[profile.id] = profile
+        while len(_profiles) > PROFILE_KEEP:
+            _profiles.popitem(last=False)
+
+
+def get_profile(profile_id: str) -> Optional[Profile]:
+    with _profiles_lock:
+        return _profiles.get(profile_id)
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    with _profiles_lock:
+        return [profile.info() for profile in reversed(_profiles.values())]
+
+
+# ============================================================================
+# MIDDLEWARE
+# ============================================================================
+
+def _wants_profile(scope) -> bool:
+    for name, value in scope.get("headers", ()):
+        if name == b"x-profile":
+            return value.lower() in (b"1", b"true", b"yes", b"on")
+    return False
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and the request's SQL and serialization cost"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        profile = Profile(stats) if PROFILING and _wants_profile(scope) else None
+        status_code = 500
+
+        observed = False
+
+        def observe():
+            nonlocal observed
+            observed = True
+            elapsed = time.perf_counter() - started
+            # Unmatched paths share one label so scanners can't inflate cardinality
+            route = getattr(scope.get("route"), "path", "unmatched")
+            registry.observe_request(scope["method"], route, status_code, elapsed, stats)
+            if profile is not None:
+                profile.stop()
+                profile.route = f"{scope['method']} {route}"
+                profile.seconds = elapsed
+                _keep(profile)
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if profile is not None:
+                    message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]
+            elif message["type"] == "http.response.body" and message.get("more_body") and not observed:
+                # A streamed response (SSE, exports) is timed to its first
+                # chunk; its lifetime is the client's, not the server's cost
+                observe()
+            await send(message)
+
+        if profile is not None:
+            profile.start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current.reset(token)
+            if not observed:
+                observe()
+
+
+def render(extra: List[str] = ()) -> str:
+    """The Prometheus text exposition of the registry plus ``extra`` lines"""
+    return "\n".join(registry.render() + list(extra)) + "\n"
+
+
+def gauge(name: str, help_text: str, samples: List[Tuple[Dict[str, Any], float]], kind: str = "gauge") -> List[str]:
+    """Exposition lines for a metric family read from elsewhere (pool, caches, change feed)"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        rendered = _labels(**labels)
+        lines.append(f"{name}{{{rendered}}} {value}" if rendered else f"{name} {value}")
+    return lines
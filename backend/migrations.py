@@ -0,0 +1,179 @@
+"""
+Schema migrations
+
+Migrations run in order on startup and each applied version is recorded in
+the ``schema_migrations`` table. Every migration must be idempotent: a fresh
+database gets the full current schema from the first one, and databases
+created by the old ``create_all`` startup have no version rows yet.
+
+Usage: python migrations.py [upgrade|status]
+"""
+from datetime import datetime, timedelta
+from typing import Callable, List, Tuple
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from models import Base, JobStatus
+import search
+import versions
+import delta_sync
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", String, primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _create_indexes(conn: Connection, table_name: str, *index_names: str) -> None:
+    """Create the named indexes declared in models.py if they do not exist"""
+    indexes = {index.name: index for index in Base.metadata.tables[table_name].indexes}
+    for name in index_names:
+        indexes[name].create(conn, checkfirst=True)
+
+
+def initial_schema(conn: Connection) -> None:
+    """Create any missing tables (with the indexes declared on them)"""
+    Base.metadata.create_all(bind=conn)
+
+
+def hot_path_indexes(conn: Connection) -> None:
+    """Indexes for the task list and transcript context queries and the unindexed foreign keys"""
+    _create_indexes(
+        conn, "tasks",
+        "ix_tasks_created_at_id",
+        "ix_tasks_status_created_at_id",
+        "ix_tasks_assignee_created_at_id",
+        "ix_tasks_project_created_at_id",
+    )
+    _create_indexes(conn, "task_tags", "ix_task_tags_task_id", "ix_task_tags_tag_id")
+    _create_indexes(
+        conn, "transcript_actions",
+        "ix_transcript_actions_transcript_id",
+        "ix_transcript_actions_task_id",
+    )
+    _create_indexes(conn, "meeting_transcripts", "ix_meeting_transcripts_created_at")
+    _create_indexes(conn, "goals", "ix_goals_created_at")
+
+
+def jobs_table(conn: Connection) -> None:
+    """Persistent queue for background jobs"""
+    Base.metadata.tables["jobs"].create(conn, checkfirst=True)
+
+
+def llm_cache_table(conn: Connection) -> None:
+    """Persistent cache of LLM transcript extractions"""
+    Base.metadata.tables["llm_cache_entries"].create(conn, checkfirst=True)
+
+
+def import_runs_table(conn: Connection) -> None:
+    """Progress records for resumable task imports"""
+    Base.metadata.tables["import_runs"].create(conn, checkfirst=True)
+
+
+def search_index(conn: Connection) -> None:
+    """Full-text index over tasks and transcripts (FTS5 on SQLite, tsvector on PostgreSQL)"""
+    search.create_search_index(conn)
+
+
+def table_versions(conn: Connection) -> None:
+    """Per-table write counters used for ETags (bumped by triggers on PostgreSQL)"""
+    versions.create_version_triggers(conn)
+
+
+def task_changes(conn: Connection) -> None:
+    """updated_at index and deletion log for GET /tasks/changes"""
+    _create_indexes(conn, "tasks", "ix_tasks_updated_at_id")
+    delta_sync.create_deletion_log(conn)
+
+
+def user_aliases(conn: Connection) -> None:
+    """Other names a user goes by, for resolving transcript assignees"""
+    if "aliases" not in {column["name"] for column in inspect(conn).get_columns("users")}:
+        conn.execute(text("ALTER TABLE users ADD COLUMN aliases JSON"))
+
+
+def job_leases(conn: Connection) -> None:
+    """Worker leases on running jobs, so only jobs whose worker died are requeued"""
+    columns = {column["name"] for column in inspect(conn).get_columns("jobs")}
+    if "worker_id" not in columns:
+        conn.execute(text("ALTER TABLE jobs ADD COLUMN worker_id VARCHAR"))
+    if "locked_until" not in columns:
+        conn.execute(text("ALTER TABLE jobs ADD COLUMN locked_until TIMESTAMP"))
+    # Jobs running under the old code keep its 15-minute stale window
+    jobs = Base.metadata.tables["jobs"]
+    conn.execute(
+        jobs.update()
+        .where(jobs.c.status == JobStatus.RUNNING, jobs.c.locked_until.is_(None))
+        .values(locked_until=datetime.utcnow() + timedelta(minutes=15))
+    )
+
+
+def task_insert_ordinal(conn: Connection) -> None:
+    """Row ordinal written by bulk task INSERTs to match RETURNING rows to their input"""
+    if "insert_ordinal" not in {column["name"] for column in inspect(conn).get_columns("tasks")}:
+        conn.execute(text("ALTER TABLE tasks ADD COLUMN insert_ordinal INTEGER"))
+
+
+def sqlite_version_bumps(conn: Connection) -> None:
+    """Bump SQLite table versions once per transaction from the app instead of per row"""
+    versions.drop_sqlite_triggers(conn)
+
+
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("0001_initial_schema", initial_schema),
+    ("0002_hot_path_indexes", hot_path_indexes),
+    ("0003_jobs_table", jobs_table),
+    ("0004_llm_cache_table", llm_cache_table),
+    ("0005_import_runs_table", import_runs_table),
+    ("0006_search_index", search_index),
+    ("0007_table_versions", table_versions),
+    ("0008_task_changes", task_changes),
+    ("0009_user_aliases", user_aliases),
+    ("0010_job_leases", job_leases),
+    ("0011_task_insert_ordinal", task_insert_ordinal),
+    ("0012_sqlite_version_bumps", sqlite_version_bumps),
+]
+
+
+def applied_versions(conn: Connection) -> List[str]:
+    """Versions already recorded in schema_migrations"""
+    return [row[0] for row in conn.execute(select(schema_migrations.c.version))]
+
+
+def migrate(engine: Engine) -> List[str]:
+    """Apply pending migrations, each in its own transaction; returns the versions applied"""
+    migration_metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        done = set(applied_versions(conn))
+
+    applied = []
+    for version, upgrade in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            upgrade(conn)
+            conn.execute(schema_migrations.insert().values(version=version, applied_at=datetime.utcnow()))
+        applied.append(version)
+    return applied
+
+
+if __name__ == "__main__":
+    import sys
+    from database import engine
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if command == "upgrade":
+        for version in migrate(engine):
+            print(f"Applied {version}")
+        print("Database is up to date")
+    elif command == "status":
+        migration_metadata.create_all(bind=engine)
+        with engine.connect() as conn:
+            done = set(applied_versions(conn))
+        for version, _ in MIGRATIONS:
+            print(f"{'[x]' if version in done else '[ ]'} {version}")
+    else:
+        sys.exit("Usage: python migrations.py [upgrade|status]")
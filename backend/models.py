@@ -1,7 +1,7 @@
 """
 Database models for task dashboard
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Enum, Boolean, UniqueConstraint, Index, JSON, insert_sentinel
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -32,12 +32,20 @@ class GoalStatus(str, enum.Enum):
     ABANDONED = "abandoned"
 
 
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
 class User(Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True, nullable=False)
     email = Column(String, unique=True, index=True)
+    aliases = Column(JSON, nullable=True)  # other names used in meetings, e.g. ["Dave", "DS"]
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -61,6 +69,21 @@ class Project(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Each index matches a GET /tasks filter followed by its keyset order;
+        # task_context.rank_tasks finds active and assignees' tasks through
+        # the status and assignee ones
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_tasks_assignee_created_at_id", "assignee_id", "created_at", "id"),
+        Index("ix_tasks_project_created_at_id", "project_id", "created_at", "id"),
+        # GET /tasks/changes walks (updated_at, id)
+        Index("ix_tasks_updated_at_id", "updated_at", "id"),
+        # Unmapped row ordinal written by bulk INSERTs: RETURNING rows are
+        # matched to their parameters by it (sort_by_parameter_order), as
+        # neither database guarantees returning them in VALUES order
+        insert_sentinel("insert_ordinal"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -86,6 +109,17 @@ class Task(Base):
     tags = relationship("TaskTag", back_populates="task", cascade="all, delete-orphan")
 
 
+class TaskCounter(Base):
+    """Materialized task counts, maintained on every task write (see counters.py)"""
+    __tablename__ = "task_counters"
+    __table_args__ = (UniqueConstraint("dimension", "key"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    dimension = Column(String, nullable=False)  # "status", "priority", "assignee"
+    key = Column(String, nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+
+
 class Tag(Base):
     __tablename__ = "tags"
 
@@ -101,8 +135,8 @@ class TaskTag(Base):
     __tablename__ = "task_tags"
 
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(Integer, ForeignKey("tasks.id"))
-    tag_id = Column(Integer, ForeignKey("tags.id"))
+    task_id = Column(Integer, ForeignKey("tasks.id"), index=True)
+    tag_id = Column(Integer, ForeignKey("tags.id"), index=True)
 
     # Relationships
     task = relationship("Task", back_populates="tags")
@@ -117,7 +151,7 @@ class MeetingTranscript(Base):
     transcript = Column(Text, nullable=False)
     summary = Column(Text)
     processed = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     processed_at = Column(DateTime, nullable=True)
 
     # Relationships
@@ -128,8 +162,8 @@ class TranscriptAction(Base):
     __tablename__ = "transcript_actions"
 
     id = Column(Integer, primary_key=True, index=True)
-    transcript_id = Column(Integer, ForeignKey("meeting_transcripts.id"))
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=True)
+    transcript_id = Column(Integer, ForeignKey("meeting_transcripts.id"), index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=True, index=True)
     action_type = Column(String)  # "created", "updated", "completed"
     description = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -150,10 +184,95 @@ class Goal(Base):
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
 
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     target_date = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
 
     # Relationships
     owner = relationship("User", back_populates="goals")
+
+
+class Job(Base):
+    """Background job run by the worker pool in jobs.py"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers claim the oldest runnable job
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # e.g. "process_transcript"
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    progress = Column(String, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+
+    # Lease on a RUNNING job: the worker holding it extends locked_until
+    # while the handler runs; an expired lease means the worker died
+    worker_id = Column(String, nullable=True)
+    locked_until = Column(DateTime, nullable=True)
+
+    # Timestamps
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class LLMCacheEntry(Base):
+    """Persisted LLM extraction result, keyed by a hash of its inputs (see llm_cache.py)"""
+    __tablename__ = "llm_cache_entries"
+
+    key = Column(String(64), primary_key=True)
+    model = Column(String, nullable=False)
+    prompt_version = Column(Integer, nullable=False)
+    result = Column(JSON, nullable=False)
+    hit_count = Column(Integer, default=0, nullable=False)
+
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
+    expires_at = Column(DateTime, nullable=True)
+
+
+class ImportRun(Base):
+    """Progress of a task import (see importer.py); resumable from rows_processed"""
+    __tablename__ = "import_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String, nullable=False)  # uploaded file name or CLI path
+    format = Column(String, nullable=False)  # "csv" or "ndjson"
+    creator_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # default creator
+    status = Column(Enum(JobStatus), default=JobStatus.RUNNING, nullable=False)
+    rows_processed = Column(Integer, default=0, nullable=False)  # committed input rows
+    imported = Column(Integer, default=0, nullable=False)
+    failed = Column(Integer, default=0, nullable=False)
+    errors = Column(JSON, nullable=False, default=list)  # first IMPORT_MAX_ERRORS row errors
+    error = Column(Text, nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class TaskDeletion(Base):
+    """Tombstone for a deleted task, written by a database trigger (see delta_sync.py)"""
+    __tablename__ = "task_deletions"
+    __table_args__ = (Index("ix_task_deletions_deleted_at_id", "deleted_at", "id"),)
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, nullable=False)
+
+
+class TableVersion(Base):
+    """Write counter per table, bumped once per writing transaction (see versions.py)"""
+    __tablename__ = "table_versions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
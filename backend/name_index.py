@@ -0,0 +1,228 @@
+"""
+Resolving the people named in a meeting to users
+
+The LLM reports assignees the way people speak ("Dave", "Smith", "dave s",
+"Jon" for Jonathan), not as exact user names. NameIndex is built once
+from the users (and cached with them, see refcache.derived) so that each
+lookup is a few dict probes however large the team is:
+
+- exact match on the normalized full name or one of the user's aliases
+- a single token matching a first or last name, a known nickname
+  ("dave" -> "david") or a name prefix of 3+ letters
+- several tokens scored together, with initials ("Dave S.") allowed once
+  another token has matched
+- a fuzzy fallback for misspellings, comparing the token only with name
+  tokens that share a trigram with it
+
+Every match comes with a confidence between 0 and 1. Names that match
+nothing above NAME_MATCH_THRESHOLD, or match two users about equally well,
+resolve to no one: a task left unassigned is better than one given to the
+wrong person.
+"""
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set
+
+NAME_MATCH_THRESHOLD = float(os.getenv("NAME_MATCH_THRESHOLD", "0.75"))
+AMBIGUITY_MARGIN = 0.1  # a runner-up this close to the best match makes a name ambiguous
+
+# Confidence of a single query token matching one of a user's name tokens
+TOKEN_EXACT = 1.0
+TOKEN_NICKNAME = 0.9
+TOKEN_PREFIX = 0.75
+TOKEN_INITIAL = 0.7
+FUZZY_MIN_RATIO = 0.8  # misspelled tokens score their similarity ratio
+FUZZY_CANDIDATES = 10  # vocabulary tokens compared per misspelled token
+FUZZY_MAX_POSTINGS = 200  # trigrams in more name tokens than this ("son") don't discriminate
+PARTIAL_NAME = 0.95    # the query names only some of the user's name tokens
+MIN_PREFIX = 3
+
+# Common English diminutives -> formal first names
+NICKNAMES = {
+    "abby": ["abigail"], "al": ["albert", "alan", "alfred"], "alex": ["alexander", "alexandra"],
+    "andy": ["andrew"], "ben": ["benjamin"], "beth": ["elizabeth"], "bill": ["william"],
+    "billy": ["william"], "bob": ["robert"], "bobby": ["robert"], "cathy": ["catherine"],
+    "charlie": ["charles"], "chris": ["christopher", "christina", "christine"], "chuck": ["charles"],
+    "dan": ["daniel"], "danny": ["daniel"], "dave": ["david"], "deb": ["deborah"], "debbie": ["deborah"],
+    "dick": ["richard"], "don": ["donald"], "drew": ["andrew"], "ed": ["edward"], "eddie": ["edward"],
+    "fred": ["frederick"], "greg": ["gregory"], "hank": ["henry"], "harry": ["henry", "harold"],
+    "jack": ["john"], "jake": ["jacob"], "jim": ["james"], "jimmy": ["james"], "jeff": ["jeffrey"],
+    "jen": ["jennifer"], "jenny": ["jennifer"], "jerry": ["gerald", "jerome"], "joe": ["joseph"],
+    "jon": ["jonathan"], "josh": ["joshua"], "kate": ["katherine", "kathleen"], "kathy": ["katherine", "kathleen"],
+    "katie": ["katherine"], "ken": ["kenneth"], "larry": ["lawrence"], "liz": ["elizabeth"],
+    "maggie": ["margaret"], "matt": ["matthew"], "meg": ["margaret"], "mike": ["michael"],
+    "mick": ["michael"], "nate": ["nathan", "nathaniel"], "nick": ["nicholas"], "pam": ["pamela"],
+    "pat": ["patrick", "patricia"], "peggy": ["margaret"], "pete": ["peter"], "phil": ["philip"],
+    "ray": ["raymond"], "rich": ["richard"], "rick": ["richard"], "rob": ["robert"],
+    "ron": ["ronald"], "sam": ["samuel", "samantha"], "steve": ["steven", "stephen"],
+    "sue": ["susan"], "ted": ["edward", "theodore"], "tim": ["timothy"], "tom": ["thomas"],
+    "tommy": ["thomas"], "tony": ["anthony"], "vicky": ["victoria"], "will": ["william"],
+    "zach": ["zachary"],
+}
+
+_NON_NAME = re.compile(r"[^\w\s]|_")
+
+
+def normalize(name: str) -> str:
+    """Lowercase, accents and punctuation removed, single spaces"""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    return " ".join(_NON_NAME.sub(" ", name.lower()).split())
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameMatch(NamedTuple):
+    user_id: int
+    confidence: float
+    method: str  # "exact", "alias", "token", "nickname", "prefix", "fuzzy"
+
+
+class NameIndex:
+    """Lookup tables over users' names and aliases; build once, query often"""
+
+    def __init__(self, users: Iterable[Any], threshold: float = NAME_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self.names: Dict[int, str] = {}
+        self.exact: Dict[str, Set[int]] = defaultdict(set)   # full name -> users
+        self.aliases: Dict[str, Set[int]] = defaultdict(set)  # alias -> users
+        self.tokens: Dict[str, Set[int]] = defaultdict(set)   # name token -> users
+        self.prefixes: Dict[str, Set[int]] = defaultdict(set)
+        self.trigrams: Dict[str, Set[str]] = defaultdict(set)  # trigram -> name tokens
+        self.user_tokens: Dict[int, List[str]] = {}  # name then alias tokens
+        self.name_lengths: Dict[int, int] = {}
+
+        for user in users:
+            user_id, name, aliases = _fields(user)
+            self.names[user_id] = name
+            full = normalize(name)
+            if not full:
+                continue
+            self.exact[full].add(user_id)
+            for alias in aliases:
+                if normalize(alias):
+                    self.aliases[normalize(alias)].add(user_id)
+            tokens = full.split()
+            self.name_lengths[user_id] = len(tokens)
+            for alias in aliases:
+                tokens.extend(token for token in normalize(alias).split() if token not in tokens)
+            self.user_tokens[user_id] = tokens
+            for token in tokens:
+                self.tokens[token].add(user_id)
+                for length in range(MIN_PREFIX, len(token)):
+                    self.prefixes[token[:length]].add(user_id)
+                for trigram in _trigrams(token):
+                    self.trigrams[trigram].add(token)
+
+        # Full names a first name alone would pick out ("zelda" -> "Zelda Quartz")
+        first_names = Counter(tokens[0] for tokens in self.user_tokens.values())
+        self.unique_first = {
+            tokens[0]: user_id for user_id, tokens in self.user_tokens.items() if first_names[tokens[0]] == 1
+        }
+        self.longest = max((len(key.split()) for key in (*self.exact, *self.aliases)), default=1)
+
+    @property
+    def vocabulary(self) -> Set[str]:
+        """Every token of every name and alias"""
+        return set(self.tokens)
+
+    def resolve(self, name: Optional[str]) -> Optional[NameMatch]:
+        """The user ``name`` most likely refers to, or None if unknown or ambiguous"""
+        matches = self.candidates(name)
+        if not matches or matches[0].confidence < self.threshold:
+            return None
+        if len(matches) > 1 and matches[0].confidence - matches[1].confidence < AMBIGUITY_MARGIN:
+            return None
+        return matches[0]
+
+    def candidates(self, name: Optional[str], limit: int = 5) -> List[NameMatch]:
+        """Scored matches for ``name``, best first"""
+        query = normalize(name or "")
+        if not query:
+            return []
+        for table, method in ((self.exact, "exact"), (self.aliases, "alias")):
+            if query in table:
+                return [NameMatch(user_id, 1.0, method) for user_id in sorted(table[query])][:limit]
+
+        words = query.split()
+        # Per user, the best (score, method) for each query word
+        scores: Dict[int, Dict[int, tuple]] = defaultdict(dict)
+        initials = []
+        for position, word in enumerate(words):
+            if len(word) == 1:
+                initials.append((position, word))
+                continue
+            for user_id, score, method in self._word_matches(word):
+                if score > scores[user_id].get(position, (0.0,))[0]:
+                    scores[user_id][position] = (score, method)
+
+        # Initials only narrow down users another word already matched
+        for position, letter in initials:
+            for user_id, matched in scores.items():
+                if any(token[0] == letter for token in self.user_tokens.get(user_id, ())):
+                    matched[position] = (TOKEN_INITIAL, "token")
+
+        matches = []
+        for user_id, matched in scores.items():
+            confidence = sum(score for score, _ in matched.values()) / len(words)
+            if len(words) < self.name_lengths[user_id]:
+                confidence *= PARTIAL_NAME
+            method = min(matched.values())[1]  # the weakest link
+            matches.append(NameMatch(user_id, round(confidence, 4), method))
+        matches.sort(key=lambda match: (-match.confidence, match.user_id))
+        return matches[:limit]
+
+    def _word_matches(self, word: str):
+        """(user_id, score, method) for users with a name token matching ``word``"""
+        for user_id in self.tokens.get(word, ()):
+            yield user_id, TOKEN_EXACT, "token"
+        for formal in NICKNAMES.get(word, ()):
+            for user_id in self.tokens.get(formal, ()):
+                yield user_id, TOKEN_NICKNAME, "nickname"
+        if len(word) >= MIN_PREFIX:
+            for user_id in self.prefixes.get(word, ()):
+                yield user_id, TOKEN_PREFIX, "prefix"
+        if word not in self.tokens and len(word) > MIN_PREFIX:
+            for token, ratio in self._similar_tokens(word):
+                for user_id in self.tokens[token]:
+                    yield user_id, ratio, "fuzzy"
+
+    def _similar_tokens(self, word: str):
+        """Name tokens spelled like ``word``, compared only with those sharing its rarer trigrams"""
+        postings = [self.trigrams.get(trigram, ()) for trigram in _trigrams(word)]
+        shared = Counter(token for tokens in postings if len(tokens) <= FUZZY_MAX_POSTINGS for token in tokens)
+        for token, _ in shared.most_common(FUZZY_CANDIDATES):
+            ratio = SequenceMatcher(None, word, token).ratio()
+            if ratio >= FUZZY_MIN_RATIO:
+                yield token, ratio
+
+    def mentioned(self, text: str) -> Set[int]:
+        """Users named in ``text`` by full name, alias or unambiguous first name"""
+        words = normalize(text).split()
+        found = set()
+        for start in range(len(words)):
+            for length in range(min(self.longest, len(words) - start), 1, -1):
+                phrase = " ".join(words[start:start + length])
+                if phrase in self.exact or phrase in self.aliases:
+                    found.update(self.exact.get(phrase, ()) or self.aliases.get(phrase, ()))
+                    break
+            else:
+                word = words[start]
+                if word in self.unique_first:
+                    found.add(self.unique_first[word])
+                elif len(self.aliases.get(word, ())) == 1:
+                    found.update(self.aliases[word])
+        return found
+
+
+def _fields(user: Any):
+    """(id, name, aliases) of a user dict, schema or ORM row"""
+    if isinstance(user, dict):
+        return user["id"], user["name"], user.get("aliases") or []
+    return user.id, user.name, getattr(user, "aliases", None) or []
@@ -0,0 +1,147 @@
+"""
+Keyset pagination, sorting and sparse fieldsets for the task list
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query, load_only
+from sqlalchemy.orm import Session
+from models import Task
+import metrics
+import refcache
+import schemas
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Sort keys accepted by GET /tasks; "-" prefix sorts descending
+SORT_COLUMNS = {
+    "created_at": Task.created_at,
+    "updated_at": Task.updated_at,
+    "title": Task.title,
+    "id": Task.id,
+}
+DEFAULT_SORT = "-created_at"
+
+# Relationship fields and the schema used to serialize them
+RELATED_FIELDS = {
+    "assignee": schemas.User,
+    "creator": schemas.User,
+    "project": schemas.Project,
+    "tags": schemas.Tag,
+}
+# Foreign keys a relationship field needs loaded alongside it
+RELATED_COLUMNS = {
+    "assignee": "assignee_id",
+    "creator": "creator_id",
+    "project": "project_id",
+}
+TASK_FIELDS = set(schemas.Task.model_fields)
+
+
+def parse_sort(sort: str):
+    """Return (sort key, column, descending) for a sort parameter"""
+    key = sort.lstrip("-")
+    if key not in SORT_COLUMNS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid sort '{sort}'. Options: {', '.join(sorted(SORT_COLUMNS))}"
+        )
+    return key, SORT_COLUMNS[key], sort.startswith("-")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Set[str]]:
+    """Parse a comma-separated ``fields=`` selector; None means the full schema"""
+    if not fields:
+        return None
+    selected = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = selected - TASK_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    selected.add("id")
+    return selected
+
+
+def encode_cursor(sort: str, task: Task) -> str:
+    """Opaque cursor pointing just after ``task`` in ``sort`` order"""
+    key, _, _ = parse_sort(sort)
+    value = getattr(task, key)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({"s": sort, "v": value, "id": task.id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(sort: str, cursor: str):
+    """Return the (sort value, id) a cursor points after"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value, task_id = payload["v"], int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if payload.get("s") != sort:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort order")
+    if sort.lstrip("-") in ("created_at", "updated_at"):
+        value = datetime.fromisoformat(value)
+    return value, task_id
+
+
+def paginate(query: Query, sort: str, cursor: Optional[str], limit: int) -> Query:
+    """Apply keyset ordering, the cursor position and ``limit + 1`` to a task query"""
+    _, column, descending = parse_sort(sort)
+    if cursor:
+        value, task_id = decode_cursor(sort, cursor)
+        position = tuple_(column, Task.id)
+        query = query.filter(position < (value, task_id) if descending else position > (value, task_id))
+    if descending:
+        query = query.order_by(column.desc(), Task.id.desc())
+    else:
+        query = query.order_by(column.asc(), Task.id.asc())
+    # One extra row tells us whether there is a next page
+    return query.limit(limit + 1)
+
+
+def load_fields(query: Query, fields: Optional[Set[str]], sort: str) -> Query:
+    """Only load the task columns a sparse fieldset and its cursor need"""
+    if fields is None:
+        return query
+    names = {RELATED_COLUMNS.get(field, field) for field in fields if field != "tags"}
+    names.add(parse_sort(sort)[0])
+    columns = [getattr(Task, name) for name in names]
+    return query.options(load_only(*columns))
+
+
+def serialize_fields(task: Task, fields: Set[str]) -> Dict[str, Any]:
+    """Serialize only the selected fields, without touching other relationships"""
+    data = {}
+    for field in fields:
+        value = getattr(task, field)
+        if field in RELATED_FIELDS and value is not None:
+            schema = RELATED_FIELDS[field]
+            if isinstance(value, list):
+                value = [schema.model_validate(getattr(item, "tag", item)).model_dump() for item in value]
+            else:
+                value = schema.model_validate(value).model_dump()
+        data[field] = value
+    return jsonable_encoder(data)
+
+
+def serialize_tasks(db: Session, tasks: List[Task], fields: Optional[Set[str]] = None) -> List[Any]:
+    """schemas.Task objects (or sparse dicts) with users and projects embedded"""
+    with metrics.serializing():
+        if fields is not None:
+            items = [serialize_fields(task, fields) for task in tasks]
+        else:
+            items = [schemas.Task.model_validate(task) for task in tasks]
+        if refcache.cache.enabled:
+            refcache.embed_task_refs(db, tasks, items)
+    return items
+
+
+def page_items(rows: List[Task], limit: int):
+    """Split a ``limit + 1`` result into the page and whether more rows exist"""
+    return rows[:limit], len(rows) > limit
@@ -0,0 +1,53 @@
+"""
+One timing hook per engine for the modules that watch SQL statements
+
+metrics (per-route SQL time) and diagnostics (slow-query log, N+1
+tracking) both need each statement's duration. ``listen`` puts a single
+pair of cursor hooks on an engine, whoever asks first, and passes every
+statement to the callbacks subscribed so far:
+
+- ``on_start(statement, parameters)`` runs before the statement and may raise to stop it
+- ``on_finish(cursor, statement, parameters, seconds)`` runs once it succeeded
+
+Callbacks are shared by every instrumented engine.
+"""
+import time
+from typing import Callable, List, Optional
+
+from sqlalchemy import event
+
+_STARTED = "statement_started"  # conn.info key: start times of the statements in flight
+
+_on_start: List[Callable] = []
+_on_finish: List[Callable] = []
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    for callback in _on_start:
+        callback(statement, parameters)
+    conn.info.setdefault(_STARTED, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info[_STARTED].pop()
+    for callback in _on_finish:
+        callback(cursor, statement, parameters, elapsed)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    started = exception_context.connection.info.get(_STARTED) if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def listen(engine, on_start: Optional[Callable] = None, on_finish: Optional[Callable] = None) -> None:
+    """Time statements on ``engine`` (a sync Engine, or an AsyncEngine's sync_engine) for the callbacks"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+    if on_start is not None and on_start not in _on_start:
+        _on_start.append(on_start)
+    if on_finish is not None and on_finish not in _on_finish:
+        _on_finish.append(on_finish)
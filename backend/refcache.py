@@ -0,0 +1,284 @@
+"""
+Read-through cache for reference data: users, projects and tags
+
+These tables are small and rarely written but read on almost every
+request: task responses embed the assignee, creator and project, task
+writes validate tag IDs and transcript processing loads the whole team.
+Entries are schema objects (never ORM instances, which belong to one
+session), bounded per table with an optional TTL.
+
+Each process keeps a local LRU in front of a shared cache namespace per
+table (see cache.py). A commit that touched one of the tables bumps that
+table's shared version (see the session hooks below, registered in
+database.py); every worker compares versions before using its local
+entries, so one write invalidates the table everywhere. A load that raced
+with the bump is not stored locally, and lands under the old version key
+in the shared store.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from models import Project, Tag, User
+import cache as shared_cache
+import schemas
+
+REFCACHE_ENABLED = os.getenv("REFCACHE", "on") != "off"
+REFCACHE_TTL = float(os.getenv("REFCACHE_TTL", "0"))  # seconds, 0 = until invalidated
+REFCACHE_MAX_ENTRIES = int(os.getenv("REFCACHE_MAX_ENTRIES", "10000"))  # per table
+
+SCHEMAS = {User: schemas.User, Project: schemas.Project, Tag: schemas.Tag}
+ALL = "*"  # key of the full, id-ordered list of a table
+
+TOUCHED = "refcache_touched"
+
+
+class ReferenceCache:
+    """Bounded local LRU per table over a shared cache namespace per table"""
+
+    def __init__(
+        self,
+        enabled: bool = REFCACHE_ENABLED,
+        ttl: float = REFCACHE_TTL,
+        max_entries: int = REFCACHE_MAX_ENTRIES,
+        backend=None
+    ):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._backend = backend
+        self._namespaces: Dict[type, shared_cache.Namespace] = {}
+        self._entries: Dict[type, "OrderedDict[Any, tuple]"] = {model: OrderedDict() for model in SCHEMAS}
+        self._versions: Dict[type, Optional[int]] = {model: None for model in SCHEMAS}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "invalidations": 0, "evictions": 0, "expired": 0}
+
+    def _namespace(self, model) -> shared_cache.Namespace:
+        namespace = self._namespaces.get(model)
+        if namespace is None:
+            namespace = self._namespaces[model] = shared_cache.Namespace(
+                f"ref:{model.__tablename__}", self._backend, default_ttl=self.ttl or shared_cache.CACHE_DEFAULT_TTL
+            )
+        return namespace
+
+    def _sync(self, model) -> int:
+        """The table's shared version; local entries from an older one are dropped"""
+        version = self._namespace(model).version()
+        with self._lock:
+            if self._versions[model] != version:
+                self._entries[model].clear()
+                self._versions[model] = version
+        return version
+
+    def _lookup(self, model, key, now: float):
+        """(True, value) for a live local entry, else (False, None); caller holds the lock"""
+        entries = self._entries[model]
+        cached = entries.get(key)
+        if cached is None:
+            return False, None
+        value, expires_at = cached
+        if expires_at is not None and expires_at <= now:
+            del entries[key]
+            self.stats["expired"] += 1
+            return False, None
+        entries.move_to_end(key)
+        return True, value
+
+    def _store(self, model, values: Dict[Any, Any], version: int) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if self._versions[model] != version:
+                return  # invalidated while we were loading
+            entries = self._entries[model]
+            for key, value in values.items():
+                entries[key] = (value, expires_at)
+                entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def all(self, db: Session, model) -> List[Any]:
+        """Every row of ``model`` as schemas, ordered by id"""
+        schema = SCHEMAS[model]
+
+        def load():
+            self._count("loads")
+            return [schema.model_validate(row).model_dump(mode="json") for row in db.query(model).order_by(model.id)]
+
+        if not self.enabled:
+            return [schema.model_validate(row) for row in load()]
+
+        version = self._sync(model)
+        with self._lock:
+            found, value = self._lookup(model, ALL, time.monotonic())
+            self.stats["hits" if found else "misses"] += 1
+        if found:
+            return value
+
+        # One worker rebuilds the shared copy while the others wait for it
+        rows = [schema.model_validate(row) for row in self._namespace(model).get_or_set(ALL, load, self.ttl, version)]
+        self._store(model, {ALL: rows, **{row.id: row for row in rows}}, version)
+        return rows
+
+    def get_many(self, db: Session, model, ids: Iterable[int]) -> Dict[int, Any]:
+        """Schemas for the existing rows among ``ids``, loading misses with one query"""
+        ids = {id for id in ids if id is not None}
+        schema = SCHEMAS[model]
+        if not self.enabled:
+            return {row.id: schema.model_validate(row) for row in db.query(model).filter(model.id.in_(ids))} if ids else {}
+
+        version = self._sync(model)
+        found: Dict[int, Any] = {}
+        missing = []
+        with self._lock:
+            now = time.monotonic()
+            for id in ids:
+                hit, value = self._lookup(model, id, now)
+                if hit:
+                    if value is not None:
+                        found[id] = value
+                else:
+                    missing.append(id)
+            self.stats["hits"] += len(ids) - len(missing)
+            self.stats["misses"] += len(missing)
+        if not missing:
+            return found
+
+        namespace = self._namespace(model)
+        loaded = {
+            id: schema.model_validate(value) if value is not None else None
+            for id, value in namespace.get_many(missing, version).items()
+        }
+        unloaded = [id for id in missing if id not in loaded]
+        if unloaded:
+            self._count("loads")
+            rows = {row.id: schema.model_validate(row) for row in db.query(model).filter(model.id.in_(unloaded))}
+            for id in unloaded:
+                # Unknown IDs are cached as None; inserting a row invalidates them
+                loaded[id] = rows.get(id)
+                namespace.set(id, loaded[id].model_dump(mode="json") if loaded[id] is not None else None, self.ttl, version)
+        self._store(model, loaded, version)
+        found.update({id: value for id, value in loaded.items() if value is not None})
+        return found
+
+    def get(self, db: Session, model, id: Optional[int]) -> Optional[Any]:
+        if id is None:
+            return None
+        return self.get_many(db, model, [id]).get(id)
+
+    def derived(self, db: Session, model, name: str, build: Callable[[List[Any]], Any]) -> Any:
+        """
+        ``build(all rows)`` kept in the local cache until the table changes
+
+        For lookup structures over a whole table (e.g. name_index.NameIndex);
+        never shared, so the value need not be serializable.
+        """
+        if not self.enabled:
+            return build(self.all(db, model))
+        version = self._sync(model)
+        key = ("derived", name)
+        with self._lock:
+            found, value = self._lookup(model, key, time.monotonic())
+            self.stats["hits" if found else "misses"] += 1
+        if found:
+            return value
+        value = build(self.all(db, model))
+        self._store(model, {key: value}, version)
+        return value
+
+    def invalidate(self, model) -> None:
+        """Drop the table's entries here and, via its shared version, in every worker"""
+        if self.enabled:
+            self._namespace(model).bump()
+        with self._lock:
+            self._entries[model].clear()
+            self._versions[model] = None
+            self.stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        for model in SCHEMAS:
+            self.invalidate(model)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = {model.__tablename__: len(entries) for model, entries in self._entries.items()}
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        stats["shared"] = {
+            model.__tablename__: namespace.metrics() for model, namespace in list(self._namespaces.items())
+        }
+        return stats
+
+
+cache = ReferenceCache()
+
+
+# Embedded task relationship -> (foreign key column, referenced model)
+TASK_REFS = {"assignee": ("assignee_id", User), "creator": ("creator_id", User), "project": ("project_id", Project)}
+
+
+def embed_task_refs(db: Session, rows: List[Any], items: List[Any]) -> List[Any]:
+    """
+    Fill assignee, creator and project on serialized ``items`` from the cache
+
+    ``rows`` are the Task rows the items were built from (loaded with
+    loaders.task_options, which skips these joins while the cache is on).
+    Sparse-fieldset dicts only get the relationship fields they already
+    have, so no unloaded foreign key column is touched.
+    """
+    wanted = [
+        [field for field in TASK_REFS if not isinstance(item, dict) or field in item]
+        for item in items
+    ]
+    ids: Dict[type, set] = {User: set(), Project: set()}
+    for row, fields in zip(rows, wanted):
+        for field in fields:
+            key, model = TASK_REFS[field]
+            ids[model].add(getattr(row, key))
+    found = {model: cache.get_many(db, model, model_ids) for model, model_ids in ids.items() if model_ids}
+
+    for row, item, fields in zip(rows, items, wanted):
+        for field in fields:
+            key, model = TASK_REFS[field]
+            value = found[model].get(getattr(row, key))
+            if isinstance(item, dict):
+                item[field] = value.model_dump(mode="json") if value is not None else None
+            else:
+                setattr(item, field, value)
+    return items
+
+
+# ============================================================================
+# SESSION HOOKS
+# ============================================================================
+
+def track_flush(session, flush_context) -> None:
+    """after_flush hook: note which reference tables this transaction wrote"""
+    touched = {
+        type(obj) for group in (session.new, session.dirty, session.deleted)
+        for obj in group if type(obj) in SCHEMAS
+    }
+    if touched:
+        session.info.setdefault(TOUCHED, set()).update(touched)
+
+
+def invalidate_committed(session) -> None:
+    """after_commit hook"""
+    for model in session.info.pop(TOUCHED, ()):
+        cache.invalidate(model)
+
+
+def discard_touched(session, transaction) -> None:
+    """after_transaction_end hook: a rolled back transaction changed nothing"""
+    if transaction.parent is None:
+        session.info.pop(TOUCHED, None)
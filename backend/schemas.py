@@ -1,22 +1,35 @@
 """
 Pydantic schemas for request/response validation
 """
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Optional, List, Any
 from datetime import datetime
-from models import TaskStatus, TaskPriority, GoalStatus
+from models import TaskStatus, TaskPriority, GoalStatus, JobStatus
 
 
 # User schemas
 class UserBase(BaseModel):
     name: str
     email: Optional[str] = None
+    aliases: List[str] = []
+
+    @field_validator("aliases", mode="before")
+    @classmethod
+    def aliases_default(cls, value):
+        """Users created before the aliases column have NULL"""
+        return value or []
 
 
 class UserCreate(UserBase):
     pass
 
 
+class UserUpdate(BaseModel):
+    name: Optional[str] = None
+    email: Optional[str] = None
+    aliases: Optional[List[str]] = None
+
+
 class User(UserBase):
     id: int
     created_at: datetime
@@ -99,6 +112,105 @@ class Task(TaskBase):
     project: Optional[Project] = None
     tags: List[Tag] = []
 
+    @field_validator("tags", mode="before")
+    @classmethod
+    def unwrap_task_tags(cls, value):
+        """models.Task.tags holds TaskTag links; serialize the linked Tag"""
+        return [getattr(item, "tag", item) for item in value or []]
+
+    class Config:
+        from_attributes = True
+
+
+class TaskChanges(BaseModel):
+    tasks: List[Task]
+    deleted: List[int]
+    next: str
+    has_more: bool
+
+
+# Bulk task schemas
+BULK_MAX_ITEMS = 5000
+
+
+class TaskBulkCreate(BaseModel):
+    tasks: List[TaskCreate] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class TaskBulkUpdateItem(TaskUpdate):
+    id: int
+
+
+class TaskBulkUpdate(BaseModel):
+    tasks: List[TaskBulkUpdateItem] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class TaskBulkDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: str  # "created", "updated", "deleted" or "error"
+    error: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+# Task import schemas
+class TaskImportRow(BaseModel):
+    """One input row of a task import; users, projects and tags may be given by name"""
+    title: str = Field(..., min_length=1)
+    description: Optional[str] = None
+    status: TaskStatus = TaskStatus.TODO
+    priority: TaskPriority = TaskPriority.MEDIUM
+    assignee: Optional[str] = None
+    assignee_id: Optional[int] = None
+    creator: Optional[str] = None
+    creator_id: Optional[int] = None
+    project: Optional[str] = None
+    project_id: Optional[int] = None
+    tags: List[str] = []
+    due_date: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def blank_to_none(cls, data):
+        """CSV cells are strings; an empty cell means the field is unset"""
+        if isinstance(data, dict):
+            return {key: value for key, value in data.items() if value not in ("", None)}
+        return data
+
+    @field_validator("tags", mode="before")
+    @classmethod
+    def split_tags(cls, value):
+        if isinstance(value, str):
+            return [name.strip() for name in value.split(";") if name.strip()]
+        return value
+
+
+class ImportRun(BaseModel):
+    id: int
+    source: str
+    format: str
+    creator_id: Optional[int] = None
+    status: JobStatus
+    rows_processed: int
+    imported: int
+    failed: int
+    errors: List[Any] = []
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+
     class Config:
         from_attributes = True
 
@@ -166,6 +278,38 @@ class Goal(GoalBase):
         from_attributes = True
 
 
+# Background job schemas
+class Job(BaseModel):
+    id: int
+    kind: str
+    status: JobStatus
+    progress: Optional[str] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+# Search schemas
+class SearchHit(BaseModel):
+    type: str  # "task" or "transcript"
+    id: int
+    title: str
+    snippet: Optional[str] = None
+    score: float  # relative to the best hit of the same type (1.0)
+
+
+class SearchResults(BaseModel):
+    results: List[SearchHit]
+    next_offset: Optional[int] = None
+
+
 # Dashboard stats
 class DashboardStats(BaseModel):
     total_tasks: int
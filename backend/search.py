@@ -0,0 +1,257 @@
+"""
+Full-text search over tasks and meeting transcripts
+
+SQLite uses FTS5 external-content tables (``tasks_fts``, ``transcripts_fts``)
+kept in sync by triggers; PostgreSQL uses generated ``tsvector`` columns
+with GIN indexes. Either way the index follows every write path (ORM, bulk
+statements, imports) without application code. Results are ranked (BM25 /
+ts_rank_cd) and paginated with limit/offset.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import Float, column, func, literal_column, select, table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from models import MeetingTranscript, Task, TaskStatus
+
+MAX_LIMIT = 100
+MAX_OFFSET = 1000
+SNIPPET_TOKENS = 16
+
+TYPES = ("task", "transcript")
+
+# Column weights: a hit in the title outranks one in the body
+TASK_WEIGHTS = (10.0, 1.0)               # title, description
+TRANSCRIPT_WEIGHTS = (10.0, 4.0, 1.0)    # title, summary, transcript
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')",
+
+    "CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts USING fts5("
+    "title, summary, transcript, content='meeting_transcripts', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS transcripts_fts_ai AFTER INSERT ON meeting_transcripts BEGIN "
+    "INSERT INTO transcripts_fts(rowid, title, summary, transcript) VALUES (new.id, new.title, new.summary, new.transcript); END",
+    "CREATE TRIGGER IF NOT EXISTS transcripts_fts_ad AFTER DELETE ON meeting_transcripts BEGIN "
+    "INSERT INTO transcripts_fts(transcripts_fts, rowid, title, summary, transcript) "
+    "VALUES ('delete', old.id, old.title, old.summary, old.transcript); END",
+    "CREATE TRIGGER IF NOT EXISTS transcripts_fts_au AFTER UPDATE OF title, summary, transcript ON meeting_transcripts BEGIN "
+    "INSERT INTO transcripts_fts(transcripts_fts, rowid, title, summary, transcript) "
+    "VALUES ('delete', old.id, old.title, old.summary, old.transcript); "
+    "INSERT INTO transcripts_fts(rowid, title, summary, transcript) VALUES (new.id, new.title, new.summary, new.transcript); END",
+    "INSERT INTO transcripts_fts(transcripts_fts) VALUES ('rebuild')",
+]
+
+POSTGRES_DDL = [
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_search_vector ON tasks USING GIN (search_vector)",
+    "ALTER TABLE meeting_transcripts ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(summary, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(transcript, '')), 'C')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_meeting_transcripts_search_vector ON meeting_transcripts USING GIN (search_vector)",
+]
+
+
+def create_search_index(conn: Connection) -> None:
+    """Create (and populate) the full-text index for the connection's dialect"""
+    ddl = POSTGRES_DDL if conn.dialect.name == "postgresql" else SQLITE_DDL
+    for statement in ddl:
+        conn.execute(text(statement))
+
+
+# ============================================================================
+# QUERIES
+# ============================================================================
+
+tasks_fts = table("tasks_fts", column("rowid"))
+transcripts_fts = table("transcripts_fts", column("rowid"))
+
+WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def fts5_query(q: str) -> Optional[str]:
+    """
+    Turn free text into a safe FTS5 query: every word must match, the last
+    one as a prefix (so results update while typing)
+    """
+    words = WORD.findall(q)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _task_filters(statement, status: Optional[TaskStatus], assignee_id: Optional[int], project_id: Optional[int]):
+    if status:
+        statement = statement.where(Task.status == status)
+    if assignee_id:
+        statement = statement.where(Task.assignee_id == assignee_id)
+    if project_id:
+        statement = statement.where(Task.project_id == project_id)
+    return statement
+
+
+def _sqlite_tasks(q: str, limit: int, **filters):
+    score = func.bm25(literal_column("tasks_fts"), *TASK_WEIGHTS)
+    statement = (
+        select(
+            literal_column("'task'").label("type"), Task.id, Task.title,
+            func.snippet(literal_column("tasks_fts"), -1, "[", "]", "…", SNIPPET_TOKENS).label("snippet"),
+            (-score).label("score"),
+        )
+        .select_from(tasks_fts.join(Task, Task.id == tasks_fts.c.rowid))
+        .where(literal_column("tasks_fts").op("MATCH")(q))
+        .order_by(score)  # bm25 is lower for better matches
+        .limit(limit)
+    )
+    return _task_filters(statement, **filters)
+
+
+def _sqlite_transcripts(q: str, limit: int):
+    score = func.bm25(literal_column("transcripts_fts"), *TRANSCRIPT_WEIGHTS)
+    return (
+        select(
+            literal_column("'transcript'").label("type"), MeetingTranscript.id, MeetingTranscript.title,
+            func.snippet(literal_column("transcripts_fts"), -1, "[", "]", "…", SNIPPET_TOKENS).label("snippet"),
+            (-score).label("score"),
+        )
+        .select_from(transcripts_fts.join(MeetingTranscript, MeetingTranscript.id == transcripts_fts.c.rowid))
+        .where(literal_column("transcripts_fts").op("MATCH")(q))
+        .order_by(score)
+        .limit(limit)
+    )
+
+
+def _postgres_ranked(model, body, q: str, limit: int):
+    """Rank rows of ``model`` by ts_rank_cd, computing headlines only for the page"""
+    query = func.websearch_to_tsquery("english", q)
+    vector = literal_column(f"{model.__tablename__}.search_vector")
+    score = func.ts_rank_cd(vector, query).cast(Float)
+    return (
+        select(model.id, model.title, body.label("body"), score.label("score"))
+        .where(vector.op("@@")(query))
+        .order_by(score.desc(), model.id)
+        .limit(limit)
+    )
+
+
+def _postgres_page(ranked, kind: str, q: str):
+    page = ranked.subquery()
+    headline = func.ts_headline(
+        "english", func.coalesce(page.c.body, ""), func.websearch_to_tsquery("english", q),
+        f"StartSel=[, StopSel=], MaxWords={SNIPPET_TOKENS}, MinWords=5",
+    )
+    return select(
+        literal_column(f"'{kind}'").label("type"), page.c.id, page.c.title,
+        headline.label("snippet"), page.c.score,
+    ).order_by(page.c.score.desc(), page.c.id)
+
+
+def match_tasks(db: Session, terms: List[str], limit: int, statuses: Optional[List[TaskStatus]] = None) -> List[Tuple[int, float]]:
+    """
+    (task id, relevance) for the ``limit`` tasks best matching any of ``terms``
+
+    Unlike ``search`` every word is optional, so this ranks tasks by how much
+    of a longer text (e.g. a meeting transcript) they share. Higher is better.
+    """
+    terms = [term for term in terms if WORD.fullmatch(term)]
+    if not terms:
+        return []
+    if db.bind.dialect.name == "postgresql":
+        query = func.to_tsquery("english", " | ".join(terms))
+        vector = literal_column("tasks.search_vector")
+        score = func.ts_rank_cd(vector, query).cast(Float)
+        statement = (
+            select(Task.id, score.label("score"))
+            .where(vector.op("@@")(query))
+            .order_by(score.desc(), Task.id)
+        )
+    else:
+        score = func.bm25(literal_column("tasks_fts"), *TASK_WEIGHTS)
+        statement = (
+            select(Task.id, (-score).label("score"))
+            .select_from(tasks_fts.join(Task, Task.id == tasks_fts.c.rowid))
+            .where(literal_column("tasks_fts").op("MATCH")(" OR ".join(f'"{term}"' for term in terms)))
+            .order_by(score)
+        )
+    if statuses:
+        statement = statement.where(Task.status.in_(statuses))
+    return [(row.id, row.score) for row in db.execute(statement.limit(limit))]
+
+
+def normalize_scores(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Scale one type's scores so its best hit scores 1.0
+
+    BM25 / ts_rank scores from different indexes (other columns, weights and
+    document lengths) are not comparable, so merged results are ordered by
+    each hit's score relative to the best of its own type. The best hit is
+    in every page's window, so a hit's score does not change with ``offset``.
+    """
+    best = max((hit["score"] for hit in hits), default=0.0)
+    for hit in hits:
+        hit["score"] = hit["score"] / best if best > 0 else 0.0
+    return hits
+
+
+def search(
+    db: Session,
+    q: str,
+    types: List[str] = TYPES,
+    limit: int = 20,
+    offset: int = 0,
+    status: Optional[TaskStatus] = None,
+    assignee_id: Optional[int] = None,
+    project_id: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Ranked search results for ``q`` with ``limit``/``offset`` paging
+
+    Task filters narrow task hits only. When both types are searched, each
+    is ranked separately and the top ``offset + limit`` of each are merged
+    by normalized score (see ``normalize_scores``).
+    """
+    window = offset + limit + 1  # one extra row tells us whether there is a next page
+    filters = {"status": status, "assignee_id": assignee_id, "project_id": project_id}
+    statements = []
+    if db.bind.dialect.name == "postgresql":
+        if not q.strip():
+            return {"results": [], "next_offset": None}
+        if "task" in types:
+            ranked = _task_filters(_postgres_ranked(Task, Task.description, q, window), **filters)
+            statements.append(_postgres_page(ranked, "task", q))
+        if "transcript" in types:
+            body = func.coalesce(MeetingTranscript.summary, "") + " " + MeetingTranscript.transcript
+            statements.append(_postgres_page(_postgres_ranked(MeetingTranscript, body, q, window), "transcript", q))
+    else:
+        match = fts5_query(q)
+        if match is None:
+            return {"results": [], "next_offset": None}
+        if "task" in types:
+            statements.append(_sqlite_tasks(match, window, **filters))
+        if "transcript" in types:
+            statements.append(_sqlite_transcripts(match, window))
+
+    # Ties (common with short titles) alternate between the types by rank
+    ranked = []
+    for statement in statements:
+        type_hits = normalize_scores([dict(row._mapping) for row in db.execute(statement)])
+        ranked.extend((-hit["score"], position, hit["type"], hit) for position, hit in enumerate(type_hits))
+    ranked.sort(key=lambda item: item[:3])
+    hits = [item[3] for item in ranked]
+    page = hits[offset:offset + limit]
+    next_offset = offset + limit if len(hits) > offset + limit and offset + limit <= MAX_OFFSET else None
+    return {"results": page, "next_offset": next_offset}
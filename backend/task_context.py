@@ -0,0 +1,132 @@
+"""
+Choosing which active tasks to show the LLM for a meeting transcript
+
+The prompt can only list a few tasks, and the LLM can only report updates
+to tasks it sees, so the list should be the ones the meeting talks about.
+Candidates come from a handful of bounded queries:
+
+- the full-text index (search.py), ranked by BM25 / ts_rank against the
+  transcript's most frequent content words
+- tasks referenced by number ("#123", "task 123")
+- the latest tasks of people mentioned in the meeting (name_index.py)
+- the most recently updated tasks, so a meeting with no matching words
+  still gets the board's current work
+
+Each candidate is scored by text relevance plus boosts for an explicit
+reference, a mentioned assignee and recent activity; the best come first.
+"""
+import math
+import os
+import re
+from collections import Counter
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from models import Task, TaskStatus
+from name_index import NameIndex
+import search as search_index
+
+ACTIVE_STATUSES = [TaskStatus.TODO, TaskStatus.IN_PROGRESS, TaskStatus.IN_REVIEW, TaskStatus.BLOCKED]
+
+TASK_CONTEXT_TERMS = int(os.getenv("TASK_CONTEXT_TERMS", "24"))  # transcript words sent to the index
+TASK_CONTEXT_CANDIDATES = int(os.getenv("TASK_CONTEXT_CANDIDATES", "100"))  # per candidate query
+
+# Score = text relevance (0-1, relative to the best match) plus these boosts
+REFERENCE_BOOST = 2.0    # the transcript names the task's number
+ASSIGNEE_BOOST = 0.4     # the task's assignee is mentioned in the meeting
+RECENCY_BOOST = 0.3      # for a task updated just now, halving every...
+RECENCY_HALF_LIFE_DAYS = 14.0
+
+MAX_REFERENCES = 50
+
+WORD = re.compile(r"[^\W\d_]\w*", re.UNICODE)
+REFERENCE = re.compile(r"(?:#|\btask\s+#?)(\d{1,9})\b", re.IGNORECASE)
+
+# Function words and meeting filler that match everything and mean nothing
+# (contractions split at the apostrophe, so "don't" leaves "don")
+STOPWORDS = frozenset("""
+about above after again against all also and any are aren because been before being below between
+both but can cannot could couldn did didn does doesn doing don down during each few for from further
+get gets getting goes going gonna got had hadn has hasn have haven having her here hers herself him
+himself his how into isn its itself just know let like lot make maybe more most much must mustn myself
+need needs nor not now off okay once one only other ought our ours ourselves out over own really right
+said same say says see shan she should shouldn some still such sure take talk than thank thanks that the their
+theirs them themselves then there these they thing things think this those though through too under
+until very want was wasn way well were weren what when where which while who whom why will with won
+would wouldn yeah yes yet you your yours yourself yourselves
+""".split())
+
+
+class ContextTask(NamedTuple):
+    id: int
+    title: str
+    status: TaskStatus
+    assignee_id: Optional[int]
+    updated_at: Optional[datetime]
+    score: float
+
+
+def salient_terms(text: str, exclude: Set[str] = frozenset(), limit: int = TASK_CONTEXT_TERMS) -> List[str]:
+    """The transcript's most frequent content words, most frequent first"""
+    counts = Counter(
+        word for word in (match.lower() for match in WORD.findall(text))
+        if len(word) > 2 and word not in STOPWORDS and word not in exclude
+    )
+    return [word for word, _ in counts.most_common(limit)]
+
+
+def referenced_task_ids(text: str) -> Set[int]:
+    return {int(number) for number in REFERENCE.findall(text)[:MAX_REFERENCES]}
+
+
+def _columns():
+    return (Task.id, Task.title, Task.status, Task.assignee_id, Task.updated_at)
+
+
+def _active(db: Session):
+    return db.query(*_columns()).filter(Task.status.in_(ACTIVE_STATUSES))
+
+
+def rank_tasks(db: Session, transcript: str, users: NameIndex, now: Optional[datetime] = None) -> List[ContextTask]:
+    """Active tasks most likely to be discussed in ``transcript``, best first"""
+    now = now or datetime.utcnow()
+    candidates = TASK_CONTEXT_CANDIDATES
+    people = users.mentioned(transcript)
+    references = referenced_task_ids(transcript)
+
+    relevance = dict(search_index.match_tasks(
+        db, salient_terms(transcript, exclude=users.vocabulary), candidates, statuses=ACTIVE_STATUSES
+    ))
+
+    rows = {}
+    queries = [_active(db).order_by(Task.updated_at.desc(), Task.id.desc()).limit(candidates)]
+    if relevance or references:
+        # By primary key only: with the status filter as well, SQLite walks
+        # the status index over every active task instead
+        queries.append(db.query(*_columns()).filter(Task.id.in_(set(relevance) | references)))
+    if people:
+        queries.append(
+            _active(db).filter(Task.assignee_id.in_(people))
+            .order_by(Task.created_at.desc(), Task.id.desc()).limit(candidates)
+        )
+    for query in queries:
+        for row in query:
+            if row.status in ACTIVE_STATUSES:
+                rows[row.id] = row
+
+    best = max(relevance.values(), default=0.0)
+    ranked = []
+    for row in rows.values():
+        score = relevance.get(row.id, 0.0) / best if best > 0 else 0.0
+        if row.id in references:
+            score += REFERENCE_BOOST
+        if row.assignee_id in people:
+            score += ASSIGNEE_BOOST
+        if row.updated_at is not None:
+            age_days = max((now - row.updated_at).total_seconds(), 0) / 86400
+            score += RECENCY_BOOST * math.pow(0.5, age_days / RECENCY_HALF_LIFE_DAYS)
+        ranked.append(ContextTask(row.id, row.title, row.status, row.assignee_id, row.updated_at, score))
+    ranked.sort(key=lambda task: (-task.score, -task.id))
+    return ranked
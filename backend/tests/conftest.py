@@ -0,0 +1,64 @@
+"""
+Shared fixtures: main.app over throwaway SQLite databases
+
+The environment is set before main is imported, so the tests never touch
+a configured database, start job workers or need an OpenAI key. Requests
+and jobs run with QUERY_DIAGNOSTICS=raise: one that repeats a query shape
+(an N+1) fails the test with QueryBudgetExceeded.
+
+``client`` and ``db`` use the app's own (migrated) test database, which
+the tests share: each test creates the rows it needs. ``seeded`` serves
+the app from a separate database with thousands of generated tasks.
+"""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="tests_")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ["JOB_WORKERS"] = "0"
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'app.db')}"
+os.environ["IMPORT_SPOOL_DIR"] = os.path.join(_tmp, "imports")
+os.environ["QUERY_DIAGNOSTICS"] = "raise"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.query_budget import seeded_client
+
+N_TASKS = 5_000
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    """(client, engine, session factory) over a migrated, seeded database"""
+    with seeded_client(N_TASKS, upgrade=True) as app_parts:
+        yield app_parts
+
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient for main.app, started up (database migrated) once"""
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db(client):
+    """A session on the app's database"""
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def user(client):
+    """A new user to create and assign tasks with"""
+    response = client.post("/users", json={"name": f"Test User {os.urandom(4).hex()}"})
+    response.raise_for_status()
+    return response.json()
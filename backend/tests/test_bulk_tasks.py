@@ -0,0 +1,98 @@
+"""POST, PATCH and DELETE /tasks/bulk: per-item results and partial failures"""
+import uuid
+
+import pytest
+
+from models import Task, TaskTag
+
+
+@pytest.fixture
+def tag(client):
+    response = client.post("/tags", json={"name": f"Bulk {uuid.uuid4().hex[:8]}"})
+    response.raise_for_status()
+    return response.json()
+
+
+def tag_ids(db, task_id):
+    return {link.tag_id for link in db.query(TaskTag).filter(TaskTag.task_id == task_id)}
+
+
+def test_bulk_create_pairs_ids_with_items(client, db, user, tag):
+    prefix = uuid.uuid4().hex[:8]
+    items = [
+        # Alternating None and set columns, so rows differ in shape
+        {"title": f"{prefix} 0", "creator_id": user["id"], "assignee_id": user["id"], "tag_ids": [tag["id"]]},
+        {"title": f"{prefix} 1", "creator_id": user["id"], "tag_ids": [999_999]},
+        {"title": f"{prefix} 2", "creator_id": user["id"], "priority": "high"},
+        {"title": f"{prefix} 3", "creator_id": user["id"], "assignee_id": user["id"], "tag_ids": [tag["id"], tag["id"]]},
+    ]
+    response = client.post("/tasks/bulk", json={"tasks": items})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (3, 1)
+    assert [result["index"] for result in body["results"]] == [0, 1, 2, 3]
+    assert body["results"][1] == {"index": 1, "id": None, "status": "error", "error": "Tags not found: [999999]"}
+
+    for result in body["results"]:
+        if result["status"] == "created":
+            task = db.get(Task, result["id"])
+            item = items[result["index"]]
+            assert task.title == item["title"]
+            assert task.assignee_id == item.get("assignee_id")
+            assert tag_ids(db, task.id) == set(item.get("tag_ids", []))
+    assert db.query(Task).filter(Task.title == f"{prefix} 1").count() == 0
+
+
+def test_bulk_create_rejects_invalid_items(client, user):
+    response = client.post("/tasks/bulk", json={"tasks": [{"title": "no creator"}]})
+    assert response.status_code == 422
+    assert client.post("/tasks/bulk", json={"tasks": []}).status_code == 422
+
+
+def test_bulk_update_reports_each_item(client, db, user, tag):
+    created = client.post("/tasks/bulk", json={"tasks": [
+        {"title": f"Bulk update {n}", "creator_id": user["id"]} for n in range(2)
+    ]}).json()
+    first, second = (result["id"] for result in created["results"])
+
+    response = client.patch("/tasks/bulk", json={"tasks": [
+        {"id": first, "status": "in_progress", "tag_ids": [tag["id"]]},
+        {"id": 999_999, "status": "done"},
+        {"id": second, "title": None},
+        {"id": second, "tag_ids": [999_999]},
+        {"id": first, "status": "done"},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (2, 3)
+    assert [(result["id"], result["status"], result["error"]) for result in body["results"]] == [
+        (first, "updated", None),
+        (999_999, "error", "Task not found"),
+        (second, "error", "title cannot be null"),
+        (second, "error", "Tags not found: [999999]"),
+        (first, "updated", None),
+    ]
+
+    db.expire_all()
+    # Repeated IDs are applied in order
+    updated = db.get(Task, first)
+    assert updated.status.value == "done" and updated.completed_at is not None
+    assert tag_ids(db, first) == {tag["id"]}
+    untouched = db.get(Task, second)
+    assert (untouched.title, untouched.status.value) == ("Bulk update 1", "todo")
+
+
+def test_bulk_delete_reports_unknown_ids(client, db, user, tag):
+    created = client.post("/tasks/bulk", json={"tasks": [
+        {"title": f"Bulk delete {n}", "creator_id": user["id"], "tag_ids": [tag["id"]]} for n in range(2)
+    ]}).json()
+    ids = [result["id"] for result in created["results"]]
+
+    response = client.request("DELETE", "/tasks/bulk", json={"ids": [ids[0], 999_999, ids[1]]})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (2, 1)
+    assert [result["status"] for result in body["results"]] == ["deleted", "error", "deleted"]
+    assert body["results"][1]["error"] == "Task not found"
+    assert db.query(Task).filter(Task.id.in_(ids)).count() == 0
+    assert db.query(TaskTag).filter(TaskTag.task_id.in_(ids)).count() == 0
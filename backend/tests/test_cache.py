@@ -0,0 +1,242 @@
+"""Cache backends and namespaces (cache.py), with a small in-process RESP server for redis"""
+import os
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+import cache
+
+
+class FakeRedis(socketserver.ThreadingTCPServer):
+    """
+    Just enough of a Redis server for RedisBackend
+
+    ``hang_up_after`` names commands the server runs and then answers by
+    closing the connection, as if it died before replying.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeRedisHandler)
+        self.data = {}
+        self.lock = threading.Lock()
+        self.commands = []
+        self.connections = 0
+        self.hang_up_after = set()
+
+    @property
+    def url(self) -> str:
+        return "redis://127.0.0.1:%d" % self.server_address[1]
+
+    def _live(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.time():
+            del self.data[key]
+            return None
+        return value
+
+    def run(self, args):
+        command, args = args[0].upper(), args[1:]
+        if command == "GET":
+            return self._live(args[0])
+        if command == "MGET":
+            return [self._live(key) for key in args]
+        if command == "SET":
+            options = [arg.upper() for arg in args[2:]]
+            if "NX" in options and self._live(args[0]) is not None:
+                return None
+            ttl = int(args[2 + options.index("PX") + 1]) / 1000 if "PX" in options else None
+            self.data[args[0]] = (args[1], time.time() + ttl if ttl else None)
+            return "+OK"
+        if command == "DEL":
+            return int(self.data.pop(args[0], None) is not None)
+        if command == "INCR":
+            value = int(self._live(args[0]) or 0) + 1
+            self.data[args[0]] = (str(value), None)
+            return value
+        if command in ("AUTH", "SELECT"):
+            return "+OK"
+        return RuntimeError(f"ERR unknown command '{command}'")
+
+
+def encode(reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, Exception):
+        return b"-%s\r\n" % str(reply).encode()
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, list):
+        return b"*%d\r\n" % len(reply) + b"".join(encode(item) for item in reply)
+    if reply.startswith("+"):
+        return reply.encode() + b"\r\n"
+    return b"$%d\r\n%s\r\n" % (len(reply.encode()), reply.encode())
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2].decode())
+            with server.lock:
+                server.commands.append(args)
+                reply = server.run(args)
+                hang_up = args[0].upper() in server.hang_up_after
+            if hang_up:
+                return
+            self.wfile.write(encode(reply))
+
+
+@pytest.fixture
+def redis_server():
+    server = FakeRedis()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "redis":
+        return cache.RedisBackend(request.getfixturevalue("redis_server").url)
+    return cache.make_backend(request.param, os.path.join(tmp_path, "cache.db"))
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+def test_backend_commands(backend):
+    assert backend.get("missing") is None
+    backend.set("a", "1")
+    backend.set("b", "two", ttl=60)
+    assert backend.get_many(["a", "missing", "b"]) == ["1", None, "two"]
+    assert backend.get_many([]) == []
+
+    assert backend.add("lock", "x", ttl=60) is True
+    assert backend.add("lock", "y", ttl=60) is False
+    assert backend.get("lock") == "x"
+    backend.delete("lock")
+    assert backend.add("lock", "y") is True
+
+    assert [backend.incr("n"), backend.incr("n")] == [1, 2]
+
+
+def test_backend_ttl(backend):
+    backend.set("short", "v", ttl=0.05)
+    assert backend.add("lock", "x", ttl=0.05)
+    time.sleep(0.1)
+    assert backend.get("short") is None
+    assert backend.add("lock", "y") is True
+
+
+def test_namespace_bump_and_get_or_set(backend):
+    namespace = cache.Namespace("test", backend)
+    namespace.set("k", {"v": 1})
+    assert namespace.get("k") == {"v": 1}
+    namespace.bump()
+    assert namespace.get("k") is cache.MISSING
+
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return [1, 2]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(namespace.get_or_set("rebuilt", loader))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [[1, 2]] * 4
+    assert len(calls) == 1
+
+
+# ============================================================================
+# REDIS CONNECTION HANDLING
+# ============================================================================
+
+def test_auth_and_db_from_the_url(redis_server):
+    backend = cache.RedisBackend(redis_server.url.replace("redis://", "redis://:secret@") + "/3")
+    backend.set("k", "v")
+    assert redis_server.commands[:3] == [["AUTH", "secret"], ["SELECT", "3"], ["SET", "k", "v"]]
+
+
+def test_error_reply_keeps_the_connection(redis_server):
+    backend = cache.RedisBackend(redis_server.url)
+    with pytest.raises(cache.RedisError, match="unknown command"):
+        backend._command("FLUSHALL")
+    assert backend.incr("n") == 1
+    assert redis_server.connections == 1
+
+
+def test_refused_connection_is_retried(redis_server, monkeypatch):
+    backend = cache.RedisBackend(redis_server.url)
+    connect = socket.create_connection
+    attempts = []
+
+    def flaky_connect(*args, **kwargs):
+        attempts.append(args)
+        if len(attempts) == 1:
+            raise ConnectionRefusedError("not yet")
+        return connect(*args, **kwargs)
+
+    monkeypatch.setattr(socket, "create_connection", flaky_connect)
+    assert backend.incr("n") == 1
+    assert len(attempts) == 2
+
+
+def test_failed_write_is_retried_on_a_new_connection(redis_server, monkeypatch):
+    backend = cache.RedisBackend(redis_server.url)
+    backend.get("warm")
+    write = backend._write
+    failures = []
+
+    def broken_once(*args):
+        if not failures:
+            failures.append(args)
+            raise BrokenPipeError("connection reset")
+        return write(*args)
+
+    monkeypatch.setattr(backend, "_write", broken_once)
+    assert backend.incr("n") == 1
+    assert redis_server.commands.count(["INCR", "n"]) == 1
+    assert redis_server.connections == 2
+
+
+def test_command_that_reached_the_server_is_not_retried(redis_server):
+    backend = cache.RedisBackend(redis_server.url)
+    redis_server.hang_up_after.add("INCR")
+    with pytest.raises(ConnectionError):
+        backend.incr("n")
+    # The server ran it once; a retry would have counted twice
+    assert redis_server.commands.count(["INCR", "n"]) == 1
+    assert redis_server.data["n"][0] == "1"
+
+    redis_server.hang_up_after.clear()
+    assert backend.incr("n") == 2
+
+
+def test_server_down_raises_after_one_retry():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    backend = cache.RedisBackend(f"redis://127.0.0.1:{port}", timeout=0.5)
+    with pytest.raises(ConnectionError):
+        backend.get("k")
@@ -0,0 +1,82 @@
+"""Change feed (changefeed.py): events for task writes as a filtered subscriber sees them"""
+import asyncio
+import uuid
+
+import pytest
+
+import changefeed
+
+
+@pytest.fixture
+def projects(client):
+    created = []
+    for _ in range(2):
+        response = client.post("/projects", json={"name": f"Feed {uuid.uuid4().hex[:8]}"})
+        response.raise_for_status()
+        created.append(response.json()["id"])
+    return created
+
+
+def current_token() -> str:
+    return changefeed.broadcaster.reset_event()["token"]
+
+
+def events_since(token: str, **filters):
+    """Events after ``token`` delivered to a subscriber with ``filters`` (replayed from the buffer)"""
+    async def drain():
+        subscription = changefeed.broadcaster.subscribe(since=token, **filters)
+        try:
+            events = []
+            while (event := await subscription.next_event(timeout=0.05)) is not None:
+                events.append(event)
+            return events
+        finally:
+            subscription.close()
+
+    return asyncio.run(drain())
+
+
+def ops(events, task_ids):
+    return [(event["op"], event["id"]) for event in events if event.get("id") in task_ids]
+
+
+def test_task_leaving_the_filter_is_removed(client, user, projects):
+    inside, outside = projects
+    token = current_token()
+    task = client.post("/tasks", json={"title": "Moves", "creator_id": user["id"], "project_id": inside}).json()
+    client.patch(f"/tasks/{task['id']}", json={"project_id": outside}).raise_for_status()
+    client.patch(f"/tasks/{task['id']}", json={"title": "Moved"}).raise_for_status()
+
+    seen = events_since(token, project_id=inside)
+    assert ops(seen, {task["id"]}) == [("created", task["id"]), ("removed", task["id"])]
+    removed = seen[-1]
+    assert removed["fields"]["project_id"] == outside
+    assert removed["previous"] == {"project_id": inside}
+    # The other project's subscriber sees the task arrive, then its update
+    assert ops(events_since(token, project_id=outside), {task["id"]}) == [
+        ("updated", task["id"]), ("updated", task["id"])
+    ]
+
+
+def test_deletes_reach_filtered_subscribers(client, user, projects):
+    project = projects[0]
+    single = client.post("/tasks", json={"title": "Deleted", "creator_id": user["id"], "project_id": project}).json()
+    bulk = client.post("/tasks/bulk", json={"tasks": [
+        {"title": f"Bulk deleted {n}", "creator_id": user["id"], "project_id": project} for n in range(2)
+    ]}).json()
+    bulk_ids = [result["id"] for result in bulk["results"]]
+
+    token = current_token()
+    assert client.delete(f"/tasks/{single['id']}").status_code == 204
+    client.request("DELETE", "/tasks/bulk", json={"ids": bulk_ids}).raise_for_status()
+
+    ids = {single["id"], *bulk_ids}
+    expected = [("deleted", single["id"])] + [("deleted", task_id) for task_id in bulk_ids]
+    assert ops(events_since(token, project_id=project), ids) == expected
+    assert ops(events_since(token, types={"task"}), ids) == expected
+    assert ops(events_since(token, types={"goal"}), ids) == []
+
+
+def test_unknown_or_stale_token_resets(client):
+    assert [event["op"] for event in events_since("not-a-token")] == ["reset"]
+    assert [event["op"] for event in events_since(f"{changefeed.broadcaster.boot_id}-999999999")] == ["reset"]
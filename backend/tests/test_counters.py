@@ -0,0 +1,68 @@
+"""The task counters behind GET /stats stay exact through every task write endpoint"""
+import uuid
+
+import pytest
+
+import counters
+
+
+@pytest.fixture
+def other_user(client):
+    response = client.post("/users", json={"name": f"Counter User {uuid.uuid4().hex[:8]}"})
+    response.raise_for_status()
+    return response.json()
+
+
+def assert_counters_exact(client, db):
+    db.expire_all()
+    assert counters.verify_counters(db) == []
+    stats = client.get("/stats").json()
+    assert stats == counters.dashboard_stats(db, counters.compute_counters(db))
+    return stats
+
+
+def test_counters_follow_task_writes(client, db, user, other_user):
+    before = assert_counters_exact(client, db)
+
+    response = client.post("/tasks", json={
+        "title": "Counted", "creator_id": user["id"], "assignee_id": user["id"], "priority": "high"
+    })
+    assert response.status_code == 201
+    task_id = response.json()["id"]
+    stats = assert_counters_exact(client, db)
+    assert (stats["total_tasks"], stats["todo_tasks"]) == (before["total_tasks"] + 1, before["todo_tasks"] + 1)
+
+    response = client.patch(f"/tasks/{task_id}", json={"status": "done", "assignee_id": other_user["id"]})
+    response.raise_for_status()
+    stats = assert_counters_exact(client, db)
+    assert stats["completed_tasks"] == before["completed_tasks"] + 1
+    assert stats["tasks_by_user"][other_user["name"]] == 1
+
+    response = client.post("/tasks/bulk", json={"tasks": [
+        {"title": f"Bulk counted {n}", "creator_id": user["id"], "assignee_id": user["id"]} for n in range(3)
+    ]})
+    assert response.json()["succeeded"] == 3
+    bulk_ids = [result["id"] for result in response.json()["results"]]
+    stats = assert_counters_exact(client, db)
+    assert stats["tasks_by_user"][user["name"]] == 3
+
+    response = client.patch("/tasks/bulk", json={"tasks": [
+        {"id": bulk_ids[0], "status": "blocked"},
+        {"id": bulk_ids[1], "status": "in_progress", "assignee_id": other_user["id"]},
+        {"id": task_id, "status": "todo", "priority": "low"},
+    ]})
+    assert response.json()["succeeded"] == 3
+    stats = assert_counters_exact(client, db)
+    assert stats["blocked_tasks"] == before["blocked_tasks"] + 1
+    assert stats["tasks_by_user"][other_user["name"]] == 2
+
+    assert client.delete(f"/tasks/{task_id}").status_code == 204
+    assert_counters_exact(client, db)
+
+    response = client.request("DELETE", "/tasks/bulk", json={"ids": bulk_ids})
+    assert response.json()["succeeded"] == 3
+    stats = assert_counters_exact(client, db)
+    assert {key: stats[key] for key in before if key.endswith("tasks")} == {
+        key: before[key] for key in before if key.endswith("tasks")
+    }
+    assert user["name"] not in stats["tasks_by_user"] and other_user["name"] not in stats["tasks_by_user"]
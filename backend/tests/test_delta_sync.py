@@ -0,0 +1,75 @@
+"""GET /tasks/changes: sync tokens, tombstones and the settle window"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import delta_sync
+
+
+@pytest.fixture
+def settled(monkeypatch):
+    """No settle window: the token moves right up to the last row sent"""
+    monkeypatch.setattr(delta_sync, "TASK_CHANGES_SETTLE", timedelta(0))
+
+
+def sync(client, since=None):
+    """Follow ``next`` until ``has_more`` is clear; returns (tasks by id, deleted ids, token)"""
+    tasks, deleted = {}, []
+    while True:
+        params = {"limit": 1000} if since is None else {"since": since, "limit": 1000}
+        response = client.get("/tasks/changes", params=params)
+        assert response.status_code == 200
+        body = response.json()
+        deleted.extend(body["deleted"])
+        tasks.update((task["id"], task) for task in body["tasks"])
+        since = body["next"]
+        if not body["has_more"]:
+            return tasks, deleted, since
+
+
+def create_task(client, user, title):
+    response = client.post("/tasks", json={"title": title, "creator_id": user["id"]})
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+def test_token_round_trip_with_tombstones(client, user, settled):
+    kept = create_task(client, user, "Synced and kept")
+    doomed = create_task(client, user, "Synced then deleted")
+    replica, _, token = sync(client)
+    assert {kept, doomed} <= set(replica)
+
+    client.patch(f"/tasks/{kept}", json={"status": "blocked"}).raise_for_status()
+    created = create_task(client, user, "Created after sync")
+    short_lived = create_task(client, user, "Created and deleted after sync")
+    assert client.delete(f"/tasks/{doomed}").status_code == 204
+    client.request("DELETE", "/tasks/bulk", json={"ids": [short_lived]}).raise_for_status()
+
+    tasks, deleted, token = sync(client, token)
+    assert set(tasks) == {kept, created}
+    assert tasks[kept]["status"] == "blocked"
+    assert set(deleted) == {doomed, short_lived}
+
+    # Applying deleted, then tasks, brings the replica up to date
+    for task_id in deleted:
+        replica.pop(task_id, None)
+    replica.update(tasks)
+    assert replica[kept]["status"] == "blocked" and doomed not in replica and created in replica
+
+    # Nothing changed since: the token round-trips to an empty delta
+    assert sync(client, token)[:2] == ({}, [])
+
+
+def test_settle_window_resends_recent_changes(client, user):
+    _, _, token = sync(client)
+    task_id = create_task(client, user, "Inside the settle window")
+    first, _, token = sync(client, token)
+    again, _, _ = sync(client, token)
+    assert task_id in first and task_id in again
+
+
+def test_bad_and_expired_tokens(client):
+    assert client.get("/tasks/changes", params={"since": "garbage"}).status_code == 400
+    expired = delta_sync.encode_token(None, (datetime.utcnow() - timedelta(days=31), 0))
+    response = client.get("/tasks/changes", params={"since": expired})
+    assert response.status_code == 410
@@ -0,0 +1,75 @@
+"""N+1 detection: diagnostics.budget() and the QUERY_DIAGNOSTICS=raise request tracking"""
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import selectinload
+
+import diagnostics
+from benchmarks.query_budget import get
+from database import SessionLocal
+from models import Task, User
+
+
+@pytest.fixture
+def assigned_task_ids(db, user):
+    """Ids of tasks that each have their own assignee"""
+    prefix = uuid.uuid4().hex[:8]
+    tasks = [
+        Task(title=f"{prefix} {n}", creator_id=user["id"], assignee=User(name=f"{prefix} user {n}"))
+        for n in range(8)
+    ]
+    db.add_all(tasks)
+    db.commit()
+    return [task.id for task in tasks]
+
+
+def assignee_names(db, task_ids, *options):
+    db.expire_all()
+    return [task.assignee.name for task in db.query(Task).options(*options).filter(Task.id.in_(task_ids))]
+
+
+def test_planted_n_plus_one_fails_the_budget(db, assigned_task_ids):
+    # The lazy task.assignee load runs one SELECT per task
+    with pytest.raises(diagnostics.QueryBudgetExceeded, match="N\\+1"):
+        with diagnostics.budget():
+            assignee_names(db, assigned_task_ids)
+
+
+def test_eager_loading_fits_the_budget(db, assigned_task_ids):
+    with diagnostics.budget(max_statements=2) as tracker:
+        assert len(assignee_names(db, assigned_task_ids, selectinload(Task.assignee))) == 8
+    assert tracker.statements == 2
+    assert all(statement.lstrip().upper().startswith("SELECT") for statement, _ in tracker.executed)
+
+
+@pytest.fixture
+def planted_app():
+    """An app with one endpoint that loads each task's assignee lazily"""
+    app = FastAPI()
+    app.add_middleware(diagnostics.DiagnosticsMiddleware)
+
+    @app.get("/assignees")
+    def assignees(ids: str):
+        db = SessionLocal()
+        try:
+            return assignee_names(db, [int(task_id) for task_id in ids.split(",")])
+        finally:
+            db.close()
+
+    return app
+
+
+def test_planted_n_plus_one_fails_a_request(planted_app, assigned_task_ids):
+    # QUERY_DIAGNOSTICS=raise (tests/conftest.py) tracks every request
+    ids = ",".join(map(str, assigned_task_ids))
+    with pytest.raises(diagnostics.QueryBudgetExceeded, match="GET /assignees"):
+        TestClient(planted_app).get(f"/assignees?ids={ids}")
+
+
+def test_budget_counts_requests_served_in_its_context(planted_app, assigned_task_ids):
+    ids = ",".join(map(str, assigned_task_ids))
+    with pytest.raises(diagnostics.QueryBudgetExceeded, match="budget: query repeated"):
+        with diagnostics.budget():
+            get(planted_app, f"/assignees?ids={ids}")
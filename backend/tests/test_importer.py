@@ -0,0 +1,192 @@
+"""Task imports (importer.py) and the POST /tasks/import + GET /imports/{id} endpoints"""
+import io
+import json
+import os
+import uuid
+
+import pytest
+
+import importer
+import jobs
+from models import ImportRun, Job, JobStatus, Task, TaskTag
+
+
+def unique(prefix: str) -> str:
+    return f"{prefix} {uuid.uuid4().hex[:8]}"
+
+
+def ndjson(*rows) -> io.StringIO:
+    return io.StringIO("".join((row if isinstance(row, str) else json.dumps(row)) + "\n" for row in rows))
+
+
+def titled(db, prefix: str):
+    return db.query(Task).filter(Task.title.startswith(prefix)).order_by(Task.id).all()
+
+
+def run_queued_jobs():
+    pool = jobs.JobWorkerPool(concurrency=0)
+    while pool.run_once() is not None:
+        pass
+
+
+@pytest.fixture
+def names(client):
+    """A user, project and two tags, created with unique names"""
+    created = {}
+    for key, path in (("user", "/users"), ("project", "/projects"), ("tag", "/tags"), ("tag2", "/tags")):
+        response = client.post(path, json={"name": unique(key.title())})
+        response.raise_for_status()
+        created[key] = response.json()
+    return created
+
+
+def test_row_errors_are_reported_per_row(db, user):
+    prefix = unique("Rows")
+    run = importer.start_import(db, "rows.ndjson", "ndjson", user["id"])
+    stream = ndjson(
+        {"title": f"{prefix} ok 1"},
+        {"title": ""},
+        "not json",
+        {"title": f"{prefix} bad status", "status": "someday"},
+        {"title": f"{prefix} unknown assignee", "assignee": "Nobody At All"},
+        {"title": f"{prefix} ok 2"},
+    )
+    importer.import_tasks(db, stream, run)
+
+    assert run.status == JobStatus.SUCCEEDED
+    assert (run.rows_processed, run.imported, run.failed) == (6, 2, 4)
+    errors = {error["row"]: error["error"] for error in run.errors}
+    assert sorted(errors) == [2, 3, 4, 5]
+    assert "title" in errors[2]
+    assert "JSON object" in errors[3]
+    assert "status" in errors[4]
+    assert "Unknown assignee: Nobody At All" in errors[5]
+    assert [task.title for task in titled(db, prefix)] == [f"{prefix} ok 1", f"{prefix} ok 2"]
+
+
+def test_names_resolve_to_ids(db, user, names):
+    prefix = unique("Names")
+    stream = io.StringIO(
+        "title,assignee,creator,project,tags,assignee_id\n"
+        f"{prefix} by name,{names['user']['name'].upper()},{names['user']['name']},"
+        f"{names['project']['name']},{names['tag']['name']}; {names['tag2']['name'].lower()},\n"
+        f"{prefix} by id,,,,,{user['id']}\n"
+        f"{prefix} unknown project,,,No Such Project,,\n"
+    )
+    run = importer.start_import(db, "names.csv", "csv", user["id"])
+    importer.import_tasks(db, stream, run)
+
+    by_name, by_id = titled(db, prefix)
+    assert (by_name.assignee_id, by_name.creator_id, by_name.project_id) == (
+        names["user"]["id"], names["user"]["id"], names["project"]["id"]
+    )
+    tag_ids = {link.tag_id for link in db.query(TaskTag).filter(TaskTag.task_id == by_name.id)}
+    assert tag_ids == {names["tag"]["id"], names["tag2"]["id"]}
+    # Rows without a creator fall back to the run's
+    assert (by_id.assignee_id, by_id.creator_id) == (user["id"], user["id"])
+    assert run.errors == [{"row": 3, "error": "Unknown project: No Such Project"}]
+
+
+def test_each_chunk_is_committed(db, user):
+    from database import SessionLocal
+
+    prefix = unique("Chunks")
+    run = importer.start_import(db, "chunks.ndjson", "ndjson", user["id"])
+    committed = []
+
+    def progress(run):
+        # Another session only sees committed rows
+        other = SessionLocal()
+        try:
+            committed.append((run.rows_processed, len(titled(other, prefix))))
+        finally:
+            other.close()
+
+    stream = ndjson(*({"title": f"{prefix} {n}"} for n in range(5)))
+    importer.import_tasks(db, stream, run, chunk_size=2, on_progress=progress)
+    assert committed == [(2, 2), (4, 4), (5, 5)]
+
+
+def test_resume_after_failure_skips_committed_rows(db, user):
+    prefix = unique("Resume")
+    lines = [json.dumps({"title": f"{prefix} {n}"}) + "\n" for n in range(5)]
+
+    def broken_stream():
+        yield from lines[:3]
+        raise OSError("connection lost")
+
+    run = importer.start_import(db, "resume.ndjson", "ndjson", user["id"])
+    with pytest.raises(OSError):
+        importer.import_tasks(db, broken_stream(), run, chunk_size=2)
+    assert (run.status, run.rows_processed, run.imported) == (JobStatus.FAILED, 2, 2)
+    assert "connection lost" in run.error
+
+    run = importer.resume_import(db, run.id)
+    importer.import_tasks(db, io.StringIO("".join(lines)), run, chunk_size=2)
+    assert (run.status, run.rows_processed, run.imported) == (JobStatus.SUCCEEDED, 5, 5)
+    assert [task.title for task in titled(db, prefix)] == [f"{prefix} {n}" for n in range(5)]
+
+
+def test_upload_is_imported_by_a_job(client, user):
+    prefix = unique("Upload")
+    body = "".join(json.dumps({"title": f"{prefix} {n}"}) + "\n" for n in range(3))
+    response = client.post(
+        "/tasks/import", params={"creator_id": user["id"]}, files={"file": ("tasks.ndjson", body)}
+    )
+    assert response.status_code == 202
+    assert response.json()["status"] == "queued"
+
+    run_queued_jobs()
+    run = client.get(f"/imports/{response.json()['id']}")
+    assert run.status_code == 200
+    assert (run.json()["status"], run.json()["imported"]) == ("succeeded", 3)
+
+
+def test_failed_import_reads_as_200(client, db, user):
+    def failing_stream():
+        yield json.dumps({"title": "never committed"}) + "\n"
+        raise OSError("disk on fire")
+
+    run = importer.start_import(db, "failed.ndjson", "ndjson", user["id"])
+    with pytest.raises(OSError):
+        importer.import_tasks(db, failing_stream(), run)
+    response = client.get(f"/imports/{run.id}")
+    assert response.status_code == 200
+    assert response.json()["status"] == "failed"
+    assert "disk on fire" in response.json()["error"]
+
+
+def test_resuming_a_running_import_is_rejected(client, db, user):
+    run = importer.start_import(db, "running.ndjson", "ndjson", user["id"])
+    os.makedirs(importer.IMPORT_SPOOL_DIR, exist_ok=True)
+    with open(importer.spool_path(run), "w") as spooled:
+        spooled.write("being read by the worker\n")
+
+    response = client.post(
+        "/tasks/import", params={"resume": run.id}, files={"file": ("running.ndjson", '{"title": "x"}\n')}
+    )
+    assert response.status_code == 400
+    assert "still running" in response.json()["detail"]
+    with open(importer.spool_path(run)) as spooled:
+        assert spooled.read() == "being read by the worker\n"
+    assert not [name for name in os.listdir(importer.IMPORT_SPOOL_DIR) if name.endswith(".part")]
+    assert not jobs.import_abandoned(db, run.id)
+    db.refresh(run)
+    assert run.status == JobStatus.RUNNING
+
+
+def test_abandoned_running_import_can_be_resumed(client, db, user):
+    prefix = unique("Abandoned")
+    run = importer.start_import(db, "abandoned.ndjson", "ndjson", user["id"])
+    db.add(Job(kind="import_tasks", payload={"run_id": run.id, "path": "gone"}, status=JobStatus.FAILED))
+    db.commit()
+
+    body = "".join(json.dumps({"title": f"{prefix} {n}"}) + "\n" for n in range(2))
+    response = client.post("/tasks/import", params={"resume": run.id}, files={"file": ("abandoned.ndjson", body)})
+    assert response.status_code == 202
+    assert response.json()["status"] == "queued"
+
+    run_queued_jobs()
+    db.expire_all()
+    assert db.get(ImportRun, run.id).status == JobStatus.SUCCEEDED
+    assert len(titled(db, prefix)) == 2
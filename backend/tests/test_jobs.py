@@ -0,0 +1,95 @@
+"""Job leases (jobs.py): a pool starting while another runs a job must not requeue it"""
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import jobs
+from models import Job, JobStatus
+
+
+@pytest.fixture
+def blocking_job(db, monkeypatch):
+    """A queued job whose handler runs until ``release`` is set"""
+    monkeypatch.setattr(jobs, "JOB_LEASE_SECONDS", 0.3)
+    started, release = threading.Event(), threading.Event()
+    runs = []
+
+    def handler(db, payload, report, llm_client=None):
+        runs.append(threading.current_thread().name)
+        started.set()
+        assert release.wait(10)
+        return {"ok": True}
+
+    monkeypatch.setitem(jobs.HANDLERS, "test_block", handler)
+    job = jobs.enqueue(db, "test_block", {})
+    return job, started, release, runs
+
+
+def test_second_pool_leaves_a_running_job_alone(db, blocking_job):
+    job, started, release, runs = blocking_job
+    first = jobs.JobWorkerPool(concurrency=0)
+    worker = threading.Thread(target=first.run_once, name="first-pool")
+    worker.start()
+    try:
+        assert started.wait(5)
+        # Well past the lease: only the heartbeat keeps it
+        threading.Event().wait(1)
+
+        second = jobs.JobWorkerPool(concurrency=0)
+        second.start()
+        assert second.run_once() is None
+        db.expire_all()
+        running = db.get(Job, job.id)
+        assert running.status == JobStatus.RUNNING
+        assert running.worker_id.startswith(first.worker_id)
+        assert running.locked_until > datetime.utcnow()
+    finally:
+        release.set()
+        worker.join(10)
+
+    db.expire_all()
+    done = db.get(Job, job.id)
+    assert (done.status, done.attempts, done.result) == (JobStatus.SUCCEEDED, 1, {"ok": True})
+    assert (done.worker_id, done.locked_until) == (None, None)
+    assert runs == ["first-pool"]
+
+
+def test_expired_lease_is_requeued_and_rerun(db, blocking_job):
+    job, _, release, runs = blocking_job
+    release.set()
+    # Claimed by a worker that died: nothing renews the lease
+    db.query(Job).filter(Job.id == job.id).update({
+        Job.status: JobStatus.RUNNING,
+        Job.attempts: 1,
+        Job.worker_id: "dead-host:1:0:job-worker-0",
+        Job.locked_until: datetime.utcnow() - timedelta(seconds=1),
+    })
+    db.commit()
+
+    pool = jobs.JobWorkerPool(concurrency=0)
+    pool.start()
+    assert pool.run_once() == job.id
+    db.expire_all()
+    done = db.get(Job, job.id)
+    assert (done.status, done.attempts) == (JobStatus.SUCCEEDED, 2)
+    assert len(runs) == 1
+
+
+def test_outcome_is_discarded_after_the_lease_is_lost(db, blocking_job):
+    job, started, release, _ = blocking_job
+    pool = jobs.JobWorkerPool(concurrency=0)
+    worker = threading.Thread(target=pool.run_once)
+    worker.start()
+    assert started.wait(5)
+    # Another worker reclaimed the job while this one was stuck
+    db.query(Job).filter(Job.id == job.id).update({Job.worker_id: "other-host:2:0:job-worker-0"})
+    db.commit()
+    release.set()
+    worker.join(10)
+
+    db.expire_all()
+    job = db.get(Job, job.id)
+    assert (job.status, job.worker_id, job.result) == (JobStatus.RUNNING, "other-host:2:0:job-worker-0", None)
+    db.query(Job).filter(Job.id == job.id).update({Job.status: JobStatus.FAILED, Job.worker_id: None})
+    db.commit()
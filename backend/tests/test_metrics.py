@@ -0,0 +1,57 @@
+"""Request metrics (metrics.py): streamed responses are timed to their first byte"""
+import asyncio
+import time
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+import metrics
+
+STREAM_SECONDS = 0.3
+
+
+@pytest.fixture
+def timed_app():
+    """An app with a slow plain endpoint and a slow stream, on routes no other test uses"""
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+    prefix = f"/{uuid.uuid4().hex[:8]}"
+
+    @app.get(f"{prefix}/slow")
+    async def slow():
+        await asyncio.sleep(STREAM_SECONDS)
+        return {"ok": True}
+
+    @app.get(f"{prefix}/stream")
+    def stream():
+        async def chunks():
+            yield "data: first\n\n"
+            await asyncio.sleep(STREAM_SECONDS)
+            yield "data: last\n\n"
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app, prefix
+
+
+def duration(route):
+    return metrics.registry.routes[("GET", route)].duration
+
+
+def test_streamed_response_is_timed_to_first_byte(timed_app):
+    app, prefix = timed_app
+    client = TestClient(app)
+
+    started = time.perf_counter()
+    response = client.get(f"{prefix}/stream")
+    assert response.text == "data: first\n\ndata: last\n\n"
+    assert time.perf_counter() - started >= STREAM_SECONDS
+    assert duration(f"{prefix}/stream").count == 1
+    assert duration(f"{prefix}/stream").sum < STREAM_SECONDS / 2
+
+    # Responses sent in one piece are still timed to their last byte
+    assert client.get(f"{prefix}/slow").json() == {"ok": True}
+    assert duration(f"{prefix}/slow").count == 1
+    assert duration(f"{prefix}/slow").sum >= STREAM_SECONDS
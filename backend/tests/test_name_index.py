@@ -0,0 +1,77 @@
+"""Resolving spoken names to users (name_index.py) and transcript assignees"""
+import uuid
+
+import pytest
+
+from models import MeetingTranscript, Task, User
+from name_index import NameIndex
+from transcript_processor import save_results
+
+USERS = [
+    {"id": 1, "name": "David Smith", "aliases": []},
+    {"id": 2, "name": "Jonathan Reyes", "aliases": ["JR"]},
+    {"id": 3, "name": "Katherine Moore", "aliases": []},
+    {"id": 4, "name": "Kathleen Young", "aliases": []},
+    {"id": 5, "name": "Zoë Quartz", "aliases": []},
+]
+
+
+@pytest.fixture
+def index():
+    return NameIndex(USERS)
+
+
+@pytest.mark.parametrize("spoken,user_id,method", [
+    ("Dave", 1, "nickname"),
+    ("Dave Smith", 1, "nickname"),
+    ("dave s.", 1, "token"),
+    ("David Smith", 1, "exact"),
+    ("Smith", 1, "token"),
+    ("Jon", 2, "nickname"),
+    ("jr", 2, "alias"),
+    ("Katherine", 3, "token"),
+    ("Davd Smith", 1, "fuzzy"),
+    ("zoe", 5, "token"),
+])
+def test_spoken_names_resolve(index, spoken, user_id, method):
+    match = index.resolve(spoken)
+    assert match is not None and (match.user_id, match.method) == (user_id, method)
+    assert index.threshold <= match.confidence <= 1.0
+
+
+@pytest.mark.parametrize("spoken", [
+    "Kate",          # Katherine Moore or Kathleen Young
+    "Kath",          # a prefix of both
+    "Nobody Here",
+    "",
+    None,
+])
+def test_ambiguous_or_unknown_names_resolve_to_no_one(index, spoken):
+    assert index.resolve(spoken) is None
+
+
+def test_a_second_david_makes_dave_ambiguous():
+    index = NameIndex(USERS + [{"id": 6, "name": "David Jones", "aliases": []}])
+    assert index.resolve("Dave") is None
+    assert [match.user_id for match in index.candidates("Dave")[:2]] == [1, 6]
+    assert index.resolve("Dave Jones").user_id == 6
+
+
+def test_transcript_assignees_use_the_seeded_users(db, user):
+    suffix = uuid.uuid4().hex[:6]
+    david = User(name=f"David Smith{suffix}")
+    katherine, kathleen = User(name=f"Katherine M{suffix}"), User(name=f"Kathleen Y{suffix}")
+    transcript = MeetingTranscript(title="Assignees", transcript="...")
+    db.add_all([david, katherine, kathleen, transcript])
+    db.commit()
+
+    users = [{"id": u.id, "name": u.name, "aliases": u.aliases} for u in (david, katherine, kathleen)]
+    result = {"new_tasks": [
+        {"title": f"Ship it {suffix}", "assignee_name": f"Dave Smith{suffix}"},
+        {"title": f"Review it {suffix}", "assignee_name": "Kate"},
+    ]}
+    created, _ = save_results(db, transcript.id, result, users)
+    db.commit()
+
+    tasks = {task.title: task.assignee_id for task in db.query(Task).filter(Task.id.in_(created))}
+    assert tasks == {f"Ship it {suffix}": david.id, f"Review it {suffix}": None}
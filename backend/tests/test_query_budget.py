@@ -0,0 +1,11 @@
+"""SQL statements per request stay within benchmarks.query_budget.BUDGETS"""
+import pytest
+
+from benchmarks.query_budget import BUDGETS, request_statements
+
+
+@pytest.mark.parametrize("url,budget", BUDGETS.items(), ids=list(BUDGETS))
+def test_query_budget(seeded, url, budget):
+    client, _, _ = seeded
+    # diagnostics.budget() raises QueryBudgetExceeded past the budget or on a repeated shape
+    request_statements(client, url, max_statements=budget)
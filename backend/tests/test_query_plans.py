@@ -0,0 +1,20 @@
+"""Endpoint queries are served by indexes (see benchmarks.explain_check)"""
+import pytest
+
+from benchmarks.explain_check import ENDPOINTS, endpoint_statements, plan_failures, transcript_context_statements
+
+
+def assert_indexed(engine, statements):
+    scans = {" ".join(statement.split()): details for statement, details in plan_failures(engine, statements) if details}
+    assert not scans, scans
+
+
+@pytest.mark.parametrize("url", ENDPOINTS)
+def test_endpoint_plans(seeded, url):
+    client, engine, _ = seeded
+    assert_indexed(engine, endpoint_statements(client, url))
+
+
+def test_transcript_context_plans(seeded):
+    _, engine, SessionFactory = seeded
+    assert_indexed(engine, transcript_context_statements(SessionFactory))
@@ -0,0 +1,75 @@
+"""GET /search: full-text ranking, prefix matching and index upkeep"""
+import uuid
+
+import pytest
+
+from models import MeetingTranscript
+
+
+@pytest.fixture
+def word():
+    """A word no other test's rows contain"""
+    return f"zq{uuid.uuid4().hex[:8]}"
+
+
+def create_task(client, user, **fields):
+    response = client.post("/tasks", json={"creator_id": user["id"], **fields})
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+def search(client, q, **params):
+    response = client.get("/search", params={"q": q, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_title_hits_outrank_description_hits(client, user, word):
+    in_description = create_task(client, user, title="Quarterly planning", description=f"see the {word} notes")
+    in_title = create_task(client, user, title=f"Fix {word} export", description="nothing else")
+    repeated = create_task(client, user, title=f"{word} {word} cleanup", description=f"{word} everywhere")
+
+    hits = search(client, word, type="task")["results"]
+    assert [hit["id"] for hit in hits][-1] == in_description
+    assert {hit["id"] for hit in hits} == {in_description, in_title, repeated}
+    assert hits[0]["score"] == 1.0
+    assert all(earlier["score"] >= later["score"] for earlier, later in zip(hits, hits[1:]))
+    assert f"[{word}]" in hits[-1]["snippet"]
+
+
+def test_last_word_matches_as_a_prefix(client, user, word):
+    task_id = create_task(client, user, title=f"Migrate {word}ingest pipeline")
+    assert [hit["id"] for hit in search(client, f"migrate {word}ing")["results"]] == [task_id]
+    # Only the last word is a prefix, and every word must match
+    assert search(client, f"{word}ing migrate")["results"] == []
+    assert search(client, f"migrate {word}ing other")["results"] == []
+    assert search(client, '"*')["results"] == []
+
+
+def test_filters_types_and_pages(client, db, user, word):
+    todo = create_task(client, user, title=f"{word} open")
+    done = create_task(client, user, title=f"{word} finished")
+    client.patch(f"/tasks/{done}", json={"status": "done"}).raise_for_status()
+    db.add(MeetingTranscript(title=f"{word} sync", transcript=f"We talked about {word} at length"))
+    db.commit()
+
+    assert [hit["id"] for hit in search(client, word, type="task", status="todo")["results"]] == [todo]
+    assert [hit["type"] for hit in search(client, word, type="transcript")["results"]] == ["transcript"]
+
+    first = search(client, word, limit=2)
+    assert len(first["results"]) == 2 and first["next_offset"] == 2
+    rest = search(client, word, limit=2, offset=2)
+    assert len(rest["results"]) == 1 and rest["next_offset"] is None
+    assert {hit["type"] for hit in first["results"] + rest["results"]} == {"task", "transcript"}
+
+
+def test_index_follows_updates_and_deletes(client, user, word):
+    task_id = create_task(client, user, title="Renamed soon")
+    assert search(client, word)["results"] == []
+
+    client.patch(f"/tasks/{task_id}", json={"title": f"Renamed {word}"}).raise_for_status()
+    assert [hit["id"] for hit in search(client, word)["results"]] == [task_id]
+    assert task_id not in {hit["id"] for hit in search(client, "soon", type="task", limit=100)["results"]}
+
+    client.request("DELETE", "/tasks/bulk", json={"ids": [task_id]}).raise_for_status()
+    assert search(client, word)["results"] == []
@@ -0,0 +1,65 @@
+"""Applying LLM extraction results (transcript_processor.save_results / merge_results)"""
+import logging
+import uuid
+
+import pytest
+
+from models import MeetingTranscript, Task, TaskStatus, TranscriptAction
+from transcript_processor import merge_results, save_results
+
+
+@pytest.fixture
+def transcript(db):
+    transcript = MeetingTranscript(title="Sync", transcript="...")
+    db.add(transcript)
+    db.commit()
+    return transcript
+
+
+@pytest.fixture
+def tasks(db, user):
+    tasks = [Task(title=f"Update {uuid.uuid4().hex[:8]}", creator_id=user["id"]) for _ in range(2)]
+    db.add_all(tasks)
+    db.commit()
+    return tasks
+
+
+def test_string_task_ids_are_applied(db, user, transcript, tasks):
+    result = {"task_updates": [
+        {"task_id": str(tasks[0].id), "action": "completed"},
+        {"task_id": f" {tasks[1].id} ", "action": "blocked"},
+    ]}
+    created, updated = save_results(db, transcript.id, result, [user])
+    db.commit()
+
+    assert (created, updated) == ([], [tasks[0].id, tasks[1].id])
+    db.expire_all()
+    assert [task.status for task in tasks] == [TaskStatus.DONE, TaskStatus.BLOCKED]
+    actions = db.query(TranscriptAction.task_id).filter(TranscriptAction.transcript_id == transcript.id)
+    assert sorted(task_id for task_id, in actions) == sorted(task.id for task in tasks)
+
+
+def test_invalid_task_ids_are_skipped_and_logged(db, user, transcript, tasks, caplog):
+    result = {"task_updates": [
+        {"task_id": [tasks[0].id], "action": "completed"},
+        {"task_id": {"id": tasks[0].id}, "action": "completed"},
+        {"task_id": "task 12", "action": "completed"},
+        {"task_id": True, "action": "completed"},
+        {"task_id": tasks[1].id, "action": "completed"},
+    ]}
+    with caplog.at_level(logging.WARNING, logger="transcript_processor"):
+        created, updated = save_results(db, transcript.id, result, [user])
+    db.commit()
+
+    assert updated == [tasks[1].id]
+    db.expire_all()
+    assert [task.status for task in tasks] == [TaskStatus.TODO, TaskStatus.DONE]
+    assert len([r for r in caplog.records if "invalid task_id" in r.getMessage()]) == 4
+
+
+def test_merge_results_keys_updates_by_numeric_id():
+    merged = merge_results([
+        {"task_updates": [{"task_id": "7", "action": "blocked"}, {"task_id": ["x"], "action": "blocked"}]},
+        {"task_updates": [{"task_id": 7, "action": "completed"}]},
+    ])
+    assert merged["task_updates"] == [{"task_id": 7, "action": "completed"}]
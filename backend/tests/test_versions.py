@@ -0,0 +1,60 @@
+"""ETags from table versions (versions.py): If-None-Match and invalidation on writes"""
+from datetime import datetime
+
+from models import TableVersion, Task
+
+
+def version(db, table: str) -> int:
+    db.expire_all()
+    return db.get(TableVersion, table).version
+
+
+def test_unchanged_list_is_not_modified(client):
+    response = client.get("/tasks")
+    etag = response.headers["etag"]
+    assert response.status_code == 200
+
+    cached = client.get("/tasks", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag and cached.content == b""
+    assert client.get("/tasks", headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+
+
+def test_writes_invalidate_only_the_responses_built_from_them(client, user):
+    task = client.post("/tasks", json={"title": "Versioned", "creator_id": user["id"]}).json()
+    task_etag = client.get(f"/tasks/{task['id']}").headers["etag"]
+    goals_etag = client.get("/goals").headers["etag"]
+
+    client.patch(f"/tasks/{task['id']}", json={"status": "in_progress"}).raise_for_status()
+    changed = client.get(f"/tasks/{task['id']}", headers={"If-None-Match": task_etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != task_etag
+    assert changed.json()["status"] == "in_progress"
+    # /goals reads goals and users, not tasks
+    assert client.get("/goals", headers={"If-None-Match": goals_etag}).status_code == 304
+
+    list_etag = client.get("/tasks").headers["etag"]
+    client.request("DELETE", "/tasks/bulk", json={"ids": [task["id"]]}).raise_for_status()
+    assert client.get("/tasks", headers={"If-None-Match": list_etag}).status_code == 200
+
+
+def test_bulk_statement_bumps_once_per_transaction(db, user):
+    before = version(db, "tasks")
+    now = datetime.utcnow()
+    rows = [{"title": f"Bulk version {n}", "creator_id": user["id"], "created_at": now, "updated_at": now} for n in range(50)]
+    db.execute(Task.__table__.insert(), rows)
+    db.execute(Task.__table__.update().where(Task.title.startswith("Bulk version")).values(updated_at=now))
+    db.commit()
+    assert version(db, "tasks") == before + 1
+
+    db.execute(Task.__table__.delete().where(Task.title.startswith("Bulk version")))
+    db.commit()
+    assert version(db, "tasks") == before + 2
+
+
+def test_rolled_back_write_leaves_the_version(db, user):
+    before = version(db, "tasks")
+    db.add(Task(title="Rolled back", creator_id=user["id"]))
+    db.flush()
+    db.rollback()
+    assert version(db, "tasks") == before
@@ -2,56 +2,61 @@
 OpenAI-powered meeting transcript processor
 """
 import os
+import re
 import json
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional, Tuple
 from datetime import datetime
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from models import MeetingTranscript, TranscriptAction, Task, TaskStatus
+from models import MeetingTranscript, TranscriptAction, Task, TaskStatus, TaskPriority, User
 from schemas import TaskCreate
+import counters
+import changefeed
+import llm_cache
+import name_index
+import refcache
+import task_context
 
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 
-def process_transcript(
-    transcript_text: str,
-    transcript_id: int,
-    db: Session,
-    available_users: List[Dict[str, Any]]
-) -> Dict[str, Any]:
-    """
-    Process meeting transcript using OpenAI to extract:
-    - Meeting summary
-    - New tasks to create
-    - Existing tasks to update/complete
-    """
+# Rough token estimate for English text; avoids a tokenizer dependency
+CHARS_PER_TOKEN = 4
 
-    # Create user context for the LLM
-    user_context = "\n".join([
-        f"- {user['name']} (ID: {user['id']})"
-        for user in available_users
-    ])
+# Active tasks listed in the prompt: the most relevant first (task_context.py)
+# until either limit is reached
+TASK_CONTEXT_TOKENS = int(os.getenv("TASK_CONTEXT_TOKENS", "1500"))
+TASK_CONTEXT_MAX_TASKS = int(os.getenv("TASK_CONTEXT_MAX_TASKS", "50"))
 
-    # Get existing tasks for context
-    existing_tasks = db.query(Task).filter(
-        Task.status.in_([TaskStatus.TODO, TaskStatus.IN_PROGRESS, TaskStatus.BLOCKED])
-    ).all()
+# Transcripts longer than this are split and processed in parallel chunks
+CHUNK_TOKENS = int(os.getenv("TRANSCRIPT_CHUNK_TOKENS", "6000"))
+CHUNK_CONCURRENCY = int(os.getenv("TRANSCRIPT_CHUNK_CONCURRENCY", "4"))
 
-    tasks_context = "\n".join([
-        f"- Task #{task.id}: {task.title} (Status: {task.status.value}, Assigned to: {task.assignee.name if task.assignee else 'Unassigned'})"
-        for task in existing_tasks[:20]  # Limit to 20 most recent
-    ])
+MODEL = "gpt-4-turbo-preview"
+
+# Bump whenever PROMPT_TEMPLATE or the response handling changes, so results
+# cached by llm_cache under the old prompt are no longer reused
+PROMPT_VERSION = 2
+
+# "Dylan: ...", "[00:12:03] Heski Smith: ..." start a new speaker turn
+SPEAKER_TURN = re.compile(r"^\s*(\[[^\]]*\]\s*)?[^\s:][^:\n]{0,40}:\s")
 
-    prompt = f"""You are an AI assistant helping to process meeting transcripts and extract actionable items.
+PRIORITY_RANK = {"low": 0, "medium": 1, "high": 2, "urgent": 3}
+
+PROMPT_TEMPLATE = """You are an AI assistant helping to process meeting transcripts and extract actionable items.
 
 Available Team Members:
 {user_context}
 
-Current Active Tasks:
-{tasks_context if tasks_context else "No active tasks"}
+Active Tasks (most relevant to this meeting first):
+{tasks_context}
 
-Meeting Transcript:
+Meeting Transcript{part}:
 {transcript_text}
 
 Please analyze this transcript and provide:
@@ -84,99 +89,369 @@ Return your response as a JSON object with this structure:
 Be specific and extract only clearly actionable items. If someone is assigned a task, use their exact name from the team members list.
 """
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that extracts actionable items from meeting transcripts."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.3
-        )
 
-        result = json.loads(response.choices[0].message.content)
-
-        # Update transcript with summary
-        transcript = db.query(MeetingTranscript).filter(
-            MeetingTranscript.id == transcript_id
-        ).first()
-
-        if transcript:
-            transcript.summary = result.get("summary", "")
-            transcript.processed = True
-            transcript.processed_at = datetime.utcnow()
-
-        # Create new tasks
-        created_tasks = []
-        for task_data in result.get("new_tasks", []):
-            # Find assignee by name
-            assignee = None
-            assignee_name = task_data.get("assignee_name")
-            if assignee_name:
-                for user in available_users:
-                    if user["name"].lower() == assignee_name.lower():
-                        assignee = user["id"]
-                        break
-
-            # Parse priority
-            priority_map = {
-                "low": "low",
-                "medium": "medium",
-                "high": "high",
-                "urgent": "urgent"
+def build_prompt(user_context: str, tasks_context: str, transcript_text: str, part: str = "") -> str:
+    """Fill in the extraction prompt; ``part`` labels a chunk of a longer meeting"""
+    return PROMPT_TEMPLATE.format(
+        user_context=user_context,
+        tasks_context=tasks_context,
+        transcript_text=transcript_text,
+        part=part
+    )
+
+
+def format_tasks_context(
+    tasks: List[task_context.ContextTask],
+    assignee_names: Dict[int, str],
+    max_tokens: int = None,
+    max_tasks: int = None,
+) -> str:
+    """Prompt lines for ``tasks`` in order, skipping any that would overrun the token budget"""
+    budget = (max_tokens or TASK_CONTEXT_TOKENS) * CHARS_PER_TOKEN
+    lines, used = [], 0
+    for task in tasks[:max_tasks or TASK_CONTEXT_MAX_TASKS]:
+        assignee = assignee_names.get(task.assignee_id, "Unassigned")
+        line = f"- Task #{task.id}: {task.title} (Status: {task.status.value}, Assigned to: {assignee})"
+        if used + len(line) + 1 > budget:
+            continue
+        lines.append(line)
+        used += len(line) + 1
+    return "\n".join(lines)
+
+
+def extract_actions(llm_client, prompt: str) -> Dict[str, Any]:
+    """Run one extraction prompt through the LLM and parse its JSON reply"""
+    response = llm_client.chat.completions.create(
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant that extracts actionable items from meeting transcripts."},
+            {"role": "user", "content": prompt}
+        ],
+        response_format={"type": "json_object"},
+        temperature=0.3
+    )
+    return json.loads(response.choices[0].message.content)
+
+
+def _split_long_turn(turn: str, max_chars: int) -> List[str]:
+    pieces, current = [], []
+    length = 0
+    for word in turn.split(" "):
+        if current and length + len(word) + 1 > max_chars:
+            pieces.append(" ".join(current))
+            current, length = [], 0
+        current.append(word)
+        length += len(word) + 1
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def split_transcript(text: str, max_tokens: int = None) -> List[str]:
+    """Split a transcript into chunks of whole speaker turns under ``max_tokens``"""
+    max_chars = (max_tokens or CHUNK_TOKENS) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return [text]
+
+    turns: List[str] = []
+    for line in text.splitlines():
+        if turns and not SPEAKER_TURN.match(line):
+            turns[-1] += "\n" + line
+        else:
+            turns.append(line)
+
+    chunks: List[str] = []
+    current = ""
+    for turn in turns:
+        pieces = _split_long_turn(turn, max_chars) if len(turn) > max_chars else [turn]
+        for piece in pieces:
+            if current and len(current) + len(piece) + 1 > max_chars:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+logger = logging.getLogger("transcript_processor")
+
+
+def _task_id(value: Any) -> Optional[int]:
+    """A task update's ``task_id`` as an int; None (logged) if it is missing or not an ID"""
+    if value is None:
+        return None
+    if not isinstance(value, bool):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            pass
+    logger.warning("Skipping task update with invalid task_id %r", value)
+    return None
+
+
+def _task_key(title: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9 ]", " ", (title or "").lower()).split())
+
+
+def merge_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-chunk extractions in meeting order, dropping duplicate actions"""
+    summaries = [r.get("summary", "").strip() for r in results if r.get("summary")]
+
+    new_tasks: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        for task in result.get("new_tasks", []):
+            key = _task_key(task.get("title"))
+            if not key:
+                continue
+            existing = new_tasks.get(key)
+            if existing is None:
+                new_tasks[key] = dict(task)
+                continue
+            # Same task mentioned in several chunks: keep the most specific details
+            for field in ("description", "assignee_name", "due_date"):
+                if not existing.get(field) and task.get(field):
+                    existing[field] = task[field]
+            if PRIORITY_RANK.get(str(task.get("priority")).lower(), 1) > PRIORITY_RANK.get(str(existing.get("priority")).lower(), 1):
+                existing["priority"] = task["priority"]
+
+    # Later chunks describe later points in the meeting, so their update wins
+    task_updates: Dict[int, Dict[str, Any]] = {}
+    for result in results:
+        for update in result.get("task_updates", []):
+            task_id = _task_id(update.get("task_id"))
+            if task_id is not None:
+                task_updates.pop(task_id, None)
+                task_updates[task_id] = update
+
+    return {
+        "summary": " ".join(summaries),
+        "new_tasks": list(new_tasks.values()),
+        "task_updates": list(task_updates.values()),
+    }
+
+
+def extract_from_chunks(
+    llm_client,
+    user_context: str,
+    tasks_context: str,
+    chunks: List[str],
+    concurrency: int = None,
+    cache=None
+) -> Dict[str, Any]:
+    """
+    Map the extraction prompt over transcript chunks in parallel and merge the results
+
+    With ``cache`` (an llm_cache.LLMCache), chunks already extracted with the
+    same context, model and prompt version are answered without an API call.
+    """
+    parts = [""] if len(chunks) == 1 else [f" (part {i} of {len(chunks)})" for i in range(1, len(chunks) + 1)]
+
+    def extract(chunk: str, part: str) -> Dict[str, Any]:
+        key = None
+        if cache is not None:
+            key = llm_cache.cache_key(chunk, user_context, tasks_context, MODEL, PROMPT_VERSION, part)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        result = extract_actions(llm_client, build_prompt(user_context, tasks_context, chunk, part=part))
+        if cache is not None:
+            cache.set(key, result, MODEL, PROMPT_VERSION)
+        return result
+
+    if len(chunks) == 1:
+        return extract(chunks[0], parts[0])
+
+    workers = max(1, min(concurrency or CHUNK_CONCURRENCY, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(extract, chunks, parts))
+    return merge_results(results)
+
+
+def save_results(
+    db: Session,
+    transcript_id: int,
+    result: Dict[str, Any],
+    available_users: List[Dict[str, Any]],
+    assignees: Optional[name_index.NameIndex] = None
+) -> Tuple[List[int], List[int]]:
+    """
+    Write an extraction result in a fixed number of statements
+
+    New tasks and their TranscriptAction rows are bulk inserted (task IDs
+    come back via RETURNING), referenced tasks are fetched with one IN query
+    and their changes applied with one bulk UPDATE by primary key. These
+    statements bypass the session's before_flush hook, so the task counters
+    are adjusted here. Assignee names are resolved with ``assignees``
+    (built from ``available_users`` if not given); a name that is unknown
+    or ambiguous leaves the task unassigned. Update task IDs are coerced to
+    int; an update whose ID is not a number is logged and skipped. Returns
+    (created task IDs, updated task IDs).
+    """
+    now = datetime.utcnow()
+
+    # Update transcript with summary
+    transcript = db.query(MeetingTranscript).filter(
+        MeetingTranscript.id == transcript_id
+    ).first()
+
+    if transcript:
+        transcript.summary = result.get("summary", "")
+        transcript.processed = True
+        transcript.processed_at = now
+
+    assignees = assignees or name_index.NameIndex(available_users)
+
+    deltas = Counter()
+    actions = []
+
+    # Create new tasks
+    new_rows = []
+    for task_data in result.get("new_tasks", []):
+        match = assignees.resolve(task_data.get("assignee_name"))
+        assignee = match.user_id if match else None
+        priority = (task_data.get("priority") or "medium").lower()
+        if priority not in PRIORITY_RANK:
+            priority = "medium"
+        new_rows.append({
+            "title": task_data["title"],
+            "description": task_data.get("description", ""),
+            "priority": TaskPriority(priority),
+            "assignee_id": assignee,
+            "creator_id": available_users[0]["id"],  # Default to first user
+            "status": TaskStatus.TODO,
+            "created_at": now,
+            "updated_at": now,
+        })
+        deltas.update(counters.task_delta(None, counters.task_keys(TaskStatus.TODO, priority, assignee)))
+
+    created_tasks = []
+    if new_rows:
+        # One batched Core INSERT (the ORM bulk insert splits rows by which
+        # keys are None); IDs come back in new_rows order, matched by
+        # tasks.insert_ordinal
+        created_tasks = db.scalars(Task.__table__.insert().returning(Task.__table__.c.id, sort_by_parameter_order=True), new_rows).all()
+        actions.extend(
+            {
+                "transcript_id": transcript_id,
+                "task_id": task_id,
+                "action_type": "created",
+                "description": f"Created task: {row['title']}",
+                "created_at": now,
             }
-            priority = priority_map.get(task_data.get("priority", "medium").lower(), "medium")
-
-            # Create task
-            new_task = Task(
-                title=task_data["title"],
-                description=task_data.get("description", ""),
-                priority=priority,
-                assignee_id=assignee,
-                creator_id=available_users[0]["id"],  # Default to first user
-                status=TaskStatus.TODO
-            )
-            db.add(new_task)
-            db.flush()  # Get the task ID
-
-            # Log action
-            action = TranscriptAction(
-                transcript_id=transcript_id,
-                task_id=new_task.id,
-                action_type="created",
-                description=f"Created task: {task_data['title']}"
-            )
-            db.add(action)
-            created_tasks.append(new_task.id)
-
-        # Update existing tasks
-        updated_tasks = []
-        for update_data in result.get("task_updates", []):
-            task_id = update_data.get("task_id")
-            task = db.query(Task).filter(Task.id == task_id).first()
-
-            if task:
-                action_type = update_data.get("action", "updated")
-
-                if action_type == "completed":
-                    task.status = TaskStatus.DONE
-                    task.completed_at = datetime.utcnow()
-                elif action_type == "blocked":
-                    task.status = TaskStatus.BLOCKED
-
-                task.updated_at = datetime.utcnow()
-
-                # Log action
-                action = TranscriptAction(
-                    transcript_id=transcript_id,
-                    task_id=task.id,
-                    action_type=action_type,
-                    description=update_data.get("note", f"Task {action_type}")
-                )
-                db.add(action)
-                updated_tasks.append(task.id)
+            for task_id, row in zip(created_tasks, new_rows)
+        )
+        for task_id, row in zip(created_tasks, new_rows):
+            changefeed.record_task(db, "created", task_id, row)
+
+    # Update existing tasks (the LLM may return IDs as strings, or garbage)
+    task_updates = []
+    for update_data in result.get("task_updates", []):
+        task_id = _task_id(update_data.get("task_id"))
+        if task_id is not None:
+            task_updates.append((task_id, update_data))
+    referenced = {task_id for task_id, _ in task_updates}
+    current = {
+        row.id: row for row in db.query(
+            Task.id, Task.title, Task.status, Task.priority, Task.assignee_id, Task.project_id, Task.completed_at
+        ).filter(Task.id.in_(referenced))
+    } if referenced else {}
+
+    changes = {}
+    updated_tasks = []
+    for task_id, update_data in task_updates:
+        task = current.get(task_id)
+        if not task:
+            continue
+        action_type = update_data.get("action", "updated")
+        change = changes.setdefault(task.id, {
+            "id": task.id,
+            "status": task.status,
+            "completed_at": task.completed_at,
+            "updated_at": now,
+        })
+        if action_type == "completed":
+            change["status"] = TaskStatus.DONE
+            change["completed_at"] = now
+        elif action_type == "blocked":
+            change["status"] = TaskStatus.BLOCKED
+
+        actions.append({
+            "transcript_id": transcript_id,
+            "task_id": task.id,
+            "action_type": action_type,
+            "description": update_data.get("note", f"Task {action_type}"),
+            "created_at": now,
+        })
+        updated_tasks.append(task.id)
+
+    if changes:
+        db.execute(update(Task), list(changes.values()))
+        for task_id, change in changes.items():
+            task = current[task_id]
+            deltas.update(counters.task_delta(
+                counters.task_keys(task.status, task.priority, task.assignee_id),
+                counters.task_keys(change["status"], task.priority, task.assignee_id),
+            ))
+            changefeed.record_task(db, "updated", task_id, {**task._asdict(), **change}, task._asdict())
+
+    if actions:
+        db.execute(TranscriptAction.__table__.insert(), actions)
+    if deltas:
+        counters.apply_deltas(db.connection(), deltas)
+
+    return created_tasks, updated_tasks
+
+
+def process_transcript(
+    transcript_text: str,
+    transcript_id: int,
+    db: Session,
+    available_users: List[Dict[str, Any]],
+    llm_client=None,
+    on_progress: Optional[Callable[[str], None]] = None,
+    cache=llm_cache.DEFAULT,
+    assignees: Optional[name_index.NameIndex] = None
+) -> Dict[str, Any]:
+    """
+    Process meeting transcript using OpenAI to extract:
+    - Meeting summary
+    - New tasks to create
+    - Existing tasks to update/complete
+
+    ``llm_client`` replaces the module OpenAI client (e.g. fake_llm.FakeLLMClient)
+    and ``on_progress`` receives a short description of each stage. ``cache``
+    defaults to the process-wide llm_cache; pass None to always call the LLM.
+    ``assignees`` is a name index over ``available_users`` (jobs pass the
+    cached one); without it one is built for this call.
+    """
+    llm_client = llm_client or client
+    if cache is llm_cache.DEFAULT:
+        cache = llm_cache.get_cache()
+    report = on_progress or (lambda stage: None)
+    report("loading context")
+    assignees = assignees or name_index.NameIndex(available_users)
+
+    # Create user context for the LLM
+    user_context = "\n".join([
+        f"- {user['name']} (ID: {user['id']}{', also: ' + ', '.join(user['aliases']) if user.get('aliases') else ''})"
+        for user in available_users
+    ])
+
+    # The active tasks this meeting most likely discusses, within the token budget
+    ranked = task_context.rank_tasks(db, transcript_text, assignees)[:TASK_CONTEXT_MAX_TASKS]
+    names = {user["id"]: user["name"] for user in available_users}
+    unknown = {task.assignee_id for task in ranked} - names.keys()
+    names.update({user.id: user.name for user in refcache.cache.get_many(db, User, unknown).values()})
+    tasks_context = format_tasks_context(ranked, names) or "No active tasks"
+
+    try:
+        chunks = split_transcript(transcript_text)
+        report(f"extracting action items ({len(chunks)} chunk{'s' if len(chunks) != 1 else ''})")
+        result = extract_from_chunks(llm_client, user_context, tasks_context, chunks, cache=cache)
+        report("saving tasks")
 
+        created_tasks, updated_tasks = save_results(db, transcript_id, result, available_users, assignees)
         db.commit()
 
         return {
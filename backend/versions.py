@@ -0,0 +1,129 @@
+"""
+Per-table version numbers for conditional GETs
+
+Every transaction that inserts, updates or deletes rows of a versioned
+table bumps its row in ``table_versions``. An ETag is built from the
+versions of the tables a response reads; checking it costs one primary-key
+lookup instead of the full query and serialization.
+
+PostgreSQL bumps from statement-level triggers, so other processes are
+covered too. SQLite only has per-row triggers, which turn a bulk statement
+into one version write per row, so there ``instrument_engine`` bumps a
+table before the first write to it in each transaction instead: one
+UPDATE per table, however many statements and rows follow. Writes through
+raw SQL strings are not seen. Either way the version row is locked until
+the writing transaction commits, as the task_counters rows already are.
+"""
+import hashlib
+import time
+from typing import Iterable, Optional
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from models import TableVersion
+
+VERSIONED_TABLES = (
+    "users", "projects", "tags", "tasks", "task_tags",
+    "goals", "meeting_transcripts", "transcript_actions",
+)
+
+# Tables each cached response is built from
+TASK_TABLES = ("tasks", "task_tags", "users", "projects", "tags")
+GOAL_TABLES = ("goals", "users")
+TRANSCRIPT_TABLES = ("meeting_transcripts", "transcript_actions")
+STATS_TABLES = ("tasks", "users")
+
+BUMP = "UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}'"
+
+POSTGRES_FUNCTION = (
+    "CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$ BEGIN "
+    "UPDATE table_versions SET version = version + 1 WHERE table_name = TG_TABLE_NAME; "
+    "RETURN NULL; END $$ LANGUAGE plpgsql"
+)
+
+
+_BUMPED = "versions_bumped"  # conn.info key: tables bumped in the current transaction
+
+
+def _postgres_ddl(table: str):
+    yield f"DROP TRIGGER IF EXISTS {table}_version ON {table}"
+    yield (
+        f"CREATE TRIGGER {table}_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()"
+    )
+
+
+def create_version_triggers(conn: Connection) -> None:
+    """Seed missing version rows and, on PostgreSQL, (re)create the triggers that bump them"""
+    TableVersion.__table__.create(conn, checkfirst=True)
+    existing = {row[0] for row in conn.execute(text("SELECT table_name FROM table_versions"))}
+    # Start from the clock so a recreated database never reissues old ETags
+    start = int(time.time())
+    missing = [{"table_name": table, "version": start} for table in VERSIONED_TABLES if table not in existing]
+    if missing:
+        conn.execute(TableVersion.__table__.insert(), missing)
+
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(POSTGRES_FUNCTION))
+        for table in VERSIONED_TABLES:
+            for statement in _postgres_ddl(table):
+                conn.execute(text(statement))
+
+
+def drop_sqlite_triggers(conn: Connection) -> None:
+    """Drop the per-row SQLite triggers that bumped versions before ``instrument_engine``"""
+    if conn.dialect.name != "sqlite":
+        return
+    for table in VERSIONED_TABLES:
+        for suffix in ("ai", "au", "ad"):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_version_{suffix}"))
+
+
+# ============================================================================
+# SQLITE HOOKS
+# ============================================================================
+
+def _bump_before_write(conn, clauseelement, multiparams, params, execution_options):
+    if not getattr(clauseelement, "is_dml", False):
+        return
+    table = clauseelement.table.name
+    bumped = conn.info.setdefault(_BUMPED, set())
+    if table in VERSIONED_TABLES and table not in bumped:
+        bumped.add(table)
+        conn.exec_driver_sql(BUMP.format(table=table))
+
+
+def _transaction_ended(conn, *args):
+    conn.info.pop(_BUMPED, None)
+
+
+def instrument_engine(engine) -> None:
+    """Bump versions for writes on a SQLite ``engine`` (a no-op elsewhere: triggers do it)"""
+    if engine.dialect.name != "sqlite" or event.contains(engine, "before_execute", _bump_before_write):
+        return
+    event.listen(engine, "before_execute", _bump_before_write)
+    # A rolled back savepoint takes its bumps with it
+    for name in ("commit", "rollback", "rollback_savepoint"):
+        event.listen(engine, name, _transaction_ended)
+
+
+def etag(db: Session, tables: Iterable[str]) -> str:
+    """Weak ETag for a response built from ``tables``"""
+    tables = list(tables)
+    versions = dict(
+        db.query(TableVersion.table_name, TableVersion.version)
+        .filter(TableVersion.table_name.in_(tables))
+    )
+    key = ".".join(str(versions.get(table, 0)) for table in tables)
+    return f'W/"{hashlib.blake2b(key.encode(), digest_size=8).hexdigest()}"'
+
+
+def matches(if_none_match: Optional[str], current: str) -> bool:
+    """Weak comparison of an If-None-Match header against ``current``"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = current.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in if_none_match.split(","))
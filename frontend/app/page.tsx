@@ -1,7 +1,10 @@
 'use client';
 
-import { useState, useEffect } from 'react';
-import { getTasks, getUsers, getDashboardStats, User, Task, DashboardStats } from '@/lib/api';
+import { useState, useEffect, useRef } from 'react';
+import {
+  getUsers, getDashboardStats, getTask, subscribeToChanges, syncTaskChanges, applyTaskChanges,
+  User, Task, DashboardStats, ChangeEvent, TASK_CARD_FIELDS,
+} from '@/lib/api';
 import TaskBoard from '@/components/TaskBoard';
 import StatsPanel from '@/components/StatsPanel';
 import TranscriptUpload from '@/components/TranscriptUpload';
@@ -15,16 +18,18 @@ export default function Home() {
   const [stats, setStats] = useState<DashboardStats | null>(null);
   const [loading, setLoading] = useState(true);
   const [selectedView, setSelectedView] = useState<'board' | 'transcripts'>('board');
+  const syncToken = useRef<string>();
 
   const loadData = async () => {
     try {
-      const [tasksRes, usersRes, statsRes] = await Promise.all([
-        getTasks(),
+      const [changes, usersRes, statsRes] = await Promise.all([
+        syncTaskChanges(undefined, TASK_CARD_FIELDS),
         getUsers(),
         getDashboardStats(),
       ]);
 
-      setTasks(tasksRes.data);
+      syncToken.current = changes.token;
+      setTasks(applyTaskChanges([], changes));
       setUsers(usersRes.data);
       setStats(statsRes.data);
     } catch (error) {
@@ -35,10 +40,68 @@ export default function Home() {
     }
   };
 
+  // Pull only what changed since the last sync
+  const syncTasks = async () => {
+    try {
+      const changes = await syncTaskChanges(syncToken.current, TASK_CARD_FIELDS);
+      syncToken.current = changes.token;
+      setTasks((current) => applyTaskChanges(current, changes));
+    } catch (error) {
+      console.error('Error syncing tasks:', error);
+      loadData();  // e.g. the token expired
+    }
+  };
+
   useEffect(() => {
     loadData();
   }, []);
 
+  // Apply other people's edits as they are committed
+  useEffect(() => {
+    let statsTimer: ReturnType<typeof setTimeout> | undefined;
+    const refreshStats = () => {
+      clearTimeout(statsTimer);
+      statsTimer = setTimeout(async () => {
+        try {
+          setStats((await getDashboardStats()).data);
+        } catch (error) {
+          console.error('Error refreshing stats:', error);
+        }
+      }, 500);
+    };
+
+    const onEvent = async (event: ChangeEvent) => {
+      if (event.op === 'reset' || event.op === 'imported') {
+        syncTasks();
+        refreshStats();
+        return;
+      }
+      if (event.entity !== 'task' || !event.id) return;
+      const id = event.id;
+      refreshStats();
+      if (event.op === 'deleted') {
+        setTasks((current) => current.filter((task) => task.id !== id));
+        return;
+      }
+      try {
+        const { data } = await getTask(id);
+        setTasks((current) =>
+          current.some((task) => task.id === id)
+            ? current.map((task) => (task.id === id ? data : task))
+            : [data, ...current]
+        );
+      } catch (error) {
+        console.error('Error loading changed task:', error);
+      }
+    };
+
+    const unsubscribe = subscribeToChanges(onEvent, { types: 'task' });
+    return () => {
+      clearTimeout(statsTimer);
+      unsubscribe();
+    };
+  }, []);
+
   if (loading) {
     return (
       <div className="min-h-screen flex items-center justify-center bg-gray-50">
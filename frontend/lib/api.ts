@@ -9,11 +9,44 @@ const api = axios.create({
   },
 });
 
+// Conditional GETs: remember each response's ETag, revalidate with
+// If-None-Match and reuse the remembered body when the server answers 304
+const ETAG_CACHE_ENTRIES = 200;
+const etagCache = new Map<string, { etag: string; data: unknown; headers: any }>();
+
+api.interceptors.request.use((config) => {
+  if ((config.method ?? 'get') === 'get') {
+    const cached = etagCache.get(api.getUri(config));
+    if (cached) config.headers.set('If-None-Match', cached.etag);
+    config.validateStatus = (status) => (status >= 200 && status < 300) || status === 304;
+  }
+  return config;
+});
+
+api.interceptors.response.use((response) => {
+  if (response.config.method !== 'get') return response;
+  const key = api.getUri(response.config);
+  const cached = etagCache.get(key);
+  if (response.status === 304 && cached) {
+    return { ...response, status: 200, data: cached.data, headers: cached.headers };
+  }
+  const etag = response.headers['etag'];
+  if (etag) {
+    etagCache.delete(key);
+    etagCache.set(key, { etag, data: response.data, headers: response.headers });
+    if (etagCache.size > ETAG_CACHE_ENTRIES) {
+      etagCache.delete(etagCache.keys().next().value as string);
+    }
+  }
+  return response;
+});
+
 // Types
 export interface User {
   id: number;
   name: string;
   email?: string;
+  aliases?: string[];
   created_at: string;
 }
 
@@ -82,6 +115,50 @@ export interface Goal {
   completed_at?: string;
 }
 
+export interface Job {
+  id: number;
+  kind: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  progress?: string;
+  result?: any;
+  error?: string;
+  attempts: number;
+  max_attempts: number;
+  created_at: string;
+  started_at?: string;
+  finished_at?: string;
+}
+
+export interface SearchHit {
+  type: 'task' | 'transcript';
+  id: number;
+  title: string;
+  snippet?: string;
+  score: number;
+}
+
+export interface SearchResults {
+  results: SearchHit[];
+  next_offset?: number;
+}
+
+export interface TaskChanges {
+  tasks: Task[];
+  deleted: number[];
+  next: string;
+  has_more: boolean;
+}
+
+export interface ChangeEvent {
+  token: string;
+  op: 'created' | 'updated' | 'removed' | 'deleted' | 'imported' | 'reset';
+  entity?: 'task' | 'goal' | 'transcript';
+  id?: number | null;
+  ts?: string;
+  fields?: Record<string, any>;
+  previous?: Record<string, any>;  // filtered fields an update changed
+}
+
 export interface DashboardStats {
   total_tasks: number;
   todo_tasks: number;
@@ -118,14 +195,57 @@ export const createTag = (data: { name: string; color?: string }) =>
   api.post<Tag>('/tags', data);
 
 // Tasks
-export const getTasks = (params?: {
+export interface TaskQuery {
   assignee_id?: number;
   status?: string;
   project_id?: number;
-}) => api.get<Task[]>('/tasks', { params });
+  limit?: number;
+  cursor?: string;
+  sort?: string;
+  fields?: string;
+}
+
+// Fields the board cards render; keeps list payloads slim
+export const TASK_CARD_FIELDS = 'id,title,description,status,priority,assignee_id,assignee,due_date';
+
+export const getTasks = (params?: TaskQuery) => api.get<Task[]>('/tasks', { params });
 
 export const getTask = (id: number) => api.get<Task>(`/tasks/${id}`);
 
+// Delta sync: tasks changed and deleted since a token (all tasks without one)
+export const getTaskChanges = (params: { since?: string; limit?: number; fields?: string } = {}) =>
+  api.get<TaskChanges>('/tasks/changes', { params });
+
+// Follow has_more until caught up; keep the returned token for the next sync
+export const syncTaskChanges = async (since?: string, fields?: string) => {
+  const changed = new Map<number, Task>();
+  const deleted = new Set<number>();
+  let token = since;
+  let more = true;
+  while (more) {
+    const { data } = await getTaskChanges({ since: token, fields, limit: 1000 });
+    data.deleted.forEach((id) => {
+      deleted.add(id);
+      changed.delete(id);
+    });
+    data.tasks.forEach((task) => {
+      deleted.delete(task.id);
+      changed.set(task.id, task);
+    });
+    token = data.next;
+    more = data.has_more;
+  }
+  return { tasks: Array.from(changed.values()), deleted: Array.from(deleted), token: token as string };
+};
+
+// Apply synced changes to a local task list (newest first)
+export const applyTaskChanges = (current: Task[], changes: { tasks: Task[]; deleted: number[] }) => {
+  const byId = new Map(current.map((task) => [task.id, task]));
+  changes.deleted.forEach((id) => byId.delete(id));
+  changes.tasks.forEach((task) => byId.set(task.id, task));
+  return Array.from(byId.values()).sort((a, b) => b.id - a.id);
+};
+
 export const createTask = (data: {
   title: string;
   description?: string;
@@ -148,8 +268,24 @@ export const getTranscripts = () => api.get<MeetingTranscript[]>('/transcripts')
 export const getTranscript = (id: number) => api.get<MeetingTranscript>(`/transcripts/${id}`);
 export const createTranscript = (data: { title: string; transcript: string }) =>
   api.post<MeetingTranscript>('/transcripts', data);
-export const processTranscript = (id: number) =>
-  api.post(`/transcripts/${id}/process`);
+export const enqueueTranscriptProcessing = (id: number) =>
+  api.post<Job>(`/transcripts/${id}/process`);
+
+// Queue processing, then poll the job until it finishes
+export const processTranscript = async (id: number, pollMs = 1000) => {
+  let { data: job } = await enqueueTranscriptProcessing(id);
+  while (job.status === 'queued' || job.status === 'running') {
+    await new Promise((resolve) => setTimeout(resolve, pollMs));
+    ({ data: job } = await getJob(job.id));
+  }
+  if (job.status === 'failed') {
+    throw new Error(job.error || 'Processing failed');
+  }
+  return job;
+};
+
+// Jobs
+export const getJob = (id: number) => api.get<Job>(`/jobs/${id}`);
 
 // Goals
 export const getGoals = () => api.get<Goal[]>('/goals');
@@ -165,6 +301,34 @@ export const updateGoal = (id: number, data: Partial<Goal>) =>
   api.patch<Goal>(`/goals/${id}`, data);
 export const deleteGoal = (id: number) => api.delete(`/goals/${id}`);
 
+// Search
+export const search = (params: {
+  q: string;
+  type?: 'task' | 'transcript';
+  limit?: number;
+  offset?: number;
+  status?: Task['status'];
+  assignee_id?: number;
+  project_id?: number;
+}) => api.get<SearchResults>('/search', { params });
+
+// Live changes (server-sent events). EventSource reconnects on its own and
+// resumes from the last event id; a 'reset' event means refetch everything.
+export const subscribeToChanges = (
+  onEvent: (event: ChangeEvent) => void,
+  params: { types?: string; project_id?: number; assignee_id?: number } = {}
+) => {
+  const query = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value !== undefined) query.set(key, String(value));
+  });
+  const source = new EventSource(`${API_URL}/events?${query}`);
+  const handle = (message: MessageEvent) => onEvent(JSON.parse(message.data));
+  source.addEventListener('change', handle);
+  source.addEventListener('reset', handle);
+  return () => source.close();
+};
+
 // Stats
 export const getDashboardStats = () => api.get<DashboardStats>('/stats');
 